@@ -2,489 +2,231 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import streamlit as st
-import io 
-
-# =========================================================================
-# --- STAŁE FINANSOWE I REFERENCYJNE (ZAKTUALIZOWANE O NOWE LIMITY) ---
-# =========================================================================
-ULGA_MAX_KWOTA = 53000.0 
-REF_PRODUKCJA_WIATR_KWH_KW_ROK = 1000.0 
-
-# Limity dotacji jednostkowe (np. z programu "Moja Elektrownia Wiatrowa")
-MAX_DOTACJA_WIATR_NA_KW = 5000.0  
-MAX_DOTACJA_ESS_NA_KWH = 6000.0   
-
-# Nowe, dodane limity maksymalne KWOTOWE (z netbilling2.py)
-MAX_DOTACJA_WIATR_KWOTOWY = 30000.0
-MAX_DOTACJA_ESS_KWOTOWY = 17000.0
-
-# Ustawienia ESS (techniczne)
-ESS_RT_EFFICIENCY = 0.90 
-INTERWAL_H = 0.25 
-
-# --- FUNKCJA GENERUJĄCA PRODUKCJĘ WIATROWĄ (NIEZMIENIONA) ---
-PROFIL_MIESIECZNY_WIATR = np.array([0.15, 0.14, 0.12, 0.10, 0.09, 0.08, 0.07, 0.08, 0.10, 0.12, 0.14, 0.13])
-PROFIL_GODZINOWY_WIATR = np.array([
-    0.05, 0.06, 0.07, 0.08, 0.07, 0.06, 
-    0.05, 0.04, 0.04, 0.03, 0.03, 0.04, 
-    0.04, 0.05, 0.04, 0.04, 0.05, 0.06, 
-    0.06, 0.07, 0.07, 0.06, 0.06, 0.05  
-])
-PROFIL_GODZINOWY_WIATR /= PROFIL_GODZINOWY_WIATR.sum()
-PROFIL_MIESIECZNY_WIATR /= PROFIL_MIESIECZNY_WIATR.sum()
-
-def generuj_produkcje_wiatrowa(df, roczna_produkcja_docelowa_kwh):
-    # Logika z netbilling2.py
-    MIESIAC_ARR = df['Miesiąc'].values 
-    GODZINA_ARR = df['Godzina'].values
-    wskazniki = np.empty(len(df))
-    for i in range(len(df)):
-        miesiac_idx = MIESIAC_ARR[i] - 1
-        godzina_idx = GODZINA_ARR[i]
-        if 0 <= miesiac_idx < 12 and 0 <= godzina_idx < 24:
-            wskazniki[i] = PROFIL_MIESIECZNY_WIATR[miesiac_idx] * PROFIL_GODZINOWY_WIATR[godzina_idx]
-        else:
-            wskazniki[i] = 0 
-    df['Wskaznik_Profilu'] = wskazniki
-    suma_wskaznikow = df['Wskaznik_Profilu'].sum()
-    if suma_wskaznikow == 0:
-        return np.zeros(len(df))
-    df['Produkcja_Wiatr_Kwh'] = (df['Wskaznik_Profilu'] / suma_wskaznikow) * roczna_produkcja_docelowa_kwh
-    return df['Produkcja_Wiatr_Kwh'].copy()
-
-# --- ZOPTYMALIZOWANA FUNKCJA GENERUJĄCA WYKRES (ADAPTACJA DO STREAMLIT) ---
-def generuj_wykres_bilansu_rocznego(raport_miesieczny_dane, moc_pv_kwp, moc_turbina_kw, ess_pojemnosc_kwh):
+import contextlib
+import json
+import time
+
+from kalkulator import (
+    ULGA_MAX_KWOTA, REF_PRODUKCJA_WIATR_KWH_KW_ROK, MAX_DOTACJA_WIATR_KWOTOWY, MAX_DOTACJA_ESS_KWOTOWY,
+    run_simulation, wczytaj_dane, siatka_wariantow, symuluj_warianty, najlepszy_wariant, porownaj_strategie_ess,
+    przelicz_w_tle, oszacuj_blad_podgladu, roznice_wynikow
+)
+from dane import rozdzielczosc
+from dni_typowe import TRYB_DNI_TYPOWYCH
+from projekcja import (
+    LATA_PROJEKCJI, DEGRADACJA_PV_ROCZNA, ZANIK_ESS_NA_CYKL, ZANIK_ESS_KALENDARZOWY, ESKALACJA_CENY_ENERGII,
+    ESKALACJA_DYSTRYBUCJI, ESKALACJA_CENY_EKSPORTU, STOPA_DYSKONTOWA, projekcja_wieloletnia
+)
+from strategie import STRATEGIE_ESS, OPISY_STRATEGII_ESS
+from optymalizacja import KRYTERIA, optymalizuj_system, parsuj_punkty_ceny
+from interwaly import FORMATY_ZAPISU, ROZSZERZENIA, agreguj_wyniki, do_bajtow, jako_dataframe
+from niepewnosc import LICZBA_SCENARIUSZY, analiza_monte_carlo
+from taryfy import TARYFY_WBUDOWANE, skrot_taryfy, taryfa_z_bajtow, wczytaj_taryfe
+from pomiary import odcinek, profil_bajty, profil_tekst, rozpocznij_pomiar, zakoncz_pomiar
+from wykresy import (
+    wykres_bilansu_interaktywny, wykres_bilansu_dziennego, wykres_bilansu_interwalowego, wykres_rozkladu_scenariuszy,
+    mapa_wariantow
+)
+
+# Tryb na żywo: maksymalny czas przeliczenia, powyżej którego wraca tryb z przyciskiem
+LIMIT_PRZELICZENIA_NA_ZYWO_S = 0.1
+
+# Szybki podgląd: okres agregacji danych -> opis (None = od razu pełna rozdzielczość)
+OKRESY_PODGLADU = {None: 'Wyłączony', 'h': 'Dane godzinowe', 'D': 'Dane dobowe', TRYB_DNI_TYPOWYCH: 'Dni typowe'}
+
+
+# --- WYKRES BILANSU (ALTAIR, Z PAMIĘCIĄ WG WYNIKU) I SZCZEGÓŁY WYBRANEGO MIESIĄCA / DNIA ---
+# Wykres wektorowy rysowany w przeglądarce zamiast PNG z Matplotlib; kliknięcie słupka
+# miesiąca pokazuje bilans dzień po dniu z raportu dziennego tej samej symulacji,
+# a kliknięcie dnia - interwał po interwale z tablic interwałowych.
+def generuj_wykres_bilansu_rocznego(results, parametry):
+    raport_miesieczny_dane = results['raport_miesieczny_dane']
     if not raport_miesieczny_dane:
         st.warning("⚠️ Brak danych miesięcznych do wizualizacji.")
         return
 
-    df_raport = pd.DataFrame(raport_miesieczny_dane)
-    
-    miesiące_nazwy = {1: 'Sty', 2: 'Lut', 3: 'Mar', 4: 'Kwi', 5: 'Maj', 6: 'Cze', 
-                     7: 'Lip', 8: 'Sie', 9: 'Wrz', 10: 'Paź', 11: 'Lis', 12: 'Gru'}
-    
-    df_raport['Miesiąc_Num'] = df_raport['Miesiąc'].apply(lambda x: x.month)
-    df_raport['Miesiąc_Sort'] = df_raport['Miesiąc_Num'].apply(lambda x: x if x >= 10 else x + 12)
-    df_raport['Miesiąc_Nazwa'] = df_raport['Miesiąc_Num'].map(miesiące_nazwy)
-    df_raport = df_raport.sort_values(by='Miesiąc_Sort')
-    
-    X = df_raport['Miesiąc_Nazwa']
-    Y_AC_PV = df_raport['AC_PV_KWh']
-    Y_AC_Wiatr = df_raport['AC_Wiatr_KWh']
-    Y_AC_ESS = df_raport['AC_ESS_KWh']
-    Y_SPRZEDAZ = df_raport['Sprzedaz_Siec_KWh']
-    Y_ZAKUP = df_raport['Zakup_Siec_KWh']
-    
-    COLOR_PV = '#FFEB3B'      # Żółty
-    COLOR_WIATR = '#03A9F4'   # Niebieski
-    COLOR_ESS = '#4CAF50'     # Zielony
-    COLOR_ZAKUP = '#F44336'   # Czerwony
-    COLOR_EKSPORT = '#FF9800' # Pomarańczowy
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
-    current_bottom = pd.Series(np.zeros(len(df_raport))) 
-
-    # SŁUPKI NAD OSIĄ 0
-    ax.bar(X, Y_AC_PV, color=COLOR_PV, label='Autokonsumpcja z PV', zorder=2, bottom=current_bottom)
-    current_bottom += Y_AC_PV 
-    
-    ax.bar(X, Y_AC_Wiatr, bottom=current_bottom, color=COLOR_WIATR, label='Autokonsumpcja z Wiatru', zorder=2)
-    current_bottom += Y_AC_Wiatr 
-    
-    ax.bar(X, Y_AC_ESS, bottom=current_bottom, color=COLOR_ESS, label='Autokonsumpcja z Magazynu', zorder=2)
-    current_bottom += Y_AC_ESS 
-    
-    ax.bar(X, Y_SPRZEDAZ, bottom=current_bottom, color=COLOR_EKSPORT, label='Eksport/Sprzedaż do Sieci', zorder=2)
-
-    # SŁUPKI PONIŻEJ OSI 0
-    ax.bar(X, -Y_ZAKUP, color=COLOR_ZAKUP, label='Pobór/Zakup z Sieci', zorder=2)
-
-    ax.axhline(0, color='black', linewidth=0.5)
-    ax.set_title(f'Roczny Bilans Energetyczny: {moc_pv_kwp} kWp PV + {moc_turbina_kw} kW Wiatr + {ess_pojemnosc_kwh} kWh ESS')
-    ax.set_xlabel('Miesiąc')
-    ax.set_ylabel('Energia [kWh]')
-    
-    # Formatowanie legendy (zgodnie z poprawką w netbilling2.py)
-    ax.legend(loc='lower right', 
-               bbox_to_anchor=(1.0, 1.05), 
-               ncol=3, 
-               frameon=False, 
-               fontsize='small') 
-
-    ax.grid(axis='y', linestyle=':', zorder=1)
-    plt.tight_layout(rect=[0, 0, 1, 0.9])
-    
-    st.pyplot(fig)
-
-
-# --- GŁÓWNA FUNKCJA KALKULATORA (CAŁA LOGIKA SYMULACJI Z NETBILLING2.PY) ---
-def run_simulation(moc_pv_kwp, koszt_pv_total, moc_turbina_kw, koszt_turbiny_wiatrowej, 
-                   ess_pojemnosc_kwh, ess_moc_ladowania_kw, ess_moc_rozladowania_kw, 
-                   cena_magazynu_total, korzysta_z_dotacji, korzysta_z_ulgi_termomodernizacyjnej, 
-                   stawka_podatkowa_procent, procent_pracy_turbiny, df_dane):
-    
-    # Skalowanie produkcji wiatrowej
-    wspolczynnik_skali_wiatr = procent_pracy_turbiny / 100.0
-    roczna_produkcja_docelowa_kwh = moc_turbina_kw * REF_PRODUKCJA_WIATR_KWH_KW_ROK * wspolczynnik_skali_wiatr
-
-    # Ustawienie limitów ESS dla symulacji
-    ESS_LADOWANIE_LIMIT_KWH = ess_moc_ladowania_kw * INTERWAL_H 
-    ESS_ROZLADOWANIE_LIMIT_KWH = ess_moc_rozladowania_kw * INTERWAL_H
-    
-    # Koszt bazowy ESS
-    ESS_KOSZT_BAZOWY = cena_magazynu_total
-
-    # KOSZT CAŁKOWITY INWESTYCJI PRZED DOTACJĄ I ULGĄ
-    koszt_calkowity_bazowy = koszt_pv_total + koszt_turbiny_wiatrowej + ESS_KOSZT_BAZOWY
-
-    # --- OBLICZANIE DOTACJI Z NOWYMI LIMITAMI (KROK 1) ---
-    dotacja_magazyn = 0.0
-    dotacja_turbina = 0.0
-
-    if korzysta_z_dotacji:
-        # 1. Limity procentowe (50% kosztów)
-        limit_procentowy_magazyn = ESS_KOSZT_BAZOWY * 0.5
-        limit_procentowy_turbina = koszt_turbiny_wiatrowej * 0.5
-        
-        # 2. Limity na kW/kWh
-        limit_kwotowy_na_jednostke_magazyn = ess_pojemnosc_kwh * MAX_DOTACJA_ESS_NA_KWH
-        limit_kwotowy_na_jednostke_turbina = moc_turbina_kw * MAX_DOTACJA_WIATR_NA_KW
-        
-        # 3. Limity maksymalne KWOTOWE (Nowe!)
-        limit_max_kwotowy_turbina = MAX_DOTACJA_WIATR_KWOTOWY
-        limit_max_kwotowy_magazyn = MAX_DOTACJA_ESS_KWOTOWY
-        
-        # Dotacja to minimum z tych 3 limitów dla każdego elementu
-        dotacja_magazyn = min(limit_procentowy_magazyn, 
-                              limit_kwotowy_na_jednostke_magazyn, 
-                              limit_max_kwotowy_magazyn)
-        
-        dotacja_turbina = min(limit_procentowy_turbina, 
-                              limit_kwotowy_na_jednostke_turbina,
-                              limit_max_kwotowy_turbina)
-
-    dotacja_calkowita = dotacja_magazyn + dotacja_turbina
-
-    koszt_ess_po_dotacji = ESS_KOSZT_BAZOWY - dotacja_magazyn
-    koszt_turbiny_po_dotacji = koszt_turbiny_wiatrowej - dotacja_turbina
-
-    koszt_inwestycji_po_dotacji = koszt_pv_total + koszt_ess_po_dotacji + koszt_turbiny_po_dotacji
+    tytul = (f"Roczny Bilans Energetyczny: {parametry['moc_pv_kwp']} kWp PV + {parametry['moc_turbina_kw']} kW Wiatr "
+             f"+ {parametry['ess_pojemnosc_kwh']} kWh ESS")
+    zdarzenie = st.altair_chart(wykres_bilansu_interaktywny(raport_miesieczny_dane, tytul), width='stretch',
+                                on_select='rerun', selection_mode='miesiac', key='wykres_bilansu')
+    wybrane = (zdarzenie or {}).get('selection', {}).get('miesiac', [])
+    if not wybrane:
+        st.caption("Kliknij słupek miesiąca, aby zobaczyć bilans dzień po dniu.")
+        return
 
-    # --- OBLICZANIE ULGI TERMODERNIZACYJNE (KROK 2) ---
-    if korzysta_z_ulgi_termomodernizacyjnej:
-        koszt_kwalifikowany_calkowity = koszt_inwestycji_po_dotacji
-        kwota_do_odliczenia = min(koszt_kwalifikowany_calkowity, ULGA_MAX_KWOTA)
-        ulga_wartosc_pln = kwota_do_odliczenia * (stawka_podatkowa_procent / 100.0)
-        koszt_inwestycji_netto = koszt_inwestycji_po_dotacji - ulga_wartosc_pln
+    okres = wybrane[0]['Okres']
+    zdarzenie = st.altair_chart(wykres_bilansu_dziennego(results['raport_dzienny_dane'], okres, f"Bilans dzienny: {okres}"),
+                                width='stretch', on_select='rerun', selection_mode='dzien', key=f'wykres_dni_{okres}')
+    wybrane = (zdarzenie or {}).get('selection', {}).get('dzien', [])
+    if 'interwaly' not in results:
+        return
+    if wybrane:
+        dzien = f"{okres}-{wybrane[0]['Dzień']}"
+        st.altair_chart(wykres_bilansu_interwalowego(jako_dataframe(results['interwaly']), dzien,
+                                                     f"Bilans interwałowy: {dzien}"), width='stretch')
     else:
-        koszt_kwalifikowany_calkowity = 0.0
-        kwota_do_odliczenia = 0.0
-        ulga_wartosc_pln = 0.0
-        koszt_inwestycji_netto = koszt_inwestycji_po_dotacji 
-        
-    
-    # --- PRZYGOTOWANIE DANYCH ---
-    df_cleaned = df_dane.copy() 
+        st.caption("Kliknij słupek dnia, aby zobaczyć bilans interwał po interwale.")
 
-    if 'Data' not in df_cleaned.columns and len(df_cleaned.columns) > 0:
-        df_cleaned.rename(columns={df_cleaned.columns[0]: 'Data'}, inplace=True) 
 
-    try:
-        # Kod do obsługi konwersji dat (niezmieniony)
-        if df_cleaned['Data'].dtype in [np.float64, np.int64]:
-            df_cleaned['Data'] = pd.to_datetime('1899-12-30') + pd.to_timedelta(df_cleaned['Data'], unit='D')
-        
-        df_cleaned['Data'] = pd.to_datetime(df_cleaned['Data'], errors='coerce', dayfirst=True)
-        
-        start_date = df_cleaned['Data'].min()
-        if pd.isna(start_date):
-             raise ValueError("Brak danych daty w pliku po konwersji.")
-
-        end_date = start_date + pd.DateOffset(years=1) - pd.Timedelta(minutes=15)
-        
-        df_cleaned = df_cleaned[(df_cleaned['Data'] >= start_date) & (df_cleaned['Data'] <= end_date)].copy()
-        
-        if len(df_cleaned) == 0:
-            raise ValueError("Dane nie obejmują pełnego roku lub filtracja się nie powiodła.")
-        
-        df_cleaned['Miesiąc'] = df_cleaned['Data'].dt.month.fillna(0).astype(int)
-        df_cleaned['Godzina'] = df_cleaned['Data'].dt.hour.fillna(0).astype(int)
-        
-        df_cleaned['Miesiąc_Rok'] = df_cleaned['Data'].dt.to_period('M')
-        df_cleaned['Dzień'] = df_cleaned['Data'].dt.date
-        
-    except Exception as e:
-        st.error(f"❌ BŁĄD: Problem z konwersją kolumny 'Data' lub wyciąganiem czasu. {e}")
-        return None
-
-    def convert_to_numeric(column):
-        if column.dtype == 'object':
-            cleaned = column.astype(str).str.replace('zł', '', regex=False).str.replace(' ', '', regex=False).str.replace(',', '.', regex=False)
-            return pd.to_numeric(cleaned, errors='coerce') 
-        return column
-
-    col_cena_eksportu = 'Cena eksportu'
-    col_produkcja_pv_1kwp = 'produkcja 1KWp'
-    col_konsumpcja = 'Profil konsumpcji (Kwh'
-    col_cena_energii = 'cena energii czynnej (Kwh)'
-    col_koszt_dystrybucji = 'koszt dystrybucji (Kwh)'
-
-    REQUIRED_COLS = [col_cena_eksportu, col_produkcja_pv_1kwp, col_konsumpcja, col_cena_energii, col_koszt_dystrybucji]
-
-    missing_cols = [c for c in REQUIRED_COLS if c not in df_cleaned.columns]
-    if missing_cols:
-        st.error(f"❌ BŁĄD KOLUMN: Nie znaleziono kluczowych nagłówków: {missing_cols}. Sprawdź, czy są poprawnie nazwane w pliku CSV.")
+# --- POBIERANIE WYNIKÓW INTERWAŁOWYCH (PARQUET / FEATHER) ---
+def pobierz_wyniki_interwalowe(wyniki_interwalowe):
+    rozdzielczosc = st.radio("Rozdzielczość:", ['interwal', 'h', 'D'], horizontal=True, key='rozdzielczosc_eksportu',
+                             format_func={'interwal': 'Interwał pomiarowy', 'h': 'Godzinowa', 'D': 'Dobowa'}.get)
+    if rozdzielczosc == 'interwal':
+        tabela = wyniki_interwalowe
+        st.caption(f"{len(wyniki_interwalowe):,} interwałów: przepływy energii [kWh], SoC magazynu i saldo portfela.")
+    else:
+        tabela = agreguj_wyniki(wyniki_interwalowe, rozdzielczosc)
+        st.dataframe(tabela.head(48), height=240)
+
+    kolumny = st.columns(len(FORMATY_ZAPISU))
+    for kolumna, format_zapisu in zip(kolumny, FORMATY_ZAPISU):
+        # Plik tworzony dopiero po kliknięciu (data jako funkcja), nie przy każdym przeliczeniu
+        kolumna.download_button(
+            f"⬇️ Pobierz {format_zapisu.capitalize()}",
+            data=lambda f=format_zapisu: do_bajtow(tabela, f),
+            file_name=f"bilans_{rozdzielczosc}{ROZSZERZENIA[format_zapisu]}",
+            mime='application/octet-stream', key=f'pobierz_{format_zapisu}',
+        )
+
+
+# --- MAPA CIEPŁA OKRESU ZWROTU DLA SIATKI WARIANTÓW PV × ESS ---
+def generuj_mape_wariantow(tabela_wariantow):
+    with odcinek('mapa_wariantow'):
+        fig = mapa_wariantow(tabela_wariantow)
+        st.pyplot(fig)
+        plt.close(fig)
+
+
+# --- WYNIKI POJEDYNCZEJ SYMULACJI (KARTY st.metric + WYKRES BILANSU) ---
+def pokaz_wyniki(results, parametry):
+    roczne = results['wyniki_roczne']
+    zasady = results['zasady_taryfy']
+
+    st.header("Wyniki Końcowe i Finansowe")
+
+    colA, colB, colC = st.columns(3)
+
+    # Kolumna 1: ZWROT I OSZCZĘDNOŚCI (udział zwrotu nadwyżki portfela i opłaty stałe z wybranej taryfy)
+    opis_oszczednosci = f"Zysk z AC + {zasady['udzial_zwrotu_portfela'] * 100:.0f}% z eksportu"
+    if zasady['oplaty_stale'] > 0:
+        opis_oszczednosci += f", opłaty stałe {zasady['oplaty_stale']:,.0f} PLN/rok także bez instalacji"
+    colA.metric("Oszczędności Całkowite Rocznie", 
+                f"{roczne['Oszczędności całkowite']:,.0f} PLN", 
+                opis_oszczednosci)
+
+    zwrot_text = f"{roczne['Okres zwrotu (lat)']:.1f} lat" if roczne['Okres zwrotu (lat)'] != float('inf') else "NIGDY"
+    colA.metric("⏱️ Okres Zwrotu Inwestycji (Ostateczny)", 
+                zwrot_text)
+
+    # Kolumna 2: EFEKTYWNOŚĆ ENERGETYCZNA
+    colB.metric("Procent Samo-Wystarczalności", 
+                f"{roczne['Procent samo-wystarczalności']:,.1f} %", 
+                "Ile zużycia pokrywa instalacja")
+    colB.metric("Procent Samo-Zużycia", 
+                f"{roczne['Procent samo-zużycia']:,.1f} %", 
+                "Ile produkcji jest zużywane na miejscu")
+
+    # Kolumna 3: KOSZTY
+    colC.metric("Koszt Inwestycji Całkowity (Ostateczny)", 
+                f"{roczne['Koszt inwestycji Całkowity']:,.0f} PLN") # Zaktualizowany klucz
+    if roczne['Wartość Dotacji'] > 0:
+         colC.metric("Wartość Dotacji", 
+                     f"-{roczne['Wartość Dotacji']:,.0f} PLN", 
+                     help="Dotacja na ESS i Wiatr (z nowymi limitami)")
+    if roczne['Wartość Odliczenia (Ulga)'] > 0:
+         colC.metric("Zwrot PIT (Ulga Termom.)", 
+                     f"-{roczne['Wartość Odliczenia (Ulga)']:,.0f} PLN", 
+                     help=f"Ulga termomodernizacyjna wg stawki {parametry['stawka_podatkowa_procent']:.1f}%")
+
+
+    st.subheader("Roczny Bilans Energetyczny (Wykres)")
+    st.caption(f"Produkcja PV: {roczne['Produkcja PV [kWh]']:,.0f} kWh | Produkcja Wiatr: {roczne['Produkcja Wiatr [kWh]']:,.0f} kWh")
+
+    with odcinek('wykres_bilansu'):
+        generuj_wykres_bilansu_rocznego(results, parametry)
+
+    if 'interwaly' in results:
+        with st.expander("💾 Wyniki interwałowe (audyt, raport dla klienta)"):
+            pobierz_wyniki_interwalowe(results['interwaly'])
+
+
+# --- SZYBKI PODGLĄD (DANE ZAGREGOWANE / DNI TYPOWE) NA CZAS DOKŁADNEGO PRZELICZENIA W TLE ---
+# `szacunek` - oszacuj_blad_podgladu dla danych zagregowanych (None dla dni typowych)
+def pokaz_podglad(podglad, okres, szacunek):
+    st.caption(f"⏳ Podgląd ({OKRESY_PODGLADU[okres].lower()}) - trwa dokładne przeliczenie...")
+    colA, colB, colC = st.columns(3)
+    colA.metric("Oszczędności Całkowite Rocznie (podgląd)", f"{podglad['Oszczędności całkowite']:,.0f} PLN",
+                help=None if szacunek is None else
+                f"Podgląd może je zawyżyć najwyżej o ok. {szacunek['Górne oszacowanie błędu oszczędności [PLN]']:,.0f} PLN")
+    zwrot_text = f"{podglad['Okres zwrotu (lat)']:.1f} lat" if podglad['Okres zwrotu (lat)'] != float('inf') else "NIGDY"
+    colB.metric("⏱️ Okres Zwrotu (podgląd)", zwrot_text)
+    colC.metric("Procent Samo-Wystarczalności (podgląd)", f"{podglad['Procent samo-wystarczalności']:,.1f} %")
+
+
+def pokaz_dokladnosc_podgladu(podglad, dokladny, okres, szacunek):
+    with st.expander(f"🎯 Dokładność podglądu ({OKRESY_PODGLADU[okres].lower()})"):
+        st.dataframe(roznice_wynikow(podglad, dokladny).style.format('{:,.2f}'))
+        if szacunek is not None:
+            st.caption(f"Szacunek przed przeliczeniem (bez magazynu): "
+                       f"{szacunek['Energia netowana w okresach [kWh]']:,.0f} kWh produkcji i zużycia mijających się "
+                       f"w obrębie okresu, co najwyżej {szacunek['Górne oszacowanie błędu oszczędności [PLN]']:,.0f} PLN "
+                       f"zawyżenia oszczędności.")
+
+
+# --- TRYB NA ŻYWO: POMIAR CZASU PRZELICZEŃ ---
+def _zresetuj_tryb_na_zywo():
+    st.session_state['czasy_przeliczen'] = []
+    st.session_state['tryb_na_zywo_zbyt_wolny'] = False
+
+
+def _zapisz_czas_przeliczenia(czas_s):
+    # Dwa kolejne przeliczenia powyżej limitu wyłączają tryb na żywo (pojedyncze może być np. kompilacją JIT)
+    czasy = (st.session_state.get('czasy_przeliczen', []) + [czas_s])[-2:]
+    st.session_state['czasy_przeliczen'] = czasy
+    if len(czasy) == 2 and min(czasy) > LIMIT_PRZELICZENIA_NA_ZYWO_S:
+        st.session_state['tryb_na_zywo_zbyt_wolny'] = True
+
+
+# --- PANEL DIAGNOSTYCZNY (CZASY ETAPÓW, LICZNIKI WIERSZY, PAMIĘĆ, PROFIL; patrz pomiary.py) ---
+# Pomiar obejmuje całe przejście skryptu. Przełączniki są na końcu panelu bocznego, a pomiar
+# startuje przed wczytaniem danych - stąd odczyt ich stanu z st.session_state.
+def rozpocznij_diagnostyke():
+    if not st.session_state.get('diagnostyka'):
         return None
+    return rozpocznij_pomiar(sledz_pamiec=st.session_state.get('diagnostyka_pamiec', False),
+                             profiluj=st.session_state.get('diagnostyka_profil', False))
 
-    for col in REQUIRED_COLS:
-        df_cleaned[col] = convert_to_numeric(df_cleaned[col])
-
-    df_cleaned[col_konsumpcja] = df_cleaned[col_konsumpcja].fillna(0)
-    df_cleaned[col_produkcja_pv_1kwp] = df_cleaned[col_produkcja_pv_1kwp].fillna(0)
-
-    for col in [col_cena_eksportu, col_cena_energii, col_koszt_dystrybucji]:
-        mean_val = df_cleaned[col].mean()
-        df_cleaned[col] = df_cleaned[col].fillna(mean_val if pd.notna(mean_val) else 0)
 
-    df = df_cleaned.dropna(subset=REQUIRED_COLS, how='all').copy() 
-
-    SUMA_KONSUMPCJI_KWH = df[col_konsumpcja].sum() 
-    # Dodanie obliczenia kosztu bez PV dla oszczędności
-    koszt_bez_pv = (df[col_konsumpcja] * (df[col_cena_energii] + df[col_koszt_dystrybucji])).sum()
-    
-    if moc_turbina_kw > 0:
-        df['Produkcja_Wiatr_Kwh'] = generuj_produkcje_wiatrowa(df, roczna_produkcja_docelowa_kwh)
-    else:
-        df['Produkcja_Wiatr_Kwh'] = 0.0
+def pokaz_panel_diagnostyki(pomiar_strony):
+    st.sidebar.markdown("---")
+    if not st.sidebar.toggle("🐞 Diagnostyka wydajności", key='diagnostyka'):
+        return
+    st.sidebar.checkbox("Śledź szczyt pamięci (tracemalloc, wolniej)", key='diagnostyka_pamiec')
+    st.sidebar.checkbox("Profil cProfile (wolniej)", key='diagnostyka_profil')
+    if pomiar_strony is None:
+        st.sidebar.caption("Pomiar obejmie następne przeliczenie strony.")
+        return
 
-    # --- PĘTLA SYMULACYJNA (NIEZMIENIONA) ---
-    moce_kwp = [moc_pv_kwp] 
-    raport_miesieczny_dane = []
-    
-    # Stan naładowania magazynu
-    ess_soc_kwh = ess_pojemnosc_kwh / 2 
-    
-    # Zmienne roczne
-    oszczednosci_kompensacja_suma = 0 
-    koszt_dystrybucji_suma = 0 
-    koszt_energii_do_zaplaty = 0 
-    portfel_pln = 0 
-    suma_autokonsumpcji_pv_kwh = 0
-    suma_autokonsumpcji_wiatr_kwh = 0
-    suma_autokonsumpcji_z_ess_kwh = 0 
-    suma_produkcji_pv_kwh = 0
-    suma_produkcji_wiatr_kwh = 0
-    suma_wyslana_do_sieci_kwh = 0
-    
-    aktualny_miesiac = None
-    koszt_dystrybucji_suma_miesiac = 0
-    koszt_energii_do_zaplaty_miesiac = 0
-    portfel_pln_poczatek_miesiac = 0
-    
-    suma_produkcji_miesiac = 0
-    suma_konsumpcji_miesiac = 0
-    suma_autokonsumpcji_miesiac = 0
-    suma_sprzedazy_miesiac = 0
-    suma_zakupu_miesiac = 0
-    suma_ac_pv_miesiac = 0
-    suma_ac_wiatr_miesiac = 0
-    suma_ac_ess_miesiac = 0
-
-    # Główna pętla symulacyjna
-    for index, row in df.iterrows():
-        
-        # Logika do agregacji miesięcznej
-        if 'Miesiąc_Rok' in df.columns:
-            miesiac_rok = row.get('Miesiąc_Rok')
-            
-            if pd.isna(miesiac_rok):
-                pass
-            
-            elif aktualny_miesiac is None or miesiac_rok != aktualny_miesiac:
-                if aktualny_miesiac is not None and moc_pv_kwp == moc_pv_kwp: 
-                    rachunek_miesiac = (koszt_dystrybucji_suma_miesiac + koszt_energii_do_zaplaty_miesiac)
-                    
-                    raport_miesieczny_dane.append({
-                        'Miesiąc': aktualny_miesiac,
-                        'Portfel_PLN_Poczatek': portfel_pln_poczatek_miesiac,
-                        'Portfel_PLN_Koniec': portfel_pln,
-                        'Rachunek_Do_Zaplaty_PLN': rachunek_miesiac,
-                        'Produkcja_KWh': suma_produkcji_miesiac,
-                        'Autokonsumpcja_KWh': suma_autokonsumpcji_miesiac,
-                        'Zakup_Siec_KWh': suma_zakupu_miesiac,
-                        'Sprzedaz_Siec_KWh': suma_sprzedazy_miesiac,
-                        'AC_PV_KWh': suma_ac_pv_miesiac,
-                        'AC_Wiatr_KWh': suma_ac_wiatr_miesiac,
-                        'AC_ESS_KWh': suma_ac_ess_miesiac,
-                        'KWP': moc_pv_kwp
-                    })
-
-                # Wyzerowanie liczników dla nowego miesiąca
-                aktualny_miesiac = miesiac_rok
-                portfel_pln_poczatek_miesiac = portfel_pln
-                koszt_dystrybucji_suma_miesiac = 0
-                koszt_energii_do_zaplaty_miesiac = 0
-                suma_produkcji_miesiac = 0
-                suma_konsumpcji_miesiac = 0
-                suma_autokonsumpcji_miesiac = 0
-                suma_sprzedazy_miesiac = 0
-                suma_zakupu_miesiac = 0
-                suma_ac_pv_miesiac = 0
-                suma_ac_wiatr_miesiac = 0
-                suma_ac_ess_miesiac = 0
-
-
-        # OBLICZENIA BILANSU ENERGETYCZNEGO (Niezmienione)
-        produkcja_pv = moc_pv_kwp * row[col_produkcja_pv_1kwp]
-        produkcja_wiatr = row['Produkcja_Wiatr_Kwh']
-        
-        suma_produkcji_pv_kwh += produkcja_pv
-        suma_produkcji_wiatr_kwh += produkcja_wiatr
-        
-        suma_produkcji_miesiac += produkcja_pv + produkcja_wiatr
-        konsumpcja = row[col_konsumpcja]
-        suma_konsumpcji_miesiac += konsumpcja 
-        
-        pozostala_konsumpcja = konsumpcja
-        
-        # KROK 1: Autokonsumpcja bezposrednia (PV + Wiatr)
-        autokonsumpcja_z_pv = min(produkcja_pv, pozostala_konsumpcja)
-        suma_autokonsumpcji_pv_kwh += autokonsumpcja_z_pv
-        suma_ac_pv_miesiac += autokonsumpcja_z_pv 
-        pozostala_konsumpcja -= autokonsumpcja_z_pv
-        nadwyzka_pv = produkcja_pv - autokonsumpcja_z_pv
-        
-        autokonsumpcja_z_wiatru = min(produkcja_wiatr, pozostala_konsumpcja)
-        suma_autokonsumpcji_wiatr_kwh += autokonsumpcja_z_wiatru
-        suma_ac_wiatr_miesiac += autokonsumpcja_z_wiatru 
-        pozostala_konsumpcja -= autokonsumpcja_z_wiatru
-        nadwyzka_wiatr = produkcja_wiatr - autokonsumpcja_z_wiatru
-        
-        nadwyzka_calkowita_do_zagospodarowania = nadwyzka_pv + nadwyzka_wiatr
-        niedobor_po_ac = pozostala_konsumpcja
-        
-        energia_z_ess = 0 
-        
-        # LOGIKA ESS (TYLKO AUTOKONSUMPCJA)
-        
-        # A. Nadwyżka (Ładowanie ESS)
-        energia_do_magazynu = 0
-        if nadwyzka_calkowita_do_zagospodarowania > 0:
-            brakuje_do_pelna = ess_pojemnosc_kwh - ess_soc_kwh
-            max_mozemy_zaladowac_netto = min(brakuje_do_pelna, ESS_LADOWANIE_LIMIT_KWH)
-            energia_do_pobrania = max_mozemy_zaladowac_netto / ESS_RT_EFFICIENCY
-            energia_do_magazynu = min(nadwyzka_calkowita_do_zagospodarowania, energia_do_pobrania)
-            
-            if energia_do_magazynu > 0:
-                ess_soc_kwh += energia_do_magazynu * ESS_RT_EFFICIENCY
-                nadwyzka_calkowita_do_zagospodarowania -= energia_do_magazynu
-                
-        # B. Niedobór (Rozładowanie ESS dla zużycia własnego)
-        if niedobor_po_ac > 0:
-            max_mozemy_rozladowac = min(ess_soc_kwh, ESS_ROZLADOWANIE_LIMIT_KWH)
-            ilosc_potrzebna = niedobor_po_ac
-            energia_z_ess = min(ilosc_potrzebna, max_mozemy_rozladowac)
-            
-            if energia_z_ess > 0:
-                ess_soc_kwh -= energia_z_ess
-                niedobor_po_ac -= energia_z_ess
-                suma_autokonsumpcji_z_ess_kwh += energia_z_ess
-                suma_ac_ess_miesiac += energia_z_ess 
-
-        # Zwiększanie licznika miesięcznego Autokonsumpcji
-        suma_autokonsumpcji_miesiac += autokonsumpcja_z_pv + autokonsumpcja_z_wiatru + energia_z_ess
-        
-        # D. Wysłanie pozostałej Nadwyżki do Sieci (Net-billing)
-        if nadwyzka_calkowita_do_zagospodarowania > 0:
-            energia_wyslana_do_sieci = nadwyzka_calkowita_do_zagospodarowania
-            
-            cena_sprzedazy = row[col_cena_eksportu]
-            if cena_sprzedazy < 0:
-                cena_sprzedazy = 0.0 
-
-            portfel_pln += energia_wyslana_do_sieci * cena_sprzedazy
-            suma_wyslana_do_sieci_kwh += energia_wyslana_do_sieci
-            suma_sprzedazy_miesiac += energia_wyslana_do_sieci 
-            
-        # E. Pobranie z Sieci (pozostały Niedobór)
-        if niedobor_po_ac > 0:
-            
-            koszt_dystrybucji_dodatek = niedobor_po_ac * row[col_koszt_dystrybucji]
-            koszt_dystrybucji_suma += koszt_dystrybucji_dodatek
-            if aktualny_miesiac is not None:
-                koszt_dystrybucji_suma_miesiac += koszt_dystrybucji_dodatek
-            
-            koszt_energii_czynnej = niedobor_po_ac * row[col_cena_energii] 
-            
-            kompensacja_z_portfela = min(portfel_pln, koszt_energii_czynnej)
-            portfel_pln -= kompensacja_z_portfela
-            oszczednosci_kompensacja_suma += kompensacja_z_portfela
-            
-            pozostaly_koszt_do_zaplaty = koszt_energii_czynnej - kompensacja_z_portfela
-            koszt_energii_do_zaplaty += pozostaly_koszt_do_zaplaty
-            if aktualny_miesiac is not None:
-                koszt_energii_do_zaplaty_miesiac += pozostaly_koszt_do_zaplaty
-            
-            portfel_pln = max(0, portfel_pln)
-            
-            suma_zakupu_miesiac += niedobor_po_ac 
-
-    # Zapis ostatniego miesiąca po pętli rocznej
-    if 'Miesiąc_Rok' in df.columns and moc_pv_kwp == moc_pv_kwp and aktualny_miesiac is not None:
-        rachunek_miesiac = (koszt_dystrybucji_suma_miesiac + koszt_energii_do_zaplaty_miesiac)
-        raport_miesieczny_dane.append({
-            'Miesiąc': aktualny_miesiac,
-            'Portfel_PLN_Poczatek': portfel_pln_poczatek_miesiac,
-            'Portfel_PLN_Koniec': portfel_pln,
-            'Rachunek_Do_Zaplaty_PLN': rachunek_miesiac,
-            'Produkcja_KWh': suma_produkcji_miesiac,
-            'Autokonsumpcja_KWh': suma_autokonsumpcji_miesiac,
-            'Zakup_Siec_KWh': suma_zakupu_miesiac,
-            'Sprzedaz_Siec_KWh': suma_sprzedazy_miesiac,
-            'AC_PV_KWh': suma_ac_pv_miesiac,
-            'AC_Wiatr_KWh': suma_ac_wiatr_miesiac,
-            'AC_ESS_KWh': suma_ac_ess_miesiac,
-            'KWP': moc_pv_kwp
-        })
-
-
-    # KROK 4: Obliczenia końcowe (roczne)
-    
-    rachunek_po_pv = koszt_dystrybucji_suma + koszt_energii_do_zaplaty
-    
-    # Obliczenie oszczędności z uniknięcia zakupu (koszt bez PV - rachunek po PV)
-    oszczednosci_z_unikniecia_zakupu = koszt_bez_pv - rachunek_po_pv
-    
-    portfel_pln_przed_wyplata = portfel_pln
-    wyplata_z_portfela = portfel_pln * 0.30 
-    
-    oszczednosci_calkowite_roczne = oszczednosci_z_unikniecia_zakupu + wyplata_z_portfela
-    
-    okres_zwrotu = koszt_inwestycji_netto / oszczednosci_calkowite_roczne if oszczednosci_calkowite_roczne > 0 else float('inf')
-    
-    suma_calkowita_produkcji_kwh = suma_produkcji_pv_kwh + suma_produkcji_wiatr_kwh
-    suma_calkowita_autokonsumpcji_kwh = suma_autokonsumpcji_pv_kwh + suma_autokonsumpcji_wiatr_kwh + suma_autokonsumpcji_z_ess_kwh
-    
-    procent_samo_zuzycia = (suma_calkowita_autokonsumpcji_kwh / suma_calkowita_produkcji_kwh) * 100 if suma_calkowita_produkcji_kwh > 0 else 0.0
-    procent_samo_wystarczalnosci = (suma_calkowita_autokonsumpcji_kwh / SUMA_KONSUMPCJI_KWH) * 100 if SUMA_KONSUMPCJI_KWH > 0 else 0.0
-
-    # Zwrócenie wyników rocznych i miesięcznych (klucze dostosowane do netbilling2.py)
-    return {
-        'wyniki_roczne': {
-            'Oszczędności całkowite': oszczednosci_calkowite_roczne,
-            'Rachunek do zapłaty': rachunek_po_pv,
-            'Koszt inwestycji Całkowity': koszt_inwestycji_netto, # Zmieniony klucz
-            'Okres zwrotu (lat)': okres_zwrotu,
-            'Procent samo-wystarczalności': procent_samo_wystarczalnosci, 
-            'Procent samo-zużycia': procent_samo_zuzycia,
-            'Produkcja PV [kWh]': suma_produkcji_pv_kwh,
-            'Produkcja Wiatr [kWh]': suma_produkcji_wiatr_kwh,
-            'Wartość Dotacji': dotacja_calkowita,
-            'Wartość Odliczenia (Ulga)': ulga_wartosc_pln,
-        },
-        'raport_miesieczny_dane': raport_miesieczny_dane
-    }
+    zakoncz_pomiar(pomiar_strony)
+    raport = pomiar_strony.jako_slownik()
+    st.sidebar.metric("Czas przejścia strony", f"{raport['czas_calkowity_s'] * 1000:,.0f} ms")
+    if raport['odcinki']:
+        st.sidebar.dataframe(pd.DataFrame(raport['odcinki']).set_index('odcinek').style.format(
+            {'czas_s': "{:.4f}", 'udzial_procent': "{:.1f}"}))
+    if raport['liczniki']:
+        st.sidebar.json(raport['liczniki'], expanded=False)
+    pamiec = [f"szczyt alokacji: {raport['szczyt_pamieci_mb']:,.1f} MB" if raport['szczyt_pamieci_mb'] is not None else None,
+              f"szczyt procesu (RSS): {raport['szczyt_rss_mb']:,.0f} MB" if raport['szczyt_rss_mb'] is not None else None]
+    if any(pamiec):
+        st.sidebar.caption("Pamięć - " + ", ".join(p for p in pamiec if p))
+    st.sidebar.download_button("⬇️ Pomiary (JSON)", data=json.dumps(raport, ensure_ascii=False, indent=2),
+                               file_name='pomiary.json', mime='application/json', key='pobierz_pomiary')
+    if pomiar_strony.profiler is not None:
+        st.sidebar.download_button("⬇️ Profil cProfile (.prof)", data=profil_bajty(pomiar_strony),
+                                   file_name='profil.prof', mime='application/octet-stream', key='pobierz_profil')
+        with st.sidebar.expander("Najdroższe funkcje"):
+            st.code(profil_tekst(pomiar_strony, limit=25))
 
 
 # =========================================================================
@@ -493,16 +235,29 @@ def run_simulation(moc_pv_kwp, koszt_pv_total, moc_turbina_kw, koszt_turbiny_wia
 
 st.set_page_config(page_title="Kalkulator Net-billing PV+Wiatr+ESS", layout="wide")
 st.title("☀️ Kalkulator Net-billing: PV + Wiatr + Magazyn Energii")
+pomiar_strony = rozpocznij_diagnostyke()
 
 # Sekcja wczytywania ukrytych danych
 try:
     file_path = 'dane_zuzycia.csv'
-    # Streamlit Cloud wczytuje plik bezpośrednio z repozytorium
-    df_dane = pd.read_csv(file_path, delimiter=';', encoding='utf-8-sig', low_memory=False)
-    st.info(f"Pomyślnie wczytano dane zużycia z pliku **{file_path}**.")
+    # Streamlit Cloud wczytuje plik bezpośrednio z repozytorium; parsowanie i czyszczenie
+    # odbywa się raz na zawartość pliku (pamięć procesu + plik .cache.npz), nie przy każdym kliknięciu
+    df_dane = wczytaj_dane(file_path)
+    rozdz = rozdzielczosc(df_dane.data)
+    st.info(f"Pomyślnie wczytano dane zużycia z pliku **{file_path}** "
+            f"({len(df_dane):,} interwałów, krok {rozdz.interwal_h * 60:.0f} min).")
+    if not rozdz.regularna:
+        kroki = ", ".join(f"{krok:.0f} min: {udzial * 100:.1f}%" for krok, udzial in rozdz.udzialy_krokow.items())
+        st.warning(f"⚠️ Dane o zmiennym kroku pomiarowym ({kroki}"
+                   + (f"; luki w pomiarach: {rozdz.liczba_luk}" if rozdz.liczba_luk else "")
+                   + "). Limity mocy magazynu liczone są dla każdego interwału osobno.")
 except FileNotFoundError:
     st.error(f"❌ BŁĄD: Ukryty plik danych '{file_path}' nie został znaleziony. Upewnij się, że jest w repozytorium.")
     df_dane = None
+except ValueError as e:
+    # Błędy czyszczenia danych (daty, brakujące kolumny) mają już gotowy komunikat
+    st.error(str(e))
+    df_dane = None
 except Exception as e:
     st.error(f"❌ BŁĄD wczytywania ukrytego pliku: {e}")
     df_dane = None
@@ -539,6 +294,8 @@ if df_dane is not None:
                                              min_value=0.1, value=5.0, step=0.5, format="%.1f")
     ess_moc_rozladowania_kw = col2.number_input("Moc rozładowania [kW]:", 
                                                 min_value=0.1, value=5.0, step=0.5, format="%.1f")
+    strategia_ess = st.sidebar.selectbox("Strategia pracy magazynu:", list(STRATEGIE_ESS),
+                                         format_func=OPISY_STRATEGII_ESS.get)
 
     # --- Sekcja Ulgi i Dotacje ---
     st.sidebar.subheader("4. Finansowanie")
@@ -550,63 +307,292 @@ if df_dane is not None:
         stawka_podatkowa_procent = st.sidebar.slider("Stawka podatkowa PIT [%]:", 
                                                      min_value=0.0, max_value=32.0, value=18.0, step=0.5, format="%.1f")
 
+    # --- Sekcja Taryfa (patrz taryfy.py) ---
+    st.sidebar.subheader("5. Taryfa i net-billing")
+    wybor_taryfy = st.sidebar.selectbox("Taryfa:", [None, *TARYFY_WBUDOWANE, 'plik'],
+                                        format_func=lambda t: ('Ceny z pliku danych' if t is None else
+                                                               'Własna (plik JSON/YAML)' if t == 'plik' else
+                                                               TARYFY_WBUDOWANE[t]['nazwa']))
+    taryfa = wybor_taryfy
+    if wybor_taryfy == 'plik':
+        plik_taryfy = st.sidebar.file_uploader("Plik taryfy:", type=['json', 'yaml', 'yml'])
+        taryfa = None
+        if plik_taryfy is not None:
+            try:
+                taryfa = taryfa_z_bajtow(plik_taryfy.getvalue(), '.' + plik_taryfy.name.rsplit('.', 1)[-1])
+            except ValueError as e:
+                st.sidebar.error(str(e))
+    if taryfa is not None:
+        zasady = wczytaj_taryfe(taryfa)['net_billing']
+        st.sidebar.caption(f"Zwrot nadwyżki portfela: {zasady['zwrot_nadwyzki_procent']:.0f}%, wygasanie środków: "
+                           + (f"po {zasady['wygasanie_portfela_miesiace']} mies." if zasady['wygasanie_portfela_miesiace']
+                              else "brak"))
+
+    # Bieżące ustawienia z panelu bocznego (klucze jak argumenty run_simulation)
+    parametry_symulacji = {
+        'moc_pv_kwp': moc_pv_kwp, 'koszt_pv_total': koszt_pv_total, 'moc_turbina_kw': moc_turbina_kw,
+        'koszt_turbiny_wiatrowej': koszt_turbiny_wiatrowej, 'ess_pojemnosc_kwh': ess_pojemnosc_kwh,
+        'ess_moc_ladowania_kw': ess_moc_ladowania_kw, 'ess_moc_rozladowania_kw': ess_moc_rozladowania_kw,
+        'cena_magazynu_total': cena_magazynu_total, 'korzysta_z_dotacji': korzysta_z_dotacji,
+        'korzysta_z_ulgi_termomodernizacyjnej': korzysta_z_ulgi_termomodernizacyjnej,
+        'stawka_podatkowa_procent': stawka_podatkowa_procent, 'procent_pracy_turbiny': procent_pracy_turbiny,
+    }
+
     st.markdown("---")
-    if st.button("🚀 Uruchom Symulację Net-billing"):
+    # --- TRYB NA ŻYWO: PRZELICZENIE PRZY KAŻDEJ ZMIANIE USTAWIEŃ ---
+    # Etapy run_simulation są zapamiętane (kalkulator.py): zmiana finansów to ułamek milisekundy,
+    # zmiana PV czy magazynu - jedno przejście pętli silnika. Gdy mimo to przeliczenia są wolne
+    # (np. arbitraż cenowy), aplikacja wraca do uruchamiania przyciskiem.
+    tryb_na_zywo = st.toggle("⚡ Tryb na żywo (przeliczaj przy każdej zmianie ustawień)", key='tryb_na_zywo',
+                             on_change=_zresetuj_tryb_na_zywo)
+    okres_podgladu = st.selectbox("Szybki podgląd (wynik przybliżony od razu, dokładny po przeliczeniu w tle):",
+                                  list(OKRESY_PODGLADU), format_func=OKRESY_PODGLADU.get, key='okres_podgladu')
+    if tryb_na_zywo and st.session_state.get('tryb_na_zywo_zbyt_wolny'):
+        st.info(f"Przeliczenia trwają dłużej niż {LIMIT_PRZELICZENIA_NA_ZYWO_S * 1000:.0f} ms - "
+                "tryb na żywo wstrzymany, uruchom symulację przyciskiem.")
+        tryb_na_zywo = False
+
+    # Ostatni wynik zostaje w sesji: wybór miesiąca na wykresie (ponowne uruchomienie skryptu)
+    # pokazuje go dalej bez liczenia, dopóki ustawienia się nie zmienią
+    klucz_wynikow = (tuple(parametry_symulacji.items()), strategia_ess,
+                     None if taryfa is None else skrot_taryfy(wczytaj_taryfe(taryfa)))
+    if tryb_na_zywo or st.button("🚀 Uruchom Symulację Net-billing"):
         
         if moc_pv_kwp + moc_turbina_kw == 0:
             st.warning("Wprowadź moc co najmniej jednej instalacji (PV lub Wiatr).")
         else:
-            with st.spinner('Trwa obliczanie rocznej symulacji i wyników finansowych...'):
+            with (contextlib.nullcontext() if tryb_na_zywo
+                  else st.spinner('Trwa obliczanie rocznej symulacji i wyników finansowych...')):
                 
                 # Uruchomienie Głównej Logiki
-                results = run_simulation(
-                    moc_pv_kwp, koszt_pv_total, moc_turbina_kw, koszt_turbiny_wiatrowej, 
-                    ess_pojemnosc_kwh, ess_moc_ladowania_kw, ess_moc_rozladowania_kw, 
-                    cena_magazynu_total, korzysta_z_dotacji, korzysta_z_ulgi_termomodernizacyjnej, 
-                    stawka_podatkowa_procent, procent_pracy_turbiny, df_dane
-                )
+                start = time.perf_counter()
+                argumenty = (moc_pv_kwp, koszt_pv_total, moc_turbina_kw, koszt_turbiny_wiatrowej,
+                             ess_pojemnosc_kwh, ess_moc_ladowania_kw, ess_moc_rozladowania_kw,
+                             cena_magazynu_total, korzysta_z_dotacji, korzysta_z_ulgi_termomodernizacyjnej,
+                             stawka_podatkowa_procent, procent_pracy_turbiny, df_dane)
+                podglad = None
+                try:
+                    if okres_podgladu is None:
+                        results = run_simulation(*argumenty, strategia_ess=strategia_ess, zwroc_interwaly=True,
+                                                 taryfa=taryfa)
+                    else:
+                        # Dokładny przebieg startuje w tle, zanim policzy się i wyświetli podgląd
+                        dokladny = przelicz_w_tle(*argumenty, strategia_ess=strategia_ess, zwroc_interwaly=True,
+                                                  taryfa=taryfa)
+                        podglad = run_simulation(*argumenty, strategia_ess=strategia_ess, taryfa=taryfa,
+                                                 rozdzielczosc=okres_podgladu)['wyniki_roczne']
+                        szacunek = (None if okres_podgladu == TRYB_DNI_TYPOWYCH else
+                                    oszacuj_blad_podgladu(df_dane, parametry_symulacji, okres_podgladu, taryfa=taryfa))
+                        miejsce_podgladu = st.empty()
+                        with miejsce_podgladu.container():
+                            pokaz_podglad(podglad, okres_podgladu, szacunek)
+                        results = dokladny.result()
+                        miejsce_podgladu.empty()
+                except ValueError as e:
+                    st.error(str(e))
+                    results = None
+                czas_przeliczenia = time.perf_counter() - start
+                if tryb_na_zywo:
+                    _zapisz_czas_przeliczenia(czas_przeliczenia)
                 
                 # WYŚWIETLANIE WYNIKÓW STREAMLIT
                 if results is not None:
-                    roczne = results['wyniki_roczne']
-                    miesieczne_dane = results['raport_miesieczny_dane']
-                    
-                    st.header("Wyniki Końcowe i Finansowe")
-                    
-                    colA, colB, colC = st.columns(3)
-                    
-                    # Kolumna 1: ZWROT I OSZCZĘDNOŚCI
-                    colA.metric("Oszczędności Całkowite Rocznie", 
-                                f"{roczne['Oszczędności całkowite']:,.0f} PLN", 
-                                "Zysk z AC + 30% z eksportu")
-                    
-                    zwrot_text = f"{roczne['Okres zwrotu (lat)']:.1f} lat" if roczne['Okres zwrotu (lat)'] != float('inf') else "NIGDY"
-                    colA.metric("⏱️ Okres Zwrotu Inwestycji (Ostateczny)", 
-                                zwrot_text)
-
-                    # Kolumna 2: EFEKTYWNOŚĆ ENERGETYCZNA
-                    colB.metric("Procent Samo-Wystarczalności", 
-                                f"{roczne['Procent samo-wystarczalności']:,.1f} %", 
-                                "Ile zużycia pokrywa instalacja")
-                    colB.metric("Procent Samo-Zużycia", 
-                                f"{roczne['Procent samo-zużycia']:,.1f} %", 
-                                "Ile produkcji jest zużywane na miejscu")
-                                
-                    # Kolumna 3: KOSZTY
-                    colC.metric("Koszt Inwestycji Całkowity (Ostateczny)", 
-                                f"{roczne['Koszt inwestycji Całkowity']:,.0f} PLN") # Zaktualizowany klucz
-                    if roczne['Wartość Dotacji'] > 0:
-                         colC.metric("Wartość Dotacji", 
-                                     f"-{roczne['Wartość Dotacji']:,.0f} PLN", 
-                                     help="Dotacja na ESS i Wiatr (z nowymi limitami)")
-                    if roczne['Wartość Odliczenia (Ulga)'] > 0:
-                         colC.metric("Zwrot PIT (Ulga Termom.)", 
-                                     f"-{roczne['Wartość Odliczenia (Ulga)']:,.0f} PLN", 
-                                     help=f"Ulga termomodernizacyjna wg stawki {stawka_podatkowa_procent:.1f}%")
-
-                    
-                    st.subheader("Roczny Bilans Energetyczny (Wykres)")
-                    st.caption(f"Produkcja PV: {roczne['Produkcja PV [kWh]']:,.0f} kWh | Produkcja Wiatr: {roczne['Produkcja Wiatr [kWh]']:,.0f} kWh")
-                    
-                    # Wywołanie funkcji generującej wykres Matplotlib
-                    generuj_wykres_bilansu_rocznego(miesieczne_dane, moc_pv_kwp, moc_turbina_kw, ess_pojemnosc_kwh)
\ No newline at end of file
+                    st.session_state['ostatnie_wyniki'] = (klucz_wynikow, results)
+                    pokaz_wyniki(results, parametry_symulacji)
+                    if podglad is not None:
+                        pokaz_dokladnosc_podgladu(podglad, results['wyniki_roczne'], okres_podgladu, szacunek)
+                    if tryb_na_zywo:
+                        st.caption(f"Przeliczono w {czas_przeliczenia * 1000:.1f} ms")
+    elif st.session_state.get('ostatnie_wyniki', (None,))[0] == klucz_wynikow:
+        pokaz_wyniki(st.session_state['ostatnie_wyniki'][1], parametry_symulacji)
+
+
+    # --- ANALIZA WARIANTÓW "CO JEŚLI?" (WIELE KONFIGURACJI W JEDNYM PRZEBIEGU) ---
+    st.markdown("---")
+    with st.expander("🔎 Analiza wariantów: moc PV × pojemność magazynu"):
+        colP, colE = st.columns(2)
+        pv_od, pv_do = colP.slider("Zakres mocy PV [kWp]:", min_value=0.0, max_value=30.0, value=(2.0, 12.0), step=0.5)
+        pv_krok = colP.number_input("Krok PV [kWp]:", min_value=0.5, value=1.0, step=0.5, format="%.1f")
+        koszt_pv_za_kwp = colP.number_input("Koszt PV za 1 kWp [zł]:", min_value=0.0, step=100.0, format="%.2f",
+                                            value=koszt_pv_total / moc_pv_kwp if moc_pv_kwp > 0 else 5000.0)
+        ess_od, ess_do = colE.slider("Zakres pojemności ESS [kWh]:", min_value=0.0, max_value=40.0, value=(0.0, 20.0), step=1.0)
+        ess_krok = colE.number_input("Krok ESS [kWh]:", min_value=1.0, value=2.5, step=0.5, format="%.1f")
+        koszt_ess_za_kwh = colE.number_input("Koszt ESS za 1 kWh [zł]:", min_value=0.0, step=100.0, format="%.2f",
+                                             value=cena_magazynu_total / ess_pojemnosc_kwh if ess_pojemnosc_kwh > 0 else 4000.0)
+
+        przyblizenie = st.checkbox("Przybliżenie dniami typowymi (duże siatki; odchylenie od pełnego roku - "
+                                   "patrz szybki podgląd 'Dni typowe')", key='warianty_dni_typowe')
+
+        if st.button("📊 Przelicz warianty"):
+            warianty = siatka_wariantow(parametry_symulacji,
+                                        moc_pv_kwp=np.arange(pv_od, pv_do + pv_krok / 2, pv_krok),
+                                        ess_pojemnosc_kwh=np.arange(ess_od, ess_do + ess_krok / 2, ess_krok))
+            warianty['koszt_pv_total'] = warianty['moc_pv_kwp'] * koszt_pv_za_kwp
+            warianty['cena_magazynu_total'] = warianty['ess_pojemnosc_kwh'] * koszt_ess_za_kwh
+
+            with st.spinner(f'Trwa obliczanie {len(warianty)} wariantów...'):
+                try:
+                    tabela = symuluj_warianty(df_dane, warianty, taryfa=taryfa,
+                                              rozdzielczosc=TRYB_DNI_TYPOWYCH if przyblizenie else None)
+                except ValueError as e:
+                    st.error(str(e))
+                    tabela = None
+
+            if tabela is not None:
+                najlepszy = najlepszy_wariant(tabela)
+                if najlepszy is None:
+                    st.warning("Żaden z wariantów nie zwraca się (brak dodatnich oszczędności).")
+                else:
+                    st.success(f"Najkrótszy okres zwrotu: **{najlepszy['Okres zwrotu (lat)']:.1f} lat** dla "
+                               f"{najlepszy['moc_pv_kwp']:.1f} kWp PV i {najlepszy['ess_pojemnosc_kwh']:.1f} kWh ESS "
+                               f"(oszczędności {najlepszy['Oszczędności całkowite']:,.0f} PLN/rok).")
+                generuj_mape_wariantow(tabela)
+                st.dataframe(tabela)
+
+    # --- PROJEKCJA WIELOLETNIA (NPV, IRR, ZDYSKONTOWANY OKRES ZWROTU) ---
+    with st.expander("📈 Projekcja wieloletnia: degradacja, starzenie magazynu, wzrost cen"):
+        colL, colD, colC = st.columns(3)
+        lata_projekcji = colL.slider("Horyzont [lat]:", min_value=5, max_value=30, value=LATA_PROJEKCJI, step=1)
+        stopa_dyskontowa_procent = colL.number_input("Stopa dyskontowa [%]:", min_value=0.0, max_value=30.0,
+                                                     value=STOPA_DYSKONTOWA * 100, step=0.5, format="%.1f")
+        degradacja_pv_procent = colD.number_input("Degradacja PV [%/rok]:", min_value=0.0, max_value=5.0,
+                                                  value=DEGRADACJA_PV_ROCZNA * 100, step=0.1, format="%.1f")
+        zanik_ess_cykle_procent = colD.number_input("Zanik ESS [% na 1000 cykli]:", min_value=0.0, max_value=50.0,
+                                                    value=ZANIK_ESS_NA_CYKL * 1000 * 100, step=0.5, format="%.2f")
+        zanik_ess_kalendarzowy_procent = colD.number_input("Zanik ESS kalendarzowy [%/rok]:", min_value=0.0, max_value=10.0,
+                                                           value=ZANIK_ESS_KALENDARZOWY * 100, step=0.5, format="%.1f")
+        eskalacja_energii_procent = colC.number_input("Wzrost ceny energii [%/rok]:", min_value=-10.0, max_value=30.0,
+                                                      value=ESKALACJA_CENY_ENERGII * 100, step=0.5, format="%.1f")
+        eskalacja_dystrybucji_procent = colC.number_input("Wzrost kosztu dystrybucji [%/rok]:", min_value=-10.0, max_value=30.0,
+                                                          value=ESKALACJA_DYSTRYBUCJI * 100, step=0.5, format="%.1f")
+        eskalacja_eksportu_procent = colC.number_input("Wzrost ceny eksportu [%/rok]:", min_value=-10.0, max_value=30.0,
+                                                       value=ESKALACJA_CENY_EKSPORTU * 100, step=0.5, format="%.1f")
+
+        if st.button("📈 Oblicz projekcję"):
+            try:
+                with st.spinner('Trwa obliczanie projekcji wieloletniej...'):
+                    projekcja = projekcja_wieloletnia(
+                        df_dane, parametry_symulacji, lata=lata_projekcji,
+                        degradacja_pv_roczna=degradacja_pv_procent / 100,
+                        zanik_ess_na_cykl=zanik_ess_cykle_procent / 100 / 1000,
+                        zanik_ess_kalendarzowy=zanik_ess_kalendarzowy_procent / 100,
+                        eskalacja_ceny_energii=eskalacja_energii_procent / 100,
+                        eskalacja_dystrybucji=eskalacja_dystrybucji_procent / 100,
+                        eskalacja_ceny_eksportu=eskalacja_eksportu_procent / 100,
+                        stopa_dyskontowa=stopa_dyskontowa_procent / 100, taryfa=taryfa,
+                    )
+            except ValueError as e:
+                st.error(str(e))
+                projekcja = None
+
+            if projekcja is not None:
+                podsumowanie = projekcja['podsumowanie']
+                colN, colI, colZ = st.columns(3)
+                colN.metric("NPV", f"{podsumowanie['NPV [PLN]']:,.0f} PLN")
+                colI.metric("IRR", f"{podsumowanie['IRR [%]']:.1f} %" if np.isfinite(podsumowanie['IRR [%]']) else "BRAK")
+                zwrot = podsumowanie['Zdyskontowany okres zwrotu (lat)']
+                colZ.metric("Zdyskontowany okres zwrotu", f"{zwrot:.1f} lat" if np.isfinite(zwrot) else "NIGDY")
+
+                st.line_chart(projekcja['lata'].set_index('Rok')['Skumulowany przepływ zdyskontowany'])
+                st.dataframe(projekcja['lata'])
+
+    # --- PORÓWNANIE STRATEGII PRACY MAGAZYNU ---
+    with st.expander("🔋 Porównanie strategii pracy magazynu"):
+        st.caption("Ta sama konfiguracja z panelu bocznego liczona każdą strategią; arbitraż cenowy planuje "
+                   "ładowanie i rozładowanie na dziś i jutro przy znanych cenach, zużyciu i produkcji.")
+        if st.button("🔋 Porównaj strategie"):
+            if ess_pojemnosc_kwh <= 0:
+                st.warning("Porównanie wymaga magazynu o dodatniej pojemności.")
+            else:
+                try:
+                    with st.spinner('Trwa symulacja strategii...'):
+                        porownanie = porownaj_strategie_ess(df_dane, parametry_symulacji, taryfa=taryfa)
+                except ValueError as e:
+                    st.error(str(e))
+                    porownanie = None
+
+                if porownanie is not None:
+                    porownanie.index = [OPISY_STRATEGII_ESS.get(n, n) for n in porownanie.index]
+                    st.dataframe(porownanie[['Oszczędności całkowite', 'Dodatkowe oszczędności', 'Rachunek do zapłaty',
+                                             'Okres zwrotu (lat)', 'Procent samo-wystarczalności',
+                                             'Czas obliczeń [s]']].style.format("{:,.2f}"))
+
+    # --- ANALIZA NIEPEWNOŚCI: POGODA I CENY (MONTE CARLO) ---
+    with st.expander("🎲 Analiza niepewności: pogoda i ceny (Monte Carlo)"):
+        st.caption("Konfiguracja z panelu bocznego liczona dla wielu losowych lat: uzysk PV, praca turbiny wokół "
+                   "zadanego procentu oraz poziomy i dobowe wahania cen. Magazyn w trybie autokonsumpcji.")
+        colN, colZ = st.columns(2)
+        liczba_scenariuszy = colN.number_input("Liczba scenariuszy:", min_value=100, max_value=10000,
+                                               value=LICZBA_SCENARIUSZY, step=100)
+        ziarno = colZ.number_input("Ziarno losowania (0 = losowe):", min_value=0, value=0, step=1)
+
+        if st.button("🎲 Uruchom analizę Monte Carlo"):
+            if moc_pv_kwp + moc_turbina_kw == 0:
+                st.warning("Wprowadź moc co najmniej jednej instalacji (PV lub Wiatr).")
+            else:
+                try:
+                    with st.spinner('Trwa symulacja scenariuszy...'):
+                        analiza = analiza_monte_carlo(df_dane, parametry_symulacji, int(liczba_scenariuszy),
+                                                      ziarno=int(ziarno) or None, taryfa=taryfa)
+                except ValueError as e:
+                    st.error(str(e))
+                    analiza = None
+
+                if analiza is not None:
+                    tabela = analiza['percentyle']
+                    colP10, colP50, colP90 = st.columns(3)
+                    # Niskie oszczędności to długi zwrot: P10 oszczędności w parze z P90 okresu zwrotu
+                    for kolumna, poziom, poziom_zwrotu in zip((colP10, colP50, colP90), tabela.index, tabela.index[::-1]):
+                        zwrot = tabela.loc[poziom_zwrotu, 'Okres zwrotu (lat)']
+                        kolumna.metric(f"Oszczędności {poziom}", f"{tabela.loc[poziom, 'Oszczędności całkowite']:,.0f} PLN",
+                                       f"zwrot {zwrot:.1f} lat ({poziom_zwrotu})" if np.isfinite(zwrot)
+                                       else f"zwrot: NIGDY ({poziom_zwrotu})", delta_color='off')
+                    st.caption("P10 - wartość, której nie osiąga 10% scenariuszy: 90% scenariuszy daje co najmniej "
+                               "tyle oszczędności, a okres zwrotu nie dłuższy niż P90.")
+                    st.dataframe(tabela.style.format("{:,.2f}"))
+                    st.altair_chart(wykres_rozkladu_scenariuszy(analiza['scenariusze'], 'Okres zwrotu (lat)', tabela,
+                                                                "Rozkład okresu zwrotu"), width='stretch')
+                    st.caption(f"Scenariusze: {len(analiza['scenariusze'])}, czas: {analiza['czas_calkowity_s']:.2f} s")
+
+    # --- DOBÓR OPTYMALNEGO SYSTEMU (PV, POJEMNOŚĆ I MOC MAGAZYNU) ---
+    with st.expander("🧭 Dobór optymalnego systemu: moc PV, pojemność i moc magazynu"):
+        colP, colE = st.columns(2)
+        zakres_pv = colP.slider("Szukana moc PV [kWp]:", min_value=0.0, max_value=50.0, value=(0.0, 20.0), step=0.5)
+        krzywa_pv = colP.text_input("Cena PV [zł/kWp] wg mocy (kWp:zł/kWp):", value="3:5500, 10:4500, 20:4000")
+        zakres_ess = colE.slider("Szukana pojemność ESS [kWh]:", min_value=0.0, max_value=60.0, value=(0.0, 30.0), step=0.5)
+        zakres_mocy_ess = colE.slider("Szukana moc ESS [kW]:", min_value=0.5, max_value=20.0, value=(2.0, 10.0), step=0.5)
+        krzywa_ess = colE.text_input("Cena ESS [zł/kWh] wg pojemności (kWh:zł/kWh):", value="5:3000, 30:2200")
+        kryterium = st.radio("Kryterium:", list(KRYTERIA), horizontal=True,
+                             format_func=lambda k: {'okres_zwrotu': 'Najkrótszy okres zwrotu',
+                                                    'npv': f'Najwyższe NPV uproszczone ({LATA_PROJEKCJI} lat, '
+                                                           'bez degradacji)'}[k])
+
+        if st.button("🧭 Znajdź optymalny system"):
+            try:
+                with st.spinner('Trwa przeszukiwanie konfiguracji...'):
+                    wynik = optymalizuj_system(df_dane, parametry_symulacji, parsuj_punkty_ceny(krzywa_pv),
+                                               parsuj_punkty_ceny(krzywa_ess), zakres_pv_kwp=zakres_pv,
+                                               zakres_ess_kwh=zakres_ess, zakres_mocy_ess_kw=zakres_mocy_ess,
+                                               kryterium=kryterium, taryfa=taryfa)
+            except ValueError as e:
+                st.error(str(e))
+                wynik = None
+
+            if wynik is not None:
+                najlepszy = wynik['najlepszy']
+                if najlepszy is None:
+                    st.warning("Żadna z konfiguracji nie zwraca się (brak dodatnich oszczędności).")
+                else:
+                    st.success(f"Optimum: **{najlepszy['moc_pv_kwp']:.1f} kWp PV**, "
+                               f"**{najlepszy['ess_pojemnosc_kwh']:.1f} kWh / {najlepszy['ess_moc_ladowania_kw']:.1f} kW ESS** - "
+                               f"okres zwrotu {najlepszy['Okres zwrotu (lat)']:.1f} lat, NPV uproszczone (bez degradacji) "
+                               f"{najlepszy['NPV uproszczone [PLN]']:,.0f} PLN "
+                               f"(inwestycja netto {najlepszy['Koszt inwestycji Całkowity']:,.0f} PLN).")
+                st.caption(f"Ocenione konfiguracje: {wynik['liczba_ocen']}, nowe symulacje: {wynik['liczba_symulacji']}, "
+                           f"czas: {wynik['czas_calkowity_s']:.2f} s")
+                st.dataframe(wynik['tabela'].head(20))
+                st.caption("NPV uproszczone: oszczędności pierwszego roku bez degradacji PV i zaniku magazynu - "
+                           "pełne NPV wybranej konfiguracji w panelu projekcji wieloletniej.")
+
+
+pokaz_panel_diagnostyki(pomiar_strony)
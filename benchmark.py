@@ -0,0 +1,299 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import silnik
+import kalkulator
+from dane import przygotuj_dane, rozdzielczosc
+from kalkulator import (
+    PARAMETRY_SYMULACJI, DOMYSLNE_PARAMETRY, REF_PRODUKCJA_WIATR_KWH_KW_ROK, ESS_RT_EFFICIENCY,
+    oblicz_finansowanie, podsumuj_rok, produkcja_wiatrowa_dla_danych, raport_miesieczny, run_simulation
+)
+
+# =========================================================================
+# --- POMIARY WYDAJNOŚCI I KONTROLA REGRESJI WYNIKÓW ---
+# =========================================================================
+# python benchmark.py -o pomiary.json                    # czasy etapów i pamięć dla wszystkich zbiorów
+# python benchmark.py --zapisz-wzorzec wzorzec.json       # zapis wartości wzorcowych (zaufana wersja)
+# python benchmark.py --wzorzec wzorzec.json              # pomiary + porównanie z wzorcem (kod wyjścia 3 przy dryfie)
+#
+# Kontrola regresji przed każdą zmianą silnika: python benchmark.py --wzorzec wzorzec.json -o pomiary.json
+# musi zakończyć się kodem 0. wzorzec.json w repozytorium pochodzi z wersji sprawdzonej z wersją bazową:
+# zbiory 15-minutowe są z nią zgodne co do bitu, a godzinowe różnią się tylko limitami mocy magazynu
+# liczonymi od wykrytego kroku (wcześniej zawsze 15 min). Wzorzec odświeża się (--zapisz-wzorzec) tylko
+# przy zamierzonej zmianie wyników, w tym samym commicie i z opisem zmiany.
+#
+# Dane są syntetyczne i deterministyczne (stałe ziarno), w układzie dane_zuzycia.csv, więc
+# wyniki są porównywalne między wersjami kodu i maszynami.
+
+# (nazwa, krok [min], liczba lat); wieloletnie zbiory liczone są ścieżką strumieniową
+ZBIORY = [
+    ('1h_1rok', 60, 1),
+    ('15min_1rok', 15, 1),
+    ('5min_1rok', 5, 1),
+    ('1min_1rok', 1, 1),
+    ('15min_3lata', 15, 3),
+]
+ZBIORY_WZORCOWE = ('1h_1rok', '15min_1rok')
+
+KONFIGURACJE_WZORCOWE = {
+    'domyslna': DOMYSLNE_PARAMETRY,
+    'tylko_pv': {**DOMYSLNE_PARAMETRY, 'moc_turbina_kw': 0.0, 'koszt_turbiny_wiatrowej': 0.0,
+                 'ess_pojemnosc_kwh': 0.0, 'cena_magazynu_total': 0.0},
+    'duzy_magazyn': {**DOMYSLNE_PARAMETRY, 'moc_pv_kwp': 12.0, 'koszt_pv_total': 48000.0,
+                     'ess_pojemnosc_kwh': 25.0, 'cena_magazynu_total': 70000.0, 'korzysta_z_dotacji': False},
+}
+TOLERANCJA_WZGLEDNA = 1e-9
+
+
+def dane_syntetyczne(krok_min, lata=1, ziarno=0):
+    # DataFrame w układzie dane_zuzycia.csv (tekst z przecinkiem dziesiętnym i 'zł') od 1 stycznia 2023
+    rng = np.random.default_rng(ziarno)
+    start = pd.Timestamp('2023-01-01')
+    daty = pd.date_range(start, start + pd.DateOffset(years=lata) - pd.Timedelta(minutes=krok_min),
+                         freq=f'{krok_min}min')
+    n = len(daty)
+    godzina = daty.hour.to_numpy() + daty.minute.to_numpy() / 60
+    dzien = daty.dayofyear.to_numpy()
+    skala = krok_min / 15   # energia w interwale proporcjonalna do jego długości
+
+    pv = (np.clip(np.sin((godzina - 6) / 12 * np.pi), 0, None) * 0.25 * skala
+          * (0.6 + 0.4 * np.sin((dzien - 80) / 365 * 2 * np.pi)) * rng.uniform(0.3, 1, n))
+    konsumpcja = (0.1 + 0.15 * rng.random(n) + 0.1 * ((godzina > 17) & (godzina < 22))) * skala
+    cena_eksportu = 0.3 + 0.2 * np.sin(godzina / 24 * 2 * np.pi) + rng.normal(0, 0.1, n)
+    cena_energii = 0.6 + 0.1 * rng.random(n)
+    dystrybucja = 0.35 + 0.05 * rng.random(n)
+
+    def tekst(x, miejsca, jednostka=''):
+        return np.char.add(np.char.replace(np.char.mod(f'%.{miejsca}f', x), '.', ','), jednostka)
+
+    return pd.DataFrame({
+        'Data': daty.strftime('%d.%m.%Y %H:%M'),
+        'Profil konsumpcji (Kwh': tekst(konsumpcja, 5),
+        'produkcja 1KWp': tekst(pv, 5),
+        'Cena eksportu': tekst(cena_eksportu, 4, ' zł'),
+        'cena energii czynnej (Kwh)': tekst(cena_energii, 4, ' zł'),
+        'koszt dystrybucji (Kwh)': tekst(dystrybucja, 4, ' zł'),
+    })
+
+
+def _plik_zbioru(katalog, nazwa, krok_min, lata):
+    sciezka = os.path.join(katalog, f'benchmark_{nazwa}.csv')
+    if not os.path.exists(sciezka):
+        dane_syntetyczne(krok_min, lata).to_csv(sciezka, sep=';', index=False, encoding='utf-8-sig')
+    return sciezka
+
+
+class _Stoper:
+    # Czasy kolejnych etapów jednego przebiegu: with stoper('nazwa'): ...
+    def __init__(self):
+        self.etapy = {}
+
+    def __call__(self, nazwa):
+        self._nazwa = nazwa
+        return self
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.etapy[self._nazwa] = self.etapy.get(self._nazwa, 0.0) + time.perf_counter() - self._start
+
+
+def _przebieg_roczny(sciezka, parametry, rysuj):
+    # Jeden pełny przebieg jak w aplikacji, z podziałem na etapy
+    stoper = _Stoper()
+    p = parametry
+    with stoper('parsowanie'):
+        with open(sciezka, 'rb') as f:
+            df = pd.read_csv(io.BytesIO(f.read()), delimiter=';', encoding='utf-8-sig', low_memory=False)
+    with stoper('czyszczenie'):
+        dane = przygotuj_dane(df)
+    with stoper('wiatr'):
+        kalkulator._ksztalty_wiatru.clear()
+        roczna = p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0)
+        produkcja_wiatr = produkcja_wiatrowa_dla_danych(dane, roczna)
+    with stoper('petla'):
+        krok_h = rozdzielczosc(dane.data).interwal_h
+        bilans = silnik.symuluj_bilans(
+            dane.produkcja_pv_1kwp, produkcja_wiatr, dane.konsumpcja, dane.cena_eksportu, dane.cena_energii,
+            dane.koszt_dystrybucji, dane.kod_miesiaca, p['moc_pv_kwp'], p['ess_pojemnosc_kwh'],
+            p['ess_moc_ladowania_kw'] * krok_h, p['ess_moc_rozladowania_kw'] * krok_h, ESS_RT_EFFICIENCY
+        )
+    with stoper('agregacja_miesieczna'):
+        raport = raport_miesieczny(bilans['kody_miesiecy'], bilans['miesiace'], p['moc_pv_kwp'])
+        finansowanie = oblicz_finansowanie(
+            p['koszt_pv_total'], p['moc_turbina_kw'], p['koszt_turbiny_wiatrowej'], p['ess_pojemnosc_kwh'],
+            p['cena_magazynu_total'], p['korzysta_z_dotacji'], p['korzysta_z_ulgi_termomodernizacyjnej'],
+            p['stawka_podatkowa_procent']
+        )
+        podsumuj_rok(bilans['sumy'], dane.suma_konsumpcji_kwh, dane.koszt_bez_pv, finansowanie)
+    if rysuj:
+        with stoper('wykres'):
+            # Jak w aplikacji: wykres Altair zserializowany do specyfikacji Vega-Lite
+            import wykresy
+            wykresy._wykresy_w_pamieci.clear()
+            wykresy.wykres_bilansu_interaktywny(raport, 'Roczny Bilans Energetyczny').to_json()
+    with stoper('run_simulation'):
+        kalkulator.wyczysc_pamiec_etapow()
+        run_simulation(*[p[k] for k in PARAMETRY_SYMULACJI], df)
+    return stoper.etapy, len(dane)
+
+
+def _przebieg_wieloletni(sciezka, parametry, rysuj):
+    from strumien import symuluj_strumieniowo
+    stoper = _Stoper()
+    with stoper('strumien'):
+        wynik = symuluj_strumieniowo(sciezka, parametry)
+    return stoper.etapy, int(wynik['lata']['Liczba interwałów'].sum())
+
+
+def zmierz_zbior(sciezka, lata, powtorzenia=3, pamiec=True, rysuj=True, parametry=DOMYSLNE_PARAMETRY):
+    # Najkrótszy czas każdego etapu z `powtorzenia` przebiegów (pierwszy przebieg rozgrzewa JIT
+    # i nie jest liczony) oraz szczyt pamięci (tracemalloc) z osobnego przebiegu
+    przebieg = _przebieg_roczny if lata == 1 else _przebieg_wieloletni
+    przebieg(sciezka, parametry, rysuj)
+    najlepsze = {}
+    for _ in range(max(powtorzenia, 1)):
+        etapy, liczba_interwalow = przebieg(sciezka, parametry, rysuj)
+        for etap, czas in etapy.items():
+            najlepsze[etap] = min(czas, najlepsze.get(etap, float('inf')))
+
+    wynik = {'liczba_interwalow': liczba_interwalow, 'etapy_s': najlepsze,
+             'czas_calkowity_s': sum(czas for etap, czas in najlepsze.items() if etap != 'run_simulation')}
+    if pamiec:
+        tracemalloc.start()
+        przebieg(sciezka, parametry, False)
+        wynik['szczyt_pamieci_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return wynik
+
+
+def wartosci_wzorcowe(katalog):
+    # wyniki_roczne i raport_miesieczny_dane dla konfiguracji wzorcowych na zbiorach wzorcowych
+    wzorzec = {}
+    for nazwa, krok_min, lata in ZBIORY:
+        if nazwa not in ZBIORY_WZORCOWE:
+            continue
+        df = pd.read_csv(_plik_zbioru(katalog, nazwa, krok_min, lata), delimiter=';', encoding='utf-8-sig',
+                         low_memory=False)
+        for konfiguracja, p in KONFIGURACJE_WZORCOWE.items():
+            wynik = run_simulation(*[p[k] for k in PARAMETRY_SYMULACJI], df)
+            wzorzec[f'{nazwa}/{konfiguracja}'] = {
+                'wyniki_roczne': {k: float(v) for k, v in wynik['wyniki_roczne'].items()},
+                'raport_miesieczny_dane': [{k: (str(v) if k == 'Miesiąc' else float(v)) for k, v in wiersz.items()}
+                                           for wiersz in wynik['raport_miesieczny_dane']],
+            }
+    return wzorzec
+
+
+def porownaj_z_wzorcem(biezace, wzorzec, tolerancja=TOLERANCJA_WZGLEDNA):
+    # Lista rozbieżności (opisy tekstowe); pusta lista = brak dryfu
+    rozbieznosci = []
+
+    def porownaj(sciezka, a, b):
+        if isinstance(b, str) or isinstance(a, str):
+            if a != b:
+                rozbieznosci.append(f"{sciezka}: {b!r} -> {a!r}")
+        elif not (a == b or (np.isinf(a) and np.isinf(b)) or abs(a - b) <= tolerancja * max(abs(a), abs(b))):
+            rozbieznosci.append(f"{sciezka}: {b!r} -> {a!r} (różnica {a - b:+.3e})")
+
+    for klucz, wzor in wzorzec.items():
+        if klucz not in biezace:
+            rozbieznosci.append(f"{klucz}: brak w bieżących wynikach")
+            continue
+        for nazwa, wartosc in wzor['wyniki_roczne'].items():
+            porownaj(f"{klucz}/wyniki_roczne/{nazwa}", biezace[klucz]['wyniki_roczne'].get(nazwa, float('nan')), wartosc)
+        miesiace = biezace[klucz]['raport_miesieczny_dane']
+        if len(miesiace) != len(wzor['raport_miesieczny_dane']):
+            rozbieznosci.append(f"{klucz}/raport_miesieczny_dane: {len(wzor['raport_miesieczny_dane'])} -> {len(miesiace)} miesięcy")
+            continue
+        for i, (wiersz, wiersz_wzor) in enumerate(zip(miesiace, wzor['raport_miesieczny_dane'])):
+            for nazwa, wartosc in wiersz_wzor.items():
+                porownaj(f"{klucz}/raport_miesieczny_dane[{i}]/{nazwa}", wiersz.get(nazwa, float('nan')), wartosc)
+    return rozbieznosci
+
+
+def _metadane():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'czas': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'numba': silnik.njit is not None,
+        'maszyna': platform.machine(),
+        'procesory': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiary wydajności silnika i kontrola regresji wyników.")
+    parser.add_argument('-o', '--wyjscie', default='-', help="plik JSON z pomiarami; '-' = standardowe wyjście")
+    parser.add_argument('--zbiory', nargs='+', choices=[z[0] for z in ZBIORY], help="tylko wybrane zbiory")
+    parser.add_argument('--powtorzenia', type=int, default=3, help="liczba mierzonych przebiegów (domyślnie: %(default)s)")
+    parser.add_argument('--katalog', default=os.path.join(tempfile.gettempdir(), 'netbilling_benchmark'),
+                        help="katalog na wygenerowane pliki danych (domyślnie: %(default)s)")
+    parser.add_argument('--bez-pamieci', action='store_true', help="pomiń pomiar szczytu pamięci")
+    parser.add_argument('--bez-wykresu', action='store_true', help="pomiń etap rysowania wykresu")
+    parser.add_argument('--wzorzec', help="plik z wartościami wzorcowymi do porównania")
+    parser.add_argument('--zapisz-wzorzec', help="zapisz bieżące wartości wzorcowe do pliku i zakończ")
+    parser.add_argument('--tolerancja', type=float, default=TOLERANCJA_WZGLEDNA, help="tolerancja względna porównania")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.katalog, exist_ok=True)
+    if args.zapisz_wzorzec:
+        with open(args.zapisz_wzorzec, 'w', encoding='utf-8') as f:
+            json.dump({'metadane': _metadane(), 'wartosci': wartosci_wzorcowe(args.katalog)}, f, ensure_ascii=False, indent=2)
+        print(f"Zapisano wartości wzorcowe -> {args.zapisz_wzorzec}", file=sys.stderr)
+        return 0
+
+    raport = {'metadane': _metadane(), 'zbiory': {}}
+    for nazwa, krok_min, lata in ZBIORY:
+        if args.zbiory and nazwa not in args.zbiory:
+            continue
+        sciezka = _plik_zbioru(args.katalog, nazwa, krok_min, lata)
+        wynik = zmierz_zbior(sciezka, lata, args.powtorzenia, not args.bez_pamieci, not args.bez_wykresu)
+        raport['zbiory'][nazwa] = {'krok_min': krok_min, 'lata': lata, **wynik}
+        etapy = ', '.join(f"{etap} {czas * 1000:.1f} ms" for etap, czas in wynik['etapy_s'].items())
+        pamiec = f", szczyt {wynik['szczyt_pamieci_mb']:.0f} MB" if 'szczyt_pamieci_mb' in wynik else ''
+        print(f"{nazwa:>12} ({wynik['liczba_interwalow']} interwałów): {etapy}{pamiec}", file=sys.stderr)
+
+    kod_wyjscia = 0
+    if args.wzorzec:
+        with open(args.wzorzec, encoding='utf-8') as f:
+            wzorzec = json.load(f)['wartosci']
+        rozbieznosci = porownaj_z_wzorcem(wartosci_wzorcowe(args.katalog), wzorzec, args.tolerancja)
+        raport['regresja'] = {'wzorzec': args.wzorzec, 'tolerancja': args.tolerancja, 'rozbieznosci': rozbieznosci}
+        for opis in rozbieznosci[:20]:
+            print(f"DRYF {opis}", file=sys.stderr)
+        print(f"Kontrola regresji: {'OK' if not rozbieznosci else f'{len(rozbieznosci)} rozbieżności'}", file=sys.stderr)
+        kod_wyjscia = 3 if rozbieznosci else 0
+
+    tekst = json.dumps(raport, ensure_ascii=False, indent=2)
+    if args.wyjscie == '-':
+        print(tekst)
+    else:
+        with open(args.wyjscie, 'w', encoding='utf-8') as f:
+            f.write(tekst)
+    return kod_wyjscia
+
+
+if __name__ == '__main__':
+    sys.exit(main())
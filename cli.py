@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from kalkulator import PARAMETRY_SYMULACJI, DOMYSLNE_PARAMETRY, wczytaj_dane, symuluj_warianty
+from taryfy import TARYFY_WBUDOWANE
+from pomiary import rozpocznij_pomiar, zakoncz_pomiar, zapisz_json, zapisz_profil
+
+# =========================================================================
+# --- URUCHAMIANIE BEZ INTERFEJSU (CRON, WYCENY WSADOWE) ---
+# =========================================================================
+# python cli.py scenariusze.json --dane dane_zuzycia.csv --wyjscie wyniki.parquet
+#
+# Plik scenariuszy: JSON (obiekt, lista obiektów albo {"bazowe": {...}, "scenariusze": [...]})
+# lub CSV (kolumny = parametry run_simulation, opcjonalnie 'nazwa'). Brakujące parametry
+# uzupełniane są z sekcji "bazowe", a potem z kalkulator.DOMYSLNE_PARAMETRY.
+# --taryfa: nazwa wbudowanej taryfy (G11, G12, G12w) albo plik .json/.yaml (patrz taryfy.py).
+# --pomiary pomiary.json: czasy etapów, liczniki wierszy i szczyt pamięci ('-' = standardowe wyjście
+# błędów); --profil wynik.prof: zrzut cProfile (python -m pstats wynik.prof, snakeviz).
+# Nie importuje streamlit ani matplotlib.
+
+FORMATY_WYJSCIA = ('csv', 'json', 'parquet')
+PARAMETRY_LOGICZNE = ('korzysta_z_dotacji', 'korzysta_z_ulgi_termomodernizacyjnej')
+_PRAWDA = ('1', 'true', 't', 'tak', 'yes', 'y')
+_FALSZ = ('0', 'false', 'f', 'nie', 'no', 'n', '')
+# Dopuszczalne zakresy parametrów liczbowych (None = bez górnej granicy); procent pracy turbiny
+# skaluje produkcję wiatrową i - jak suwak w aplikacji - może przekraczać 100%
+ZAKRESY_PARAMETROW = {
+    'moc_pv_kwp': (0.0, None), 'koszt_pv_total': (0.0, None), 'moc_turbina_kw': (0.0, None),
+    'koszt_turbiny_wiatrowej': (0.0, None), 'ess_pojemnosc_kwh': (0.0, None), 'ess_moc_ladowania_kw': (0.0, None),
+    'ess_moc_rozladowania_kw': (0.0, None), 'cena_magazynu_total': (0.0, None),
+    'stawka_podatkowa_procent': (0.0, 100.0), 'procent_pracy_turbiny': (0.0, 200.0),
+}
+
+
+def _na_logiczna(wartosc):
+    if isinstance(wartosc, str):
+        tekst = wartosc.strip().lower()
+        if tekst in _PRAWDA:
+            return True
+        if tekst in _FALSZ:
+            return False
+        raise ValueError(f"❌ Niepoprawna wartość logiczna '{wartosc}' (oczekiwano tak/nie, true/false, 1/0).")
+    return bool(wartosc)
+
+
+def wczytaj_scenariusze(sciezka):
+    rozszerzenie = os.path.splitext(sciezka)[1].lower()
+    bazowe = {}
+    if rozszerzenie == '.json':
+        with open(sciezka, encoding='utf-8') as f:
+            zawartosc = json.load(f)
+        if isinstance(zawartosc, dict) and 'scenariusze' in zawartosc:
+            bazowe = zawartosc.get('bazowe', {})
+            zawartosc = zawartosc['scenariusze']
+        elif isinstance(zawartosc, dict):
+            zawartosc = [zawartosc]
+        scenariusze = pd.DataFrame(zawartosc)
+    elif rozszerzenie == '.csv':
+        scenariusze = pd.read_csv(sciezka, sep=None, engine='python', encoding='utf-8-sig')
+    else:
+        raise ValueError(f"❌ Nieobsługiwany format pliku scenariuszy '{rozszerzenie}' (dozwolone: .json, .csv).")
+
+    if scenariusze.empty:
+        raise ValueError(f"❌ Plik scenariuszy '{sciezka}' nie zawiera żadnego scenariusza.")
+    return uzupelnij_scenariusze(scenariusze, bazowe)
+
+
+def uzupelnij_scenariusze(scenariusze, bazowe=None):
+    # Scenariusze (DataFrame) -> kolumny PARAMETRY_SYMULACJI: braki z `bazowe`, potem z DOMYSLNE_PARAMETRY,
+    # wartości logiczne i liczbowe (z zakresami ZAKRESY_PARAMETROW) sprawdzone; błędy podnoszą ValueError
+    bazowe = bazowe or {}
+    nieznane = [c for c in list(scenariusze.columns) + list(bazowe) if c not in PARAMETRY_SYMULACJI and c != 'nazwa']
+    if nieznane:
+        raise ValueError(f"❌ Nieznane parametry scenariuszy: {sorted(set(nieznane))}. Dozwolone: {PARAMETRY_SYMULACJI}")
+
+    domyslne = {**DOMYSLNE_PARAMETRY, **bazowe}
+    for parametr in PARAMETRY_SYMULACJI:
+        if parametr not in scenariusze.columns:
+            scenariusze[parametr] = domyslne[parametr]
+        else:
+            scenariusze[parametr] = scenariusze[parametr].where(scenariusze[parametr].notna(), domyslne[parametr])
+        if parametr in PARAMETRY_LOGICZNE:
+            scenariusze[parametr] = scenariusze[parametr].map(_na_logiczna)
+        else:
+            try:
+                scenariusze[parametr] = pd.to_numeric(scenariusze[parametr]).astype(float)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"❌ Parametr '{parametr}' musi być liczbą. {e}") from e
+            minimum, maksimum = ZAKRESY_PARAMETROW[parametr]
+            wartosci = scenariusze[parametr]
+            poza = ~np.isfinite(wartosci) | (wartosci < minimum) | (wartosci > maksimum if maksimum is not None else False)
+            if poza.any():
+                raise ValueError(f"❌ Parametr '{parametr}' poza zakresem [{minimum:g}, "
+                                 f"{'∞' if maksimum is None else f'{maksimum:g}'}], otrzymano {wartosci[poza].iloc[0]:g}.")
+
+    kolumny = (['nazwa'] if 'nazwa' in scenariusze.columns else []) + PARAMETRY_SYMULACJI
+    return scenariusze[kolumny]
+
+
+def zapisz_wyniki(tabela, sciezka, format_wyjscia=None):
+    # Format z opcji --format albo z rozszerzenia pliku; '-' oznacza standardowe wyjście (CSV/JSON)
+    if format_wyjscia is None:
+        rozszerzenie = os.path.splitext(sciezka)[1].lower().lstrip('.') if sciezka != '-' else ''
+        format_wyjscia = rozszerzenie if rozszerzenie in FORMATY_WYJSCIA else 'csv'
+
+    if format_wyjscia == 'parquet':
+        if sciezka == '-':
+            raise ValueError("❌ Format parquet wymaga podania pliku wyjściowego (--wyjscie).")
+        try:
+            tabela.to_parquet(sciezka, index=False)
+        except ImportError as e:
+            raise ValueError(f"❌ Zapis do parquet wymaga pakietu pyarrow lub fastparquet. {e}") from e
+        return
+
+    cel = sys.stdout if sciezka == '-' else sciezka
+    if format_wyjscia == 'json':
+        tabela.to_json(cel, orient='records', force_ascii=False, indent=2)
+    else:
+        tabela.to_csv(cel, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kalkulator Net-billing PV + Wiatr + ESS - obliczenia bez interfejsu.")
+    parser.add_argument('scenariusze', help="plik scenariuszy .json lub .csv")
+    parser.add_argument('--dane', default='dane_zuzycia.csv', help="plik danych zużycia (domyślnie: %(default)s)")
+    parser.add_argument('-o', '--wyjscie', default='-', help="plik wyników; '-' = standardowe wyjście (domyślnie)")
+    parser.add_argument('--format', choices=FORMATY_WYJSCIA, help="format wyników (domyślnie z rozszerzenia pliku, inaczej csv)")
+    parser.add_argument('--taryfa', help="taryfa i zasady net-billingu: " + ', '.join(TARYFY_WBUDOWANE)
+                        + " albo plik .json/.yaml (domyślnie ceny z pliku danych)")
+    parser.add_argument('--bez-jit', action='store_true', help="nie kompiluj pętli bilansu numbą")
+    parser.add_argument('--bez-cache', action='store_true', help="nie używaj pliku <dane>.cache.npz")
+    parser.add_argument('--pomiary', help="zapisz czasy etapów, liczniki i szczyt pamięci do pliku JSON ('-' = stderr)")
+    parser.add_argument('--profil', help="zapisz profil cProfile do pliku .prof")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    pomiar = (rozpocznij_pomiar(sledz_pamiec=True, profiluj=bool(args.profil))
+              if args.pomiary or args.profil else None)
+    try:
+        scenariusze = wczytaj_scenariusze(args.scenariusze)
+        dane = wczytaj_dane(args.dane, uzyj_sidecar=not args.bez_cache)
+        tabela = symuluj_warianty(dane, scenariusze, uzyj_jit=not args.bez_jit, taryfa=args.taryfa)
+        zapisz_wyniki(tabela, args.wyjscie, args.format)
+    except (OSError, ValueError, json.JSONDecodeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if pomiar is not None:
+            zakoncz_pomiar(pomiar)
+            if args.pomiary:
+                zapisz_json(pomiar, sys.stderr if args.pomiary == '-' else args.pomiary)
+            if args.profil:
+                zapisz_profil(pomiar, args.profil)
+
+    print(f"Przeliczono {len(tabela)} scenariuszy w {time.perf_counter() - start:.2f} s"
+          + (f" -> {args.wyjscie}" if args.wyjscie != '-' else ''), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
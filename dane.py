@@ -0,0 +1,510 @@
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, fields, replace
+
+import pandas as pd
+import numpy as np
+
+from pomiary import licznik, mierzony, odcinek
+
+# =========================================================================
+# --- WCZYTYWANIE I NORMALIZACJA DANYCH WEJŚCIOWYCH ---
+# =========================================================================
+# Plik CSV jest parsowany i czyszczony raz na proces: wynik (typowane tablice
+# NumPy) trafia do pamięci podręcznej w pamięci oraz do pliku obok danych
+# (<plik>.cache.npz), oba kluczowane skrótem SHA-256 zawartości pliku.
+
+# Nazwy kolumn w pliku danych (dane_zuzycia.csv)
+COL_CENA_EKSPORTU = 'Cena eksportu'
+COL_PRODUKCJA_PV_1KWP = 'produkcja 1KWp'
+COL_KONSUMPCJA = 'Profil konsumpcji (Kwh'
+COL_CENA_ENERGII = 'cena energii czynnej (Kwh)'
+COL_KOSZT_DYSTRYBUCJI = 'koszt dystrybucji (Kwh)'
+
+REQUIRED_COLS = [COL_CENA_EKSPORTU, COL_PRODUKCJA_PV_1KWP, COL_KONSUMPCJA, COL_CENA_ENERGII, COL_KOSZT_DYSTRYBUCJI]
+
+# Podbić przy każdej zmianie logiki czyszczenia - unieważnia stare pliki .cache.npz
+WERSJA_FORMATU = 3
+MAX_ZBIOROW_W_PAMIECI = 8
+
+# Krok przyjmowany, gdy nie da się go ustalić ze znaczników czasu (np. jeden wiersz)
+INTERWAL_DOMYSLNY_H = 0.25
+# Odstęp dłuższy niż tyle kroków nominalnych to luka w pomiarach, a nie dłuższy interwał
+MAKS_LUKA_KROKOW = 4
+
+
+@dataclass(frozen=True, eq=False)
+class DaneWejsciowe:
+    # Oczyszczony rok danych: jedna pozycja tablicy = jeden interwał pomiarowy
+    data: np.ndarray               # datetime64[ns]
+    miesiac: np.ndarray            # int8, 1..12
+    godzina: np.ndarray            # int8, 0..23
+    kod_miesiaca: np.ndarray       # int32, rok * 12 + (miesiąc - 1)
+    konsumpcja: np.ndarray         # float64 [kWh]
+    produkcja_pv_1kwp: np.ndarray  # float64 [kWh/kWp]
+    cena_eksportu: np.ndarray      # float64 [zł/kWh]
+    cena_energii: np.ndarray       # float64 [zł/kWh]
+    koszt_dystrybucji: np.ndarray  # float64 [zł/kWh]
+    suma_konsumpcji_kwh: float
+    koszt_bez_pv: float
+    skrot: str = ''
+
+    def __len__(self):
+        return len(self.konsumpcja)
+
+
+# --- SZYBKIE PARSOWANIE DAT I LICZB ---
+# Układ dat i zapis liczb wykrywane są raz, na próbce wartości. Całe kolumny parsowane są
+# potem jawnym formatem (daty o polach stałej szerokości - arytmetyką na kodach znaków
+# w NumPy), a liczby tylko potrzebnymi zamianami, na wartościach unikalnych (ceny powtarzają
+# się w ciągu roku). Wartości, których szybka ścieżka nie rozpozna, parsowane są jak dawniej:
+# wnioskowanie formatu daty z dayfirst=True, pełne czyszczenie liczby.
+ROZMIAR_PROBKI = 1000
+# Data seryjna arkusza: liczba dni od 1899-12-30 (do 2173 roku - dłuższe liczby to nie daty)
+FORMAT_EXCEL = 'excel'
+MAKS_DNI_EXCEL = 100_000
+FORMATY_DAT = ('%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S',
+               '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M', 'ISO8601')
+_SZEROKOSCI_POL = {'%d': 2, '%m': 2, '%Y': 4, '%H': 2, '%M': 2, '%S': 2}
+# Znaki usuwane z liczb (waluta, spacje i twarde spacje tysięcy)
+ZNAKI_POMIJANE = ('zł', ' ', '\xa0')
+
+
+def _probka(kolumna):
+    return kolumna.dropna().iloc[:ROZMIAR_PROBKI].astype(str).str.strip()
+
+
+def wykryj_zapis_liczb(probka):
+    # Zamiany (stary, nowy) sprowadzające teksty próbki do zapisu pd.to_numeric. W wartości z kropką
+    # i przecinkiem (1.234,56 / 1,234.56) separatorem dziesiętnym jest znak występujący później.
+    zamiany = [(znak, '') for znak in ZNAKI_POMIJANE if probka.str.contains(znak, regex=False).any()]
+    oba = probka[probka.str.contains(',', regex=False) & probka.str.contains('.', regex=False)]
+    if len(oba):
+        if (oba.str.rfind(',') > oba.str.rfind('.')).mean() >= 0.5:
+            return zamiany + [('.', ''), (',', '.')]
+        return zamiany + [(',', '')]
+    if probka.str.contains(',', regex=False).any():
+        zamiany.append((',', '.'))
+    return zamiany
+
+
+def convert_to_numeric(column):
+    if column.dtype != 'object':
+        return column
+    kody, unikalne = pd.factorize(column)
+    tekst = pd.Series(unikalne, dtype=object).astype(str)
+    czyste = tekst
+    for stary, nowy in wykryj_zapis_liczb(tekst.iloc[:ROZMIAR_PROBKI].str.strip()):
+        czyste = czyste.str.replace(stary, nowy, regex=False)
+    liczby = pd.to_numeric(czyste, errors='coerce').to_numpy(dtype=np.float64)
+    nierozpoznane = np.isnan(liczby)
+    if nierozpoznane.any():
+        # Wartości w innym zapisie niż próbka
+        inne = tekst[nierozpoznane].str.replace('zł', '', regex=False).str.replace(' ', '', regex=False)
+        liczby[nierozpoznane] = pd.to_numeric(inne.str.replace(',', '.', regex=False), errors='coerce')
+    # Kod -1 (brak wartości) wskazuje dopisany NaN
+    return pd.Series(np.append(liczby, np.nan)[kody], index=column.index, name=column.name)
+
+
+def wykryj_format_daty(kolumna):
+    # FORMAT_EXCEL, format z FORMATY_DAT pasujący do największej części próbki (ponad połowy)
+    # albo None - bez wspólnego układu format wnioskowany jest dla każdej wartości
+    if pd.api.types.is_numeric_dtype(kolumna):
+        return FORMAT_EXCEL
+    probka = _probka(kolumna)
+    if len(probka) == 0:
+        return None
+    dni = pd.to_numeric(probka.str.replace(',', '.', regex=False), errors='coerce')
+    if ((dni > 0) & (dni < MAKS_DNI_EXCEL)).all():
+        return FORMAT_EXCEL
+    najlepszy, najwiecej = None, len(probka) // 2
+    for format_daty in FORMATY_DAT:
+        rozpoznane = int(pd.to_datetime(probka, format=format_daty, errors='coerce').notna().sum())
+        if rozpoznane == len(probka):
+            return format_daty
+        if rozpoznane > najwiecej:
+            najlepszy, najwiecej = format_daty, rozpoznane
+    return najlepszy
+
+
+def _daty_stalej_szerokosci(kolumna, format_daty):
+    # Daty z polami stałej szerokości (np. '01.01.2023 00:15') z kodów znaków tablicy NumPy, NaT dla
+    # wartości o innym układzie; None, gdy format ma pola zmiennej szerokości
+    pozycje, literaly, szerokosc, i = {}, [], 0, 0
+    while i < len(format_daty):
+        if format_daty[i] == '%':
+            pole = format_daty[i:i + 2]
+            if pole not in _SZEROKOSCI_POL:
+                return None
+            pozycje[pole[1]] = (szerokosc, _SZEROKOSCI_POL[pole])
+            szerokosc += _SZEROKOSCI_POL[pole]
+            i += 2
+        else:
+            literaly.append((szerokosc, ord(format_daty[i])))
+            szerokosc += 1
+            i += 1
+    if not {'d', 'm', 'Y'} <= pozycje.keys():
+        return None
+
+    # Jeden znak ponad szerokość formatu - wartość dłuższa ma tam znak różny od zera
+    tekst = np.asarray(kolumna.to_numpy(dtype=object, na_value=''), dtype=f'U{szerokosc + 1}')
+    kody = tekst.view(np.uint32).reshape(len(tekst), szerokosc + 1).astype(np.int32) - ord('0')
+    poprawne = kody[:, szerokosc] == -ord('0')
+    for pozycja, znak in literaly:
+        poprawne &= kody[:, pozycja] == znak - ord('0')
+    pola = {}
+    for nazwa, (pozycja, dlugosc) in pozycje.items():
+        cyfry = kody[:, pozycja:pozycja + dlugosc]
+        poprawne &= ((cyfry >= 0) & (cyfry <= 9)).all(axis=1)
+        pola[nazwa] = cyfry @ 10 ** np.arange(dlugosc - 1, -1, -1, dtype=np.int32)
+    zera = np.zeros(len(tekst), dtype=np.int32)
+    godzina, minuta, sekunda = (pola.get(nazwa, zera) for nazwa in 'HMS')
+    poprawne &= ((pola['m'] >= 1) & (pola['m'] <= 12) & (pola['d'] >= 1)
+                 & (godzina < 24) & (minuta < 60) & (sekunda < 60))
+
+    miesiace = np.where(poprawne, (pola['Y'] - 1970) * 12 + pola['m'] - 1, 0).astype('datetime64[M]')
+    dni = miesiace.astype('datetime64[D]') + np.where(poprawne, pola['d'] - 1, 0)
+    poprawne &= dni.astype('datetime64[M]') == miesiace     # np. 31.02
+    daty = dni.astype('datetime64[ns]') + (godzina * 3600 + minuta * 60 + sekunda).astype(np.int64) * np.timedelta64(1, 's')
+    daty[~poprawne] = np.datetime64('NaT')
+    return pd.Series(daty, index=kolumna.index, name=kolumna.name)
+
+
+def parsuj_daty(kolumna):
+    # Kolumna dat jako datetime64[ns]; NaT dla wartości pustych i nierozpoznanych (licznik 'daty_niepoprawne')
+    if pd.api.types.is_datetime64_any_dtype(kolumna):
+        return kolumna
+    format_daty = wykryj_format_daty(kolumna)
+    licznik(f'format_daty:{format_daty or "wnioskowany"}')
+    if format_daty == FORMAT_EXCEL:
+        dni = kolumna if pd.api.types.is_numeric_dtype(kolumna) else convert_to_numeric(kolumna)
+        dni = dni.where((dni > 0) & (dni < MAKS_DNI_EXCEL))
+        # Ułamek doby w zapisie binarnym nie trafia dokładnie w kwadranse - zaokrąglenie do sekundy
+        daty = (pd.to_datetime('1899-12-30') + pd.to_timedelta(dni, unit='D')).dt.round('s')
+    elif format_daty is None:
+        daty = pd.to_datetime(kolumna, errors='coerce', dayfirst=True)
+    else:
+        daty = _daty_stalej_szerokosci(kolumna, format_daty)
+        if daty is None:
+            daty = pd.to_datetime(kolumna, errors='coerce', format=format_daty)
+
+    nierozpoznane = daty.isna() & kolumna.notna()
+    if format_daty is not None and nierozpoznane.any():
+        # Wartości w innym układzie niż próbka - format wnioskowany dla każdej osobno
+        daty = daty.copy()
+        daty[nierozpoznane] = pd.to_datetime(kolumna[nierozpoznane].astype(str), errors='coerce',
+                                              dayfirst=True, format='mixed')
+        nierozpoznane = daty.isna() & kolumna.notna()
+    licznik('daty_niepoprawne', int(nierozpoznane.sum()))
+    return daty
+
+
+def kalendarz(data):
+    # (miesiąc int8 1..12, godzina int8 0..23, kod miesiąca int32 rok * 12 + miesiąc - 1) wprost z datetime64,
+    # bez obiektów Period / date i pośrednich kolumn int64 w ramce
+    data = np.asarray(data, dtype='datetime64[ns]')
+    miesiace = data.astype('datetime64[M]').astype(np.int64)     # miesiące od 1970-01
+    godzina = (data - data.astype('datetime64[D]')) // np.timedelta64(1, 'h')
+    return (miesiace % 12 + 1).astype(np.int8), godzina.astype(np.int8), (miesiace + 1970 * 12).astype(np.int32)
+
+
+def _wytnij_rok(df_dane, kolumny=()):
+    # Kopia kolumny 'Data' (datetime) i kolumn `kolumny` obcięta do jednego roku od pierwszej daty.
+    # Pozostałe kolumny pliku nie są kopiowane - nic ich dalej nie czyta.
+    if 'Data' not in df_dane.columns and len(df_dane.columns) > 0:
+        df_dane = df_dane.rename(columns={df_dane.columns[0]: 'Data'})
+    df_cleaned = df_dane[[c for c in dict.fromkeys(['Data', *kolumny]) if c in df_dane.columns]].copy()
+
+    try:
+        with odcinek('parsowanie_dat'):
+            df_cleaned['Data'] = parsuj_daty(df_cleaned['Data'])
+        wiersze_wczytane = len(df_cleaned)
+        wiersze_bez_daty = int(df_cleaned['Data'].isna().sum())
+
+        start_date = df_cleaned['Data'].min()
+        if pd.isna(start_date):
+             raise ValueError("Brak danych daty w pliku po konwersji.")
+
+        # Rok od pierwszej daty bez założenia o kroku pomiarowym (5 min, 15 min, 1 h, mieszany)
+        end_date = start_date + pd.DateOffset(years=1)
+
+        df_cleaned = df_cleaned[(df_cleaned['Data'] >= start_date) & (df_cleaned['Data'] < end_date)].copy()
+        licznik('wiersze_wczytane', wiersze_wczytane)
+        licznik('wiersze_bez_daty', wiersze_bez_daty)
+        licznik('wiersze_poza_rokiem', wiersze_wczytane - wiersze_bez_daty - len(df_cleaned))
+
+        if len(df_cleaned) == 0:
+            raise ValueError("Dane nie obejmują pełnego roku lub filtracja się nie powiodła.")
+
+    except Exception as e:
+        raise ValueError(f"❌ BŁĄD: Problem z konwersją kolumny 'Data' lub wyciąganiem czasu. {e}") from e
+
+    return df_cleaned
+
+
+def przygotuj_dane(df_dane, skrot=''):
+    # Czyści surowe dane (jeden rok od pierwszej daty) do DaneWejsciowe; przy błędzie podnosi ValueError
+    with odcinek('wyciecie_roku'):
+        df_cleaned = _wytnij_rok(df_dane, REQUIRED_COLS)
+
+    missing_cols = [c for c in REQUIRED_COLS if c not in df_cleaned.columns]
+    if missing_cols:
+        raise ValueError(f"❌ BŁĄD KOLUMN: Nie znaleziono kluczowych nagłówków: {missing_cols}. Sprawdź, czy są poprawnie nazwane w pliku CSV.")
+
+    with odcinek('konwersja_liczb'):
+        for col in REQUIRED_COLS:
+            niepuste = df_cleaned[col].notna()
+            df_cleaned[col] = convert_to_numeric(df_cleaned[col])
+            licznik(f'wartosci_niepoprawne:{col}', int((niepuste & df_cleaned[col].isna()).sum()))
+            licznik(f'braki_uzupelnione:{col}', int(df_cleaned[col].isna().sum()))
+
+    df_cleaned[COL_KONSUMPCJA] = df_cleaned[COL_KONSUMPCJA].fillna(0)
+    df_cleaned[COL_PRODUKCJA_PV_1KWP] = df_cleaned[COL_PRODUKCJA_PV_1KWP].fillna(0)
+
+    for col in [COL_CENA_EKSPORTU, COL_CENA_ENERGII, COL_KOSZT_DYSTRYBUCJI]:
+        mean_val = df_cleaned[col].mean()
+        df_cleaned[col] = df_cleaned[col].fillna(mean_val if pd.notna(mean_val) else 0)
+
+    df = df_cleaned.dropna(subset=REQUIRED_COLS, how='all')
+    licznik('wiersze_usuniete_dropna', len(df_cleaned) - len(df))
+    licznik('wiersze_danych', len(df))
+    licznik('znaczniki_zdublowane', int(df['Data'].duplicated().sum()))
+
+    data = df['Data'].to_numpy(dtype='datetime64[ns]')
+    miesiac, godzina, kod_miesiaca = kalendarz(data)
+    return DaneWejsciowe(
+        data=data,
+        miesiac=miesiac,
+        godzina=godzina,
+        kod_miesiaca=kod_miesiaca,
+        konsumpcja=df[COL_KONSUMPCJA].to_numpy(dtype=np.float64),
+        produkcja_pv_1kwp=df[COL_PRODUKCJA_PV_1KWP].to_numpy(dtype=np.float64),
+        cena_eksportu=df[COL_CENA_EKSPORTU].to_numpy(dtype=np.float64),
+        cena_energii=df[COL_CENA_ENERGII].to_numpy(dtype=np.float64),
+        koszt_dystrybucji=df[COL_KOSZT_DYSTRYBUCJI].to_numpy(dtype=np.float64),
+        suma_konsumpcji_kwh=float(df[COL_KONSUMPCJA].sum()),
+        # Koszt energii bez instalacji - baza do liczenia oszczędności
+        koszt_bez_pv=float((df[COL_KONSUMPCJA] * (df[COL_CENA_ENERGII] + df[COL_KOSZT_DYSTRYBUCJI])).sum()),
+        skrot=skrot,
+    )
+
+
+def wczytaj_konsumpcje(sciezka):
+    # Sam profil zużycia z pliku w układzie dane_zuzycia.csv (ceny i uzysk PV nie są wymagane);
+    # zwraca (data datetime64[ns], konsumpcja float64 [kWh]) dla jednego roku od pierwszej daty
+    df = _wytnij_rok(pd.read_csv(sciezka, delimiter=';', encoding='utf-8-sig', low_memory=False), [COL_KONSUMPCJA])
+    if COL_KONSUMPCJA not in df.columns:
+        raise ValueError(f"❌ BŁĄD KOLUMN: Nie znaleziono kluczowych nagłówków: {[COL_KONSUMPCJA]}. Sprawdź, czy są poprawnie nazwane w pliku CSV.")
+    konsumpcja = convert_to_numeric(df[COL_KONSUMPCJA]).fillna(0)
+    return df['Data'].to_numpy(dtype='datetime64[ns]'), konsumpcja.to_numpy(dtype=np.float64)
+
+
+def z_wlasna_konsumpcja(wspolne, konsumpcja, skrot=''):
+    # DaneWejsciowe z kalendarzem, cenami i uzyskiem PV z `wspolne` (DaneWejsciowe lub słownik tablic)
+    # i profilem zużycia `konsumpcja` dopasowanym już do kalendarza `wspolne`
+    pole = wspolne.get if isinstance(wspolne, dict) else lambda nazwa: getattr(wspolne, nazwa)
+    konsumpcja = np.asarray(konsumpcja, dtype=np.float64)
+    return DaneWejsciowe(
+        data=pole('data'), miesiac=pole('miesiac'), godzina=pole('godzina'), kod_miesiaca=pole('kod_miesiaca'),
+        konsumpcja=konsumpcja, produkcja_pv_1kwp=pole('produkcja_pv_1kwp'), cena_eksportu=pole('cena_eksportu'),
+        cena_energii=pole('cena_energii'), koszt_dystrybucji=pole('koszt_dystrybucji'),
+        suma_konsumpcji_kwh=float(konsumpcja.sum()),
+        koszt_bez_pv=float((konsumpcja * (pole('cena_energii') + pole('koszt_dystrybucji'))).sum()),
+        skrot=skrot,
+    )
+
+
+def jako_dane_wejsciowe(df_dane):
+    # Akceptuje zarówno surowy DataFrame (jak dawniej), jak i gotowe DaneWejsciowe
+    if isinstance(df_dane, DaneWejsciowe):
+        return df_dane
+    return przygotuj_dane(df_dane)
+
+
+# --- ROZDZIELCZOŚĆ CZASOWA (KROK POMIAROWY ZE ZNACZNIKÓW CZASU) ---
+# Krok nominalny to najczęstszy odstęp między kolejnymi znacznikami, a interwał trwa do
+# następnego znacznika (ostatni - jak poprzedni). Dzięki temu plik z licznika 5-minutowego,
+# godzinowego albo mieszany (np. zmiana licznika w trakcie roku) ma poprawne limity mocy
+# magazynu w każdym interwale. Luki w pomiarach i wiersze bez daty liczone są jak krok nominalny.
+# Zmiana czasu w znacznikach czasu lokalnego: zdublowane kwadranse października zostają w kolejności
+# pliku (cofnięcie zegara to odstęp ujemny - krok nominalny), a z odstępu obejmującego brakującą
+# godzinę ostatniej niedzieli marca (2:00 -> 3:00) odejmowana jest ta godzina.
+@dataclass(frozen=True, eq=False)
+class Rozdzielczosc:
+    interwal_h: float      # krok nominalny [h]
+    czas_h: np.ndarray     # float64, długość każdego interwału [h]
+    regularna: bool        # wszystkie interwały równe krokowi nominalnemu
+    liczba_luk: int
+    udzialy_krokow: dict   # {długość interwału [min]: udział interwałów}
+
+
+def _przeskok_czasu_letniego(ns):
+    # Dla każdego odstępu między kolejnymi znacznikami [ns]: 1 h, gdy obejmuje przestawienie zegara
+    # 2:00 -> 3:00 w ostatnią niedzielę marca, inaczej 0
+    godzina_ns = 3_600_000_000_000
+    od, do = ns[:-1], ns[1:]
+    dzien = do // (24 * godzina_ns)                  # dni od 1970-01-01 (czwartek)
+    data = dzien.astype('datetime64[D]')
+    marzec = (data.astype('datetime64[M]').astype(np.int64) % 12 == 2)
+    ostatnia_niedziela = marzec & ((dzien + 3) % 7 == 6) & ((data + 7).astype('datetime64[M]') != data.astype('datetime64[M]'))
+    druga = dzien * 24 * godzina_ns + 2 * godzina_ns
+    return np.where(ostatnia_niedziela & (od < druga) & (do >= druga + godzina_ns), godzina_ns, 0)
+
+
+def rozdzielczosc(data):
+    t = np.asarray(data, dtype='datetime64[ns]')
+    poprawne = ~np.isnat(t)
+    ns = t[poprawne].astype(np.int64)
+    roznice = np.diff(ns)
+    dodatnie = roznice[roznice > 0]
+    if len(dodatnie):
+        kroki, liczby = np.unique(dodatnie, return_counts=True)
+        krok_ns = int(kroki[np.argmax(liczby)])
+    else:
+        krok_ns = int(round(INTERWAL_DOMYSLNY_H * 3.6e12))
+
+    czas_ns = np.full(len(t), krok_ns, dtype=np.int64)
+    liczba_luk = 0
+    if len(roznice):
+        roznice = roznice - _przeskok_czasu_letniego(ns)
+        trwanie = np.append(roznice, roznice[-1])
+        luka = trwanie > MAKS_LUKA_KROKOW * krok_ns
+        liczba_luk = int(luka[:-1].sum())
+        trwanie[luka | (trwanie <= 0)] = krok_ns
+        czas_ns[poprawne] = trwanie
+
+    czas_h = czas_ns / 3.6e12
+    czas_h.setflags(write=False)
+    kroki, liczby = np.unique(czas_ns, return_counts=True)
+    return Rozdzielczosc(
+        interwal_h=krok_ns / 3.6e12,
+        czas_h=czas_h,
+        regularna=bool(len(kroki) <= 1),
+        liczba_luk=liczba_luk,
+        udzialy_krokow={float(k) / 6e10: float(c) / len(t) for k, c in zip(kroki, liczby)},
+    )
+
+
+# Okresy agregacji podglądu: kod -> jednostka datetime64
+OKRESY_AGREGACJI = {'h': 'datetime64[h]', 'D': 'datetime64[D]'}
+
+
+def poczatki_okresow(data, okres):
+    # Indeksy pierwszych interwałów kolejnych okresów 'h' / 'D'; None, gdy dane nie są drobniejsze niż okres
+    if okres not in OKRESY_AGREGACJI:
+        raise ValueError(f"❌ Nieobsługiwany okres agregacji '{okres}' (dozwolone: {', '.join(OKRESY_AGREGACJI)}).")
+    okresy = np.asarray(data, dtype='datetime64[ns]').astype(OKRESY_AGREGACJI[okres])
+    if len(okresy) == 0:
+        return None
+    poczatki = np.flatnonzero(np.r_[True, okresy[1:] != okresy[:-1]])
+    return None if len(poczatki) == len(okresy) else poczatki
+
+
+def agreguj_dane(dane, okres='h'):
+    # DaneWejsciowe zsumowane do okresów 'h' / 'D' (szybki podgląd i przeglądy wariantów).
+    # Energie sumowane; ceny zakupu ważone zużyciem, a cena eksportu uzyskiem PV, więc koszt
+    # energii bez instalacji i przychód z eksportu PV są zachowane. Kalendarz z pierwszego
+    # interwału okresu; sumy roczne (konsumpcja, koszt bez PV) bez zmian.
+    poczatki = poczatki_okresow(dane.data, okres)
+    if poczatki is None:
+        return dane
+    liczba = np.diff(np.r_[poczatki, len(dane)])
+
+    def suma(tablica):
+        return np.add.reduceat(tablica, poczatki)
+
+    def srednia_wazona(cena, waga):
+        mianownik = suma(waga)
+        zwykla = suma(cena) / liczba
+        return np.where(mianownik > 0, suma(cena * waga) / np.where(mianownik > 0, mianownik, 1.0), zwykla)
+
+    return replace(
+        dane,
+        data=np.asarray(dane.data, dtype='datetime64[ns]')[poczatki].astype(OKRESY_AGREGACJI[okres]).astype('datetime64[ns]'),
+        miesiac=dane.miesiac[poczatki],
+        godzina=dane.godzina[poczatki],
+        kod_miesiaca=dane.kod_miesiaca[poczatki],
+        konsumpcja=suma(dane.konsumpcja),
+        produkcja_pv_1kwp=suma(dane.produkcja_pv_1kwp),
+        cena_eksportu=srednia_wazona(dane.cena_eksportu, dane.produkcja_pv_1kwp),
+        cena_energii=srednia_wazona(dane.cena_energii, dane.konsumpcja),
+        koszt_dystrybucji=srednia_wazona(dane.koszt_dystrybucji, dane.konsumpcja),
+        skrot=f"{dane.skrot}|agregacja:{okres}" if dane.skrot else '',
+    )
+
+
+# --- PAMIĘĆ PODRĘCZNA (PROCES + PLIK .cache.npz) ---
+_dane_w_pamieci = OrderedDict()   # skrót zawartości -> DaneWejsciowe
+_skroty_plikow = {}               # (ścieżka, mtime, rozmiar) -> skrót zawartości
+
+
+def _zapisz_sidecar(sciezka, dane):
+    tablice = {f.name: getattr(dane, f.name) for f in fields(DaneWejsciowe)}
+    tablice['wersja_formatu'] = WERSJA_FORMATU
+    # Zapis przez plik tymczasowy - równoległe procesy (wyceny, serwis) ani przerwany zapis
+    # nie zostawiają uciętego pliku
+    try:
+        deskryptor, tymczasowy = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(sciezka)), suffix='.tmp')
+    except OSError:
+        return  # np. katalog tylko do odczytu - wtedy zostaje sama pamięć procesu
+    try:
+        with os.fdopen(deskryptor, 'wb') as f:
+            np.savez(f, **tablice)
+        os.replace(tymczasowy, sciezka)
+    except OSError:
+        os.unlink(tymczasowy)
+
+
+def _wczytaj_sidecar(sciezka, skrot):
+    try:
+        with np.load(sciezka, allow_pickle=False) as npz:
+            if int(npz['wersja_formatu']) != WERSJA_FORMATU or str(npz['skrot']) != skrot:
+                return None
+            wartosci = {f.name: npz[f.name] for f in fields(DaneWejsciowe)}
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        return None  # uszkodzony lub niepełny plik = brak w pamięci podręcznej
+    wartosci['suma_konsumpcji_kwh'] = float(wartosci['suma_konsumpcji_kwh'])
+    wartosci['koszt_bez_pv'] = float(wartosci['koszt_bez_pv'])
+    wartosci['skrot'] = str(wartosci['skrot'])
+    return DaneWejsciowe(**wartosci)
+
+
+@mierzony('wczytaj_dane')
+def wczytaj_dane(sciezka, uzyj_sidecar=True):
+    # Zwraca DaneWejsciowe dla pliku CSV; parsowanie tylko przy pierwszym użyciu danej zawartości
+    stat = os.stat(sciezka)
+    klucz_pliku = (os.path.abspath(sciezka), stat.st_mtime_ns, stat.st_size)
+    skrot = _skroty_plikow.get(klucz_pliku)
+    if skrot is not None and skrot in _dane_w_pamieci:
+        _dane_w_pamieci.move_to_end(skrot)
+        licznik('dane:z_pamieci_procesu')
+        return _dane_w_pamieci[skrot]
+
+    with odcinek('odczyt_pliku'):
+        with open(sciezka, 'rb') as f:
+            zawartosc = f.read()
+        skrot = hashlib.sha256(zawartosc).hexdigest()
+    _skroty_plikow[klucz_pliku] = skrot
+
+    dane = _dane_w_pamieci.get(skrot)
+    if dane is None:
+        sciezka_sidecar = sciezka + '.cache.npz'
+        with odcinek('odczyt_cache_npz'):
+            dane = _wczytaj_sidecar(sciezka_sidecar, skrot) if uzyj_sidecar else None
+        if dane is None:
+            with odcinek('read_csv'):
+                df_dane = pd.read_csv(io.BytesIO(zawartosc), delimiter=';', encoding='utf-8-sig', low_memory=False)
+            with odcinek('przygotuj_dane'):
+                dane = przygotuj_dane(df_dane, skrot)
+            if uzyj_sidecar:
+                _zapisz_sidecar(sciezka_sidecar, dane)
+        else:
+            licznik('dane:z_cache_npz')
+        _dane_w_pamieci[skrot] = dane
+        while len(_dane_w_pamieci) > MAX_ZBIOROW_W_PAMIECI:
+            _dane_w_pamieci.popitem(last=False)
+    return dane
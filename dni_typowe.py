@@ -0,0 +1,207 @@
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+import silnik
+
+# =========================================================================
+# --- DNI TYPOWE (KOMPRESJA ROKU DO WAŻONYCH DNI REPREZENTATYWNYCH) ---
+# =========================================================================
+# Dni roku grupowane są osobno w każdej porze roku (k-średnich na profilach zużycia, uzysku PV
+# 1 kWp, kształtu wiatru i obu cen), a każdą grupę reprezentuje rzeczywisty dzień najbliższy
+# środkowi grupy z wagą równą liczbie dni w grupie. Grupowane są dni o tej samej liczbie
+# interwałów, więc pojedyncze dni nietypowej długości (zmiana czasu) zostają dniami typowymi o wadze 1.
+#
+# Fizyka (autokonsumpcja, magazyn, strategia ESS) liczona jest tylko na dniach typowych. Każdy
+# dzień typowy występuje w szeregu dwa razy: rozbieg (data o dobę wcześniej) i dzień liczony -
+# dzień liczony zaczyna się więc od SoC, z jakim magazyn kończy taki sam dzień (stan ustalony
+# serii podobnych dni), a nie od SoC poprzedniego dnia typowego z innej pory roku.
+# Rozliczenie net-billingu (portfel, wygasanie, kalendarz miesięcy) idzie przez wszystkie dni
+# roku: przepływy dnia typowego z cenami danego dnia, po dwa interwały silnika na dobę
+# (eksport doby, potem zakup doby).
+
+TRYB_DNI_TYPOWYCH = 'dni_typowe'
+DNI_NA_PORE_ROKU = 4
+ITERACJE_GRUPOWANIA = 30
+
+# Miesiąc (1..12) -> pora roku: zima XII-II, wiosna III-V, lato VI-VIII, jesień IX-XI
+PORY_ROKU = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+
+@dataclass(frozen=True, eq=False)
+class DniTypowe:
+    indeksy: np.ndarray        # interwały danych tworzące szereg dni typowych (rozbieg + dzień liczony)
+    liczone: np.ndarray        # bool, interwały szeregu należące do dni liczonych
+    odwzorowanie: np.ndarray   # dla każdego interwału roku pozycja w szeregu (dzień liczony dnia typowego)
+    poczatki_dni: np.ndarray   # pierwsze interwały kolejnych dni roku
+    dni_typowe: np.ndarray     # indeksy dni roku wybranych jako dni typowe
+    wagi: np.ndarray           # liczba dni roku reprezentowanych przez dzień typowy
+    krotnosc: np.ndarray       # float64, ile interwałów roku reprezentuje interwał szeregu (0 dla rozbiegu)
+
+    def __len__(self):
+        return len(self.indeksy)
+
+
+def _grupuj(cechy, k, rng):
+    # k-średnich z inicjalizacją k-means++; zwraca przypisanie dni do grup
+    srodki = [cechy[rng.integers(len(cechy))]]
+    for _ in range(1, k):
+        odleglosc = np.min([((cechy - s) ** 2).sum(axis=1) for s in srodki], axis=0)
+        if odleglosc.sum() <= 0:
+            break
+        srodki.append(cechy[rng.choice(len(cechy), p=odleglosc / odleglosc.sum())])
+    srodki = np.array(srodki)
+    przypisanie = np.zeros(len(cechy), dtype=np.intp)
+    for iteracja in range(ITERACJE_GRUPOWANIA):
+        odleglosci = ((cechy[:, None, :] - srodki[None, :, :]) ** 2).sum(axis=2)
+        nowe = odleglosci.argmin(axis=1)
+        if iteracja and np.array_equal(nowe, przypisanie):
+            break
+        przypisanie = nowe
+        for g in range(len(srodki)):
+            if (przypisanie == g).any():
+                srodki[g] = cechy[przypisanie == g].mean(axis=0)
+    return przypisanie, srodki
+
+
+def wyznacz_dni_typowe(dane, ksztalt_wiatru=None, dni_na_pore_roku=DNI_NA_PORE_ROKU, ziarno=0):
+    # `dane` - DaneWejsciowe, `ksztalt_wiatru` - udział interwałów w rocznej produkcji wiatrowej (cecha grupowania)
+    if dni_na_pore_roku < 1:
+        raise ValueError("❌ Liczba dni typowych na porę roku musi być dodatnia.")
+    n = len(dane)
+    dzien = np.asarray(dane.data, dtype='datetime64[ns]').astype('datetime64[D]')
+    poczatki = np.flatnonzero(np.r_[True, dzien[1:] != dzien[:-1]]) if n else np.zeros(0, dtype=np.intp)
+    dlugosci = np.diff(np.r_[poczatki, n])
+
+    # Cechy dnia: profile godzinowe serii (szum pojedynczych interwałów nie rozbija grup) w jednostkach
+    # odchylenia standardowego serii oraz sumy dobowe - dzień typowy ma trafić w energię grupy.
+    # Serie stałe (np. cena energii z taryfy jednostrefowej) nie niosą informacji i są pomijane.
+    serie = [dane.konsumpcja, dane.produkcja_pv_1kwp, dane.cena_eksportu, dane.cena_energii]
+    if ksztalt_wiatru is not None:
+        serie.append(ksztalt_wiatru)
+    serie = [np.asarray(seria, dtype=np.float64) for seria in serie]
+    serie = [(seria, np.std(seria)) for seria in serie if np.std(seria) > 1e-9 * (np.abs(seria).mean() + 1e-12)]
+
+    rng = np.random.default_rng(ziarno)
+    reprezentant = np.arange(len(poczatki))     # dzień typowy każdego dnia roku
+    pora_dnia = PORY_ROKU[np.asarray(dane.miesiac)[poczatki].astype(np.intp) - 1] if n else np.zeros(0, dtype=np.intp)
+    # Grupowane są tylko dni o tej samej liczbie interwałów (dane o mieszanym kroku, zmiana czasu)
+    for dlugosc in np.unique(dlugosci):
+        dni = np.flatnonzero(dlugosci == dlugosc)
+        wskazniki = poczatki[dni][:, None] + np.arange(dlugosc)
+        na_godzine = dlugosc // 24 if dlugosc % 24 == 0 else 1
+        cechy = []
+        for seria, odchylenie in serie:
+            profil = seria[wskazniki].reshape(len(dni), -1, na_godzine).sum(axis=2) / (odchylenie * na_godzine)
+            cechy += [profil, profil.sum(axis=1, keepdims=True) / np.sqrt(profil.shape[1])]
+        cechy = np.hstack(cechy) if cechy else np.zeros((len(dni), 1))
+        for p in range(PORY_ROKU.max() + 1):
+            dni_pory = np.flatnonzero(pora_dnia[dni] == p)
+            if len(dni_pory) == 0:
+                continue
+            przypisanie, srodki = _grupuj(cechy[dni_pory], min(dni_na_pore_roku, len(dni_pory)), rng)
+            for g in np.unique(przypisanie):
+                czlonkowie = dni_pory[przypisanie == g]
+                najblizszy = czlonkowie[((cechy[czlonkowie] - srodki[g]) ** 2).sum(axis=1).argmin()]
+                reprezentant[dni[czlonkowie]] = dni[najblizszy]
+
+    dni_typowe, numer, wagi = np.unique(reprezentant, return_inverse=True, return_counts=True)
+    # Szereg: dla każdego dnia typowego (chronologicznie) rozbieg i dzień liczony
+    zakresy = [np.arange(poczatki[d], poczatki[d] + dlugosci[d]) for d in dni_typowe]
+    indeksy = np.concatenate([np.r_[z, z] for z in zakresy]) if zakresy else np.zeros(0, dtype=np.intp)
+    dlugosci_typowych = dlugosci[dni_typowe]
+    start_liczonego = np.cumsum(2 * dlugosci_typowych) - dlugosci_typowych
+    liczone = np.zeros(len(indeksy), dtype=bool)
+    for s, d in zip(start_liczonego, dlugosci_typowych):
+        liczone[s:s + d] = True
+
+    dzien_interwalu = np.repeat(np.arange(len(poczatki)), dlugosci)
+    odwzorowanie = (start_liczonego[numer][dzien_interwalu] + np.arange(n) - poczatki[dzien_interwalu])
+    return DniTypowe(indeksy=indeksy, liczone=liczone, odwzorowanie=odwzorowanie, poczatki_dni=poczatki,
+                     dni_typowe=dni_typowe, wagi=wagi,
+                     krotnosc=np.bincount(odwzorowanie, minlength=len(indeksy)).astype(np.float64))
+
+
+def dane_dni_typowych(dane, dt):
+    # DaneWejsciowe szeregu dni typowych; rozbieg z datą o dobę wcześniej (strategie dzielą szereg na doby)
+    data = np.asarray(dane.data, dtype='datetime64[ns]')[dt.indeksy]
+    data = np.where(dt.liczone, data, data - np.timedelta64(1, 'D'))
+    return replace(
+        dane,
+        data=data,
+        miesiac=dane.miesiac[dt.indeksy],
+        godzina=dane.godzina[dt.indeksy],
+        kod_miesiaca=dane.kod_miesiaca[dt.indeksy],
+        konsumpcja=dane.konsumpcja[dt.indeksy],
+        produkcja_pv_1kwp=dane.produkcja_pv_1kwp[dt.indeksy],
+        cena_eksportu=dane.cena_eksportu[dt.indeksy],
+        cena_energii=dane.cena_energii[dt.indeksy],
+        koszt_dystrybucji=dane.koszt_dystrybucji[dt.indeksy],
+        skrot=f"{dane.skrot}|dni_typowe:{len(dt.dni_typowe)}" if dane.skrot else '',
+    )
+
+
+def zloz_rok(dt, dane, przebieg, moc_pv_kwp, produkcja_wiatr, wygasanie_portfela_miesiace=0, uzyj_jit=True,
+             tylko_sumy=False):
+    # Rok z przebiegu silnika na szeregu dni typowych (`przebieg` - wynik silnik.symuluj_bilans,
+    # `produkcja_wiatr` - produkcja wiatrowa szeregu). Wynik w układzie symuluj_bilans: sumy oraz
+    # (bez `tylko_sumy`) macierz miesięczna i tablice interwałowe roku (przepływy dnia typowego,
+    # portfel na koniec doby)
+    odw = dt.odwzorowanie
+    przeplywy = przebieg['interwaly']
+    poczatki = dt.poczatki_dni
+
+    # Rozliczenie: przepływy z siecią dnia typowego po cenach danego dnia, dwa interwały na dobę
+    eksport = np.asarray(przeplywy['Sprzedaz_Siec_KWh'])[odw]
+    zakup = np.asarray(przeplywy['Zakup_Siec_KWh'])[odw]
+
+    def na_dobe(tablica):
+        return np.add.reduceat(tablica, poczatki) if len(poczatki) else np.zeros(0)
+
+    def srednia(wartosc, ilosc):
+        return np.divide(wartosc, ilosc, out=np.zeros_like(wartosc), where=ilosc > 0)
+
+    def przeplatane(a, b):
+        return np.column_stack([a, b]).reshape(-1)
+
+    eksport_doby = na_dobe(eksport)
+    zakup_doby = na_dobe(zakup)
+    zero = np.zeros(len(poczatki))
+    rozliczenie = silnik.symuluj_bilans(
+        przeplatane(eksport_doby, zero), np.zeros(2 * len(poczatki)), przeplatane(zero, zakup_doby),
+        przeplatane(srednia(na_dobe(eksport * np.maximum(dane.cena_eksportu, 0.0)), eksport_doby), zero),
+        przeplatane(zero, srednia(na_dobe(zakup * dane.cena_energii), zakup_doby)),
+        przeplatane(zero, srednia(na_dobe(zakup * dane.koszt_dystrybucji), zakup_doby)),
+        np.repeat(np.asarray(dane.kod_miesiaca)[poczatki], 2), 1.0, 0.0, 0.0, 0.0, 1.0, uzyj_jit=uzyj_jit,
+        wygasanie_portfela_miesiace=wygasanie_portfela_miesiace
+    )
+
+    # Energie roku: przepływy dni liczonych ważone liczbą interwałów roku, które reprezentują
+    krotnosc = dt.krotnosc
+    produkcja_pv = moc_pv_kwp * np.asarray(dane.produkcja_pv_1kwp)[dt.indeksy]
+    sumy = rozliczenie['sumy'].copy()
+    sumy[silnik.S_PRODUKCJA_PV] = krotnosc @ produkcja_pv
+    sumy[silnik.S_PRODUKCJA_WIATR] = krotnosc @ np.asarray(produkcja_wiatr, dtype=np.float64)
+    sumy[silnik.S_AC_PV] = krotnosc @ np.asarray(przeplywy['AC_PV_KWh'])
+    sumy[silnik.S_AC_WIATR] = krotnosc @ np.asarray(przeplywy['AC_Wiatr_KWh'])
+    sumy[silnik.S_AC_ESS] = krotnosc @ np.asarray(przeplywy['AC_ESS_KWh'])
+    sumy[silnik.S_SOC] = przebieg['sumy'][silnik.S_SOC]
+    if tylko_sumy:
+        return {'sumy': sumy}
+
+    # Kolumny energii macierzy miesięcznej z przepływów dni typowych, portfel i rachunek z rozliczenia
+    interwaly = {k: np.asarray(v)[odw] for k, v in przeplywy.items()}
+    miesiace = rozliczenie['miesiace'].copy()
+    segment, _ = silnik.segmenty_miesieczne(dane.kod_miesiaca)
+    poprawne = segment >= 0
+    autokonsumpcja = interwaly['AC_PV_KWh'] + interwaly['AC_Wiatr_KWh'] + interwaly['AC_ESS_KWh']
+    for kolumna, tablica in ((silnik.M_PRODUKCJA, (produkcja_pv + produkcja_wiatr)[odw]),
+                             (silnik.M_KONSUMPCJA, np.asarray(dane.konsumpcja)[dt.indeksy][odw]),
+                             (silnik.M_AUTOKONSUMPCJA, autokonsumpcja), (silnik.M_AC_PV, interwaly['AC_PV_KWh']),
+                             (silnik.M_AC_WIATR, interwaly['AC_Wiatr_KWh']), (silnik.M_AC_ESS, interwaly['AC_ESS_KWh'])):
+        miesiace[:, kolumna] = np.bincount(segment[poprawne], weights=tablica[poprawne], minlength=len(miesiace))
+
+    dzien_interwalu = np.repeat(np.arange(len(poczatki)), np.diff(np.r_[poczatki, len(odw)]))
+    interwaly['Portfel_PLN'] = rozliczenie['interwaly']['Portfel_PLN'][1::2][dzien_interwalu]
+    return {'sumy': sumy, 'miesiace': miesiace, 'kody_miesiecy': rozliczenie['kody_miesiecy'],
+            'interwaly': interwaly}
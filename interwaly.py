@@ -0,0 +1,138 @@
+import io
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+# =========================================================================
+# --- WYNIKI INTERWAŁOWE (AUDYT, RAPORTY DLA KLIENTA, EKSPORT KOLUMNOWY) ---
+# =========================================================================
+# Struktura tablic (jedna tablica na przepływ) z przebiegu silnika. Energie trzymane są
+# jako float32 (dokładność ~1e-7 względna wystarcza na kWh w interwale), saldo portfela
+# jako float64. Konwersja do DataFrame i tabeli Arrow nie kopiuje tablic; agregaty
+# dzienne i godzinowe liczone są z tablic (np.add.reduceat w float64).
+
+FORMATY_ZAPISU = ('parquet', 'feather')
+ROZSZERZENIA = {'parquet': '.parquet', 'feather': '.feather'}
+
+# Okresy agregacji: kod -> (jednostka datetime64, nazwa kolumny okresu)
+CZESTOTLIWOSCI = {'D': ('datetime64[D]', 'Dzień'), 'h': ('datetime64[h]', 'Godzina')}
+
+# Kolumny stanu (na koniec okresu), pozostałe są sumowane
+KOLUMNY_STANU = ('ESS_SoC_KWh', 'Portfel_PLN')
+
+
+@dataclass(frozen=True, eq=False)
+class WynikiInterwalowe:
+    data: np.ndarray                # datetime64[ns]
+    konsumpcja: np.ndarray          # float32 [kWh]
+    produkcja_pv: np.ndarray        # float32 [kWh]
+    produkcja_wiatr: np.ndarray     # float32 [kWh]
+    ac_pv: np.ndarray               # float32 [kWh] autokonsumpcja z PV
+    ac_wiatr: np.ndarray            # float32 [kWh] autokonsumpcja z wiatru
+    ac_ess: np.ndarray              # float32 [kWh] autokonsumpcja z magazynu
+    ess_ladowanie: np.ndarray       # float32 [kWh] po stronie AC
+    ess_rozladowanie: np.ndarray    # float32 [kWh]
+    eksport: np.ndarray             # float32 [kWh]
+    zakup: np.ndarray               # float32 [kWh]
+    soc: np.ndarray                 # float32 [kWh] na koniec interwału
+    portfel: np.ndarray             # float64 [zł] na koniec interwału
+
+    def __len__(self):
+        return len(self.data)
+
+
+# Nazwy kolumn w DataFrame / Arrow / plikach (jak w raportach kalkulatora)
+NAZWY_KOLUMN = {
+    'data': 'Data', 'konsumpcja': 'Konsumpcja_KWh', 'produkcja_pv': 'Produkcja_PV_KWh',
+    'produkcja_wiatr': 'Produkcja_Wiatr_KWh', 'ac_pv': 'AC_PV_KWh', 'ac_wiatr': 'AC_Wiatr_KWh',
+    'ac_ess': 'AC_ESS_KWh', 'ess_ladowanie': 'ESS_Ladowanie_KWh', 'ess_rozladowanie': 'ESS_Rozladowanie_KWh',
+    'eksport': 'Sprzedaz_Siec_KWh', 'zakup': 'Zakup_Siec_KWh', 'soc': 'ESS_SoC_KWh', 'portfel': 'Portfel_PLN',
+}
+
+
+def z_bilansu(data, konsumpcja, produkcja_pv, produkcja_wiatr, interwaly):
+    # `interwaly` - słownik tablic silnik.symuluj_bilans(...)['interwaly']; wynik tylko do odczytu
+    def tylko_odczyt(tablica, typ):
+        widok = np.asarray(tablica, dtype=typ).view()
+        widok.flags.writeable = False
+        return widok
+
+    def f32(tablica):
+        return tylko_odczyt(tablica, np.float32)
+
+    return WynikiInterwalowe(
+        data=tylko_odczyt(data, 'datetime64[ns]'),
+        konsumpcja=f32(konsumpcja), produkcja_pv=f32(produkcja_pv), produkcja_wiatr=f32(produkcja_wiatr),
+        ac_pv=f32(interwaly['AC_PV_KWh']), ac_wiatr=f32(interwaly['AC_Wiatr_KWh']),
+        ac_ess=f32(interwaly['AC_ESS_KWh']), ess_ladowanie=f32(interwaly['ESS_Ladowanie_KWh']),
+        ess_rozladowanie=f32(interwaly['ESS_Rozladowanie_KWh']), eksport=f32(interwaly['Sprzedaz_Siec_KWh']),
+        zakup=f32(interwaly['Zakup_Siec_KWh']), soc=f32(interwaly['ESS_SoC_KWh']),
+        portfel=tylko_odczyt(interwaly['Portfel_PLN'], np.float64),
+    )
+
+
+def kolumny(wyniki):
+    return {NAZWY_KOLUMN[f.name]: getattr(wyniki, f.name) for f in fields(WynikiInterwalowe)}
+
+
+def jako_dataframe(wyniki):
+    # Bez kopiowania: każda kolumna zostaje osobnym blokiem na tablicy z `wyniki`
+    return pd.DataFrame(kolumny(wyniki), copy=False)
+
+
+def jako_tabele_arrow(wyniki):
+    # `wyniki` - WynikiInterwalowe albo DataFrame (np. agregat z agreguj_wyniki)
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ValueError(f"❌ Tabela Arrow wymaga pakietu pyarrow. {e}") from e
+    if isinstance(wyniki, pd.DataFrame):
+        return pa.Table.from_pandas(wyniki, preserve_index=False)
+    return pa.table(kolumny(wyniki))
+
+
+def zapisz(wyniki, cel, format_zapisu='parquet'):
+    # `cel` - ścieżka albo obiekt plikowy
+    if format_zapisu not in FORMATY_ZAPISU:
+        raise ValueError(f"❌ Nieobsługiwany format '{format_zapisu}' (dozwolone: {', '.join(FORMATY_ZAPISU)}).")
+    tabela = jako_tabele_arrow(wyniki)
+    if format_zapisu == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(tabela, cel, compression='zstd')
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(tabela, cel, compression='zstd')
+
+
+def do_bajtow(wyniki, format_zapisu='parquet'):
+    bufor = io.BytesIO()
+    zapisz(wyniki, bufor, format_zapisu)
+    return bufor.getvalue()
+
+
+def agreguj(data, tablice, czestotliwosc='D'):
+    # Sumy przepływów i stan na koniec okresu ('D' - doba, 'h' - godzina) z tablic interwałowych;
+    # dane uporządkowane w czasie, kolejne interwały tego samego okresu tworzą jeden wiersz
+    if czestotliwosc not in CZESTOTLIWOSCI:
+        raise ValueError(f"❌ Nieobsługiwany okres agregacji '{czestotliwosc}' (dozwolone: {', '.join(CZESTOTLIWOSCI)}).")
+    jednostka, nazwa_okresu = CZESTOTLIWOSCI[czestotliwosc]
+    okres = np.asarray(data, dtype='datetime64[ns]').astype(jednostka)
+    if len(okres) == 0:
+        return pd.DataFrame(columns=[nazwa_okresu, *tablice])
+    poczatki = np.flatnonzero(np.r_[True, okres[1:] != okres[:-1]])
+    konce = np.r_[poczatki[1:], len(okres)] - 1
+
+    raport = {nazwa_okresu: okres[poczatki].astype('datetime64[ns]')}
+    for nazwa, tablica in tablice.items():
+        if nazwa in KOLUMNY_STANU:
+            raport[nazwa] = np.asarray(tablica)[konce]
+        else:
+            raport[nazwa] = np.add.reduceat(tablica, poczatki, dtype=np.float64)
+    return pd.DataFrame(raport, copy=False)
+
+
+def agreguj_wyniki(wyniki, czestotliwosc='D'):
+    tablice = kolumny(wyniki)
+    data = tablice.pop('Data')
+    return agreguj(data, tablice, czestotliwosc)
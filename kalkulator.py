@@ -0,0 +1,717 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+import silnik
+from pomiary import licznik, mierzony, odcinek
+from strategie import STRATEGIE_ESS, wybierz_strategie
+from interwaly import agreguj, z_bilansu
+from taryfy import (
+    UDZIAL_ZWROTU_PORTFELA_DOMYSLNY, skompiluj_taryfe, skrot_taryfy, wczytaj_taryfe, zastosuj_taryfe
+)
+from dni_typowe import TRYB_DNI_TYPOWYCH, dane_dni_typowych, wyznacz_dni_typowe, zloz_rok
+from dane import DaneWejsciowe, przygotuj_dane, wczytaj_dane, agreguj_dane, poczatki_okresow, rozdzielczosc
+
+# =========================================================================
+# --- STAŁE FINANSOWE I REFERENCYJNE (ZAKTUALIZOWANE O NOWE LIMITY) ---
+# =========================================================================
+ULGA_MAX_KWOTA = 53000.0
+REF_PRODUKCJA_WIATR_KWH_KW_ROK = 1000.0
+
+# Limity dotacji jednostkowe (np. z programu "Moja Elektrownia Wiatrowa")
+MAX_DOTACJA_WIATR_NA_KW = 5000.0
+MAX_DOTACJA_ESS_NA_KWH = 6000.0
+
+# Nowe, dodane limity maksymalne KWOTOWE (z netbilling2.py)
+MAX_DOTACJA_WIATR_KWOTOWY = 30000.0
+MAX_DOTACJA_ESS_KWOTOWY = 17000.0
+
+# Ustawienia ESS (techniczne)
+ESS_RT_EFFICIENCY = 0.90
+# Krok danych 15-minutowych; symulacja bierze krok ze znaczników czasu (dane.rozdzielczosc)
+INTERWAL_H = 0.25
+
+# Parametry wejściowe run_simulation (bez df_dane) - kolumny tabeli wariantów
+PARAMETRY_SYMULACJI = ['moc_pv_kwp', 'koszt_pv_total', 'moc_turbina_kw', 'koszt_turbiny_wiatrowej',
+                       'ess_pojemnosc_kwh', 'ess_moc_ladowania_kw', 'ess_moc_rozladowania_kw',
+                       'cena_magazynu_total', 'korzysta_z_dotacji', 'korzysta_z_ulgi_termomodernizacyjnej',
+                       'stawka_podatkowa_procent', 'procent_pracy_turbiny']
+
+# Wartości domyślne (jak w panelu bocznym aplikacji) - uzupełniają niepełne scenariusze
+DOMYSLNE_PARAMETRY = {
+    'moc_pv_kwp': 5.0, 'koszt_pv_total': 25000.0, 'moc_turbina_kw': 2.0, 'koszt_turbiny_wiatrowej': 30000.0,
+    'ess_pojemnosc_kwh': 10.0, 'ess_moc_ladowania_kw': 5.0, 'ess_moc_rozladowania_kw': 5.0,
+    'cena_magazynu_total': 40000.0, 'korzysta_z_dotacji': True, 'korzysta_z_ulgi_termomodernizacyjnej': True,
+    'stawka_podatkowa_procent': 18.0, 'procent_pracy_turbiny': 100,
+}
+
+# --- PRODUKCJA WIATROWA: PROFILE I WEKTOROWY GENERATOR ---
+PROFIL_MIESIECZNY_WIATR = np.array([0.15, 0.14, 0.12, 0.10, 0.09, 0.08, 0.07, 0.08, 0.10, 0.12, 0.14, 0.13])
+PROFIL_GODZINOWY_WIATR = np.array([
+    0.05, 0.06, 0.07, 0.08, 0.07, 0.06,
+    0.05, 0.04, 0.04, 0.03, 0.03, 0.04,
+    0.04, 0.05, 0.04, 0.04, 0.05, 0.06,
+    0.06, 0.07, 0.07, 0.06, 0.06, 0.05
+])
+PROFIL_GODZINOWY_WIATR /= PROFIL_GODZINOWY_WIATR.sum()
+PROFIL_MIESIECZNY_WIATR /= PROFIL_MIESIECZNY_WIATR.sum()
+
+# Domyślny profil jako macierz 12 x 24 (miesiąc x godzina)
+PROFIL_WIATR_12X24 = np.outer(PROFIL_MIESIECZNY_WIATR, PROFIL_GODZINOWY_WIATR)
+
+# Znormalizowane kształty (suma = 1) per kalendarz i profil - zmiana mocy turbiny
+# czy procentu pracy to już tylko mnożenie przez skalar
+_ksztalty_wiatru = OrderedDict()
+_blokada_ksztaltow = threading.Lock()
+MAX_KSZTALTOW_W_PAMIECI = 16
+
+
+def _skrot_tablicy(tablica):
+    tablica = np.ascontiguousarray(tablica)
+    return hashlib.sha1(tablica.tobytes() + str(tablica.dtype).encode()).hexdigest()
+
+
+def ksztalt_wiatru(miesiac, godzina, profil=None, czas_h=None):
+    # Zwraca udział każdego interwału w rocznej produkcji wiatrowej (tablica tylko do odczytu).
+    # `profil`: None (profil domyślny), macierz 12 x 24 (miesiąc x godzina) albo zmierzona
+    # seria z lokalizacji o długości równej liczbie interwałów.
+    # `czas_h` - długości interwałów danych o zmiennym kroku (moc z profilu 12x24 razy czas trwania)
+    miesiac = np.asarray(miesiac)
+    godzina = np.asarray(godzina)
+    profil = PROFIL_WIATR_12X24 if profil is None else np.asarray(profil, dtype=np.float64)
+
+    if profil.shape == (12, 24):
+        klucz = (_skrot_tablicy(miesiac), _skrot_tablicy(godzina), _skrot_tablicy(profil),
+                 None if czas_h is None else _skrot_tablicy(czas_h))
+    elif profil.ndim == 1 and len(profil) == len(miesiac):
+        klucz = (_skrot_tablicy(profil),)
+    else:
+        raise ValueError(f"Profil wiatru musi być macierzą 12x24 albo serią długości {len(miesiac)}, otrzymano kształt {profil.shape}.")
+
+    with _blokada_ksztaltow:
+        ksztalt = _ksztalty_wiatru.get(klucz)
+        if ksztalt is not None:
+            _ksztalty_wiatru.move_to_end(klucz)
+            return ksztalt
+
+    if profil.ndim == 2:
+        miesiac_idx = miesiac.astype(np.intp) - 1
+        godzina_idx = godzina.astype(np.intp)
+        poprawne = (miesiac_idx >= 0) & (miesiac_idx < 12) & (godzina_idx >= 0) & (godzina_idx < 24)
+        wskazniki = np.where(poprawne, profil[np.where(poprawne, miesiac_idx, 0), np.where(poprawne, godzina_idx, 0)], 0.0)
+        if czas_h is not None:
+            wskazniki = wskazniki * czas_h
+    else:
+        wskazniki = profil.copy()
+
+    suma_wskaznikow = wskazniki.sum()
+    ksztalt = wskazniki / suma_wskaznikow if suma_wskaznikow != 0 else np.zeros(len(wskazniki))
+    ksztalt.setflags(write=False)
+
+    with _blokada_ksztaltow:
+        _ksztalty_wiatru[klucz] = ksztalt
+        while len(_ksztalty_wiatru) > MAX_KSZTALTOW_W_PAMIECI:
+            _ksztalty_wiatru.popitem(last=False)
+    return ksztalt
+
+
+def generuj_produkcje_wiatrowa(df, roczna_produkcja_docelowa_kwh, profil=None):
+    # Produkcja wiatrowa [kWh] dla interwałów z kolumnami 'Miesiąc' i 'Godzina' (df nie jest modyfikowany)
+    return ksztalt_wiatru(df['Miesiąc'].to_numpy(), df['Godzina'].to_numpy(), profil) * roczna_produkcja_docelowa_kwh
+
+
+def produkcja_wiatrowa_dla_danych(dane, roczna_produkcja_docelowa_kwh, profil=None, czas_h=None):
+    # Produkcja wiatrowa [kWh] dla DaneWejsciowe
+    return ksztalt_wiatru(dane.miesiac, dane.godzina, profil, czas_h) * roczna_produkcja_docelowa_kwh
+
+
+# --- DOTACJE I ULGA TERMOMODERNIZACYJNA ---
+def oblicz_finansowanie(koszt_pv_total, moc_turbina_kw, koszt_turbiny_wiatrowej, ess_pojemnosc_kwh,
+                        cena_magazynu_total, korzysta_z_dotacji, korzysta_z_ulgi_termomodernizacyjnej,
+                        stawka_podatkowa_procent):
+    # Koszt bazowy ESS
+    ESS_KOSZT_BAZOWY = cena_magazynu_total
+
+    # --- OBLICZANIE DOTACJI Z NOWYMI LIMITAMI (KROK 1) ---
+    dotacja_magazyn = 0.0
+    dotacja_turbina = 0.0
+
+    if korzysta_z_dotacji:
+        # 1. Limity procentowe (50% kosztów)
+        limit_procentowy_magazyn = ESS_KOSZT_BAZOWY * 0.5
+        limit_procentowy_turbina = koszt_turbiny_wiatrowej * 0.5
+
+        # 2. Limity na kW/kWh
+        limit_kwotowy_na_jednostke_magazyn = ess_pojemnosc_kwh * MAX_DOTACJA_ESS_NA_KWH
+        limit_kwotowy_na_jednostke_turbina = moc_turbina_kw * MAX_DOTACJA_WIATR_NA_KW
+
+        # 3. Limity maksymalne KWOTOWE (Nowe!)
+        limit_max_kwotowy_turbina = MAX_DOTACJA_WIATR_KWOTOWY
+        limit_max_kwotowy_magazyn = MAX_DOTACJA_ESS_KWOTOWY
+
+        # Dotacja to minimum z tych 3 limitów dla każdego elementu
+        dotacja_magazyn = min(limit_procentowy_magazyn,
+                              limit_kwotowy_na_jednostke_magazyn,
+                              limit_max_kwotowy_magazyn)
+
+        dotacja_turbina = min(limit_procentowy_turbina,
+                              limit_kwotowy_na_jednostke_turbina,
+                              limit_max_kwotowy_turbina)
+
+    dotacja_calkowita = dotacja_magazyn + dotacja_turbina
+
+    koszt_ess_po_dotacji = ESS_KOSZT_BAZOWY - dotacja_magazyn
+    koszt_turbiny_po_dotacji = koszt_turbiny_wiatrowej - dotacja_turbina
+
+    koszt_inwestycji_po_dotacji = koszt_pv_total + koszt_ess_po_dotacji + koszt_turbiny_po_dotacji
+
+    # --- OBLICZANIE ULGI TERMODERNIZACYJNE (KROK 2) ---
+    if korzysta_z_ulgi_termomodernizacyjnej:
+        kwota_do_odliczenia = min(koszt_inwestycji_po_dotacji, ULGA_MAX_KWOTA)
+        ulga_wartosc_pln = kwota_do_odliczenia * (stawka_podatkowa_procent / 100.0)
+        koszt_inwestycji_netto = koszt_inwestycji_po_dotacji - ulga_wartosc_pln
+    else:
+        ulga_wartosc_pln = 0.0
+        koszt_inwestycji_netto = koszt_inwestycji_po_dotacji
+
+    return {
+        'dotacja_calkowita': dotacja_calkowita,
+        'ulga_wartosc_pln': ulga_wartosc_pln,
+        'koszt_inwestycji_netto': koszt_inwestycji_netto,
+    }
+
+
+# --- WYNIKI ROCZNE (WSPÓLNE DLA POJEDYNCZEJ SYMULACJI I WARIANTÓW) ---
+def podsumuj_rok(sumy, suma_konsumpcji_kwh, koszt_bez_pv, finansowanie, udzial_zwrotu_portfela=UDZIAL_ZWROTU_PORTFELA_DOMYSLNY,
+                 oplaty_stale=0.0):
+    # `sumy` to wektor sum rocznych z silnika (indeksy silnik.S_*); udział zwrotu i opłaty stałe
+    # (na rachunku z instalacją i bez niej) z taryfy - patrz taryfy.py
+    suma_produkcji_pv_kwh = sumy[silnik.S_PRODUKCJA_PV]
+    suma_produkcji_wiatr_kwh = sumy[silnik.S_PRODUKCJA_WIATR]
+    # Środki wygasłe w trakcie roku rozliczane jak nadwyżka na koniec roku
+    portfel_pln = sumy[silnik.S_PORTFEL] + sumy[silnik.S_PORTFEL_WYGASLY]
+
+    rachunek_po_pv = sumy[silnik.S_DYSTRYBUCJA] + sumy[silnik.S_ENERGIA_DO_ZAPLATY] + oplaty_stale
+    koszt_bez_pv = koszt_bez_pv + oplaty_stale
+
+    # Obliczenie oszczędności z uniknięcia zakupu (koszt bez PV - rachunek po PV)
+    oszczednosci_z_unikniecia_zakupu = koszt_bez_pv - rachunek_po_pv
+
+    wyplata_z_portfela = portfel_pln * udzial_zwrotu_portfela
+
+    oszczednosci_calkowite_roczne = oszczednosci_z_unikniecia_zakupu + wyplata_z_portfela
+
+    koszt_inwestycji_netto = finansowanie['koszt_inwestycji_netto']
+    okres_zwrotu = koszt_inwestycji_netto / oszczednosci_calkowite_roczne if oszczednosci_calkowite_roczne > 0 else float('inf')
+
+    suma_calkowita_produkcji_kwh = suma_produkcji_pv_kwh + suma_produkcji_wiatr_kwh
+    suma_calkowita_autokonsumpcji_kwh = sumy[silnik.S_AC_PV] + sumy[silnik.S_AC_WIATR] + sumy[silnik.S_AC_ESS]
+
+    procent_samo_zuzycia = (suma_calkowita_autokonsumpcji_kwh / suma_calkowita_produkcji_kwh) * 100 if suma_calkowita_produkcji_kwh > 0 else 0.0
+    procent_samo_wystarczalnosci = (suma_calkowita_autokonsumpcji_kwh / suma_konsumpcji_kwh) * 100 if suma_konsumpcji_kwh > 0 else 0.0
+
+    # Klucze dostosowane do netbilling2.py
+    return {
+        'Oszczędności całkowite': oszczednosci_calkowite_roczne,
+        'Rachunek do zapłaty': rachunek_po_pv,
+        'Koszt inwestycji Całkowity': koszt_inwestycji_netto, # Zmieniony klucz
+        'Okres zwrotu (lat)': okres_zwrotu,
+        'Procent samo-wystarczalności': procent_samo_wystarczalnosci,
+        'Procent samo-zużycia': procent_samo_zuzycia,
+        'Produkcja PV [kWh]': suma_produkcji_pv_kwh,
+        'Produkcja Wiatr [kWh]': suma_produkcji_wiatr_kwh,
+        'Wartość Dotacji': finansowanie['dotacja_calkowita'],
+        'Wartość Odliczenia (Ulga)': finansowanie['ulga_wartosc_pln'],
+    }
+
+
+def raport_miesieczny(kody_miesiecy, miesiace, moc_pv_kwp):
+    # Wiersze raportu miesięcznego (wykres bilansu) z macierzy miesięcznej silnika
+    raport_miesieczny_dane = []
+    if moc_pv_kwp == moc_pv_kwp:
+        for kod, m in zip(np.asarray(kody_miesiecy).tolist(), miesiace):
+            raport_miesieczny_dane.append({
+                'Miesiąc': pd.Period(year=kod // 12, month=kod % 12 + 1, freq='M'),
+                'Portfel_PLN_Poczatek': m[silnik.M_PORTFEL_POCZATEK],
+                'Portfel_PLN_Koniec': m[silnik.M_PORTFEL_KONIEC],
+                'Rachunek_Do_Zaplaty_PLN': m[silnik.M_DYSTRYBUCJA] + m[silnik.M_ENERGIA_DO_ZAPLATY],
+                'Produkcja_KWh': m[silnik.M_PRODUKCJA],
+                'Autokonsumpcja_KWh': m[silnik.M_AUTOKONSUMPCJA],
+                'Zakup_Siec_KWh': m[silnik.M_ZAKUP],
+                'Sprzedaz_Siec_KWh': m[silnik.M_SPRZEDAZ],
+                'AC_PV_KWh': m[silnik.M_AC_PV],
+                'AC_Wiatr_KWh': m[silnik.M_AC_WIATR],
+                'AC_ESS_KWh': m[silnik.M_AC_ESS],
+                'KWP': moc_pv_kwp
+            })
+    return raport_miesieczny_dane
+
+
+# Bilans dzień po dniu z tablic interwałowych silnika (szczegóły miesiąca na wykresie bilansu)
+KOLUMNY_DZIENNE = ('AC_PV_KWh', 'AC_Wiatr_KWh', 'AC_ESS_KWh', 'Sprzedaz_Siec_KWh', 'Zakup_Siec_KWh',
+                   'ESS_SoC_KWh', 'Portfel_PLN')
+
+
+def raport_dzienny(data, interwaly):
+    # Sumy przepływów na dobę oraz SoC i portfel na koniec doby (dane uporządkowane w czasie)
+    return agreguj(data, {kolumna: interwaly[kolumna] for kolumna in KOLUMNY_DZIENNE}, 'D')
+
+
+# --- OBLICZENIA PRZYROSTOWE (GRAF ETAPÓW Z PAMIĘCIĄ LRU) ---
+# dane -> produkcja wiatrowa -> bilans (dysponowanie ESS + portfel net-billingu) -> finansowanie
+# -> wyniki roczne. Każdy etap zapamiętany na własnych wejściach: zmiana stawki PIT, dotacji
+# czy kosztów inwestycji nie uruchamia pętli bilansu, a zmiana magazynu nie parsuje danych
+# ani nie liczy produkcji wiatrowej od nowa. Bilans w pamięci bez serii interwałowych
+# (tylko sumy, raport miesięczny i dzienny).
+# Serie interwałowe (run_simulation(..., zwroc_interwaly=True)) mają osobną, małą pamięć.
+ROZMIARY_PAMIECI_ETAPOW = {'dane': 4, 'taryfa': 8, 'rozdzielczosc': 8, 'agregacja': 8, 'dni_typowe': 8, 'wiatr': 16,
+                           'bilans': 64, 'interwaly': 4, 'finansowanie': 256, 'wyniki': 256}
+_pamiec_etapow = {etap: OrderedDict() for etap in ROZMIARY_PAMIECI_ETAPOW}
+statystyki_etapow = {etap: {'trafienia': 0, 'obliczenia': 0} for etap in ROZMIARY_PAMIECI_ETAPOW}
+# Dokładne przeliczenia w tle (przelicz_w_tle) korzystają z tej samej pamięci co wątek strony
+_blokada_etapow = threading.Lock()
+
+
+def _etap(etap, klucz, oblicz):
+    pamiec = _pamiec_etapow[etap]
+    with _blokada_etapow:
+        if klucz in pamiec:
+            pamiec.move_to_end(klucz)
+            statystyki_etapow[etap]['trafienia'] += 1
+            licznik(f'etap:{etap}:z_pamieci')
+            return pamiec[klucz]
+    with odcinek(etap):
+        wynik = oblicz()
+    with _blokada_etapow:
+        statystyki_etapow[etap]['obliczenia'] += 1
+        pamiec[klucz] = wynik
+        while len(pamiec) > ROZMIARY_PAMIECI_ETAPOW[etap]:
+            pamiec.popitem(last=False)
+    return wynik
+
+
+def wyczysc_pamiec_etapow():
+    for etap in ROZMIARY_PAMIECI_ETAPOW:
+        _pamiec_etapow[etap].clear()
+        statystyki_etapow[etap].update(trafienia=0, obliczenia=0)
+
+
+def klucz_danych(dane):
+    # Skrót zawartości pliku z wczytaj_dane; dla danych bez skrótu - skrót samych tablic
+    if dane.skrot:
+        return dane.skrot
+    skrot = hashlib.sha1()
+    for tablica in (dane.konsumpcja, dane.produkcja_pv_1kwp, dane.cena_eksportu, dane.cena_energii,
+                    dane.koszt_dystrybucji, dane.kod_miesiaca, dane.godzina):
+        skrot.update(np.ascontiguousarray(tablica).tobytes())
+    return skrot.hexdigest()
+
+
+def dane_etapu(df_dane):
+    # Surowy DataFrame czyszczony raz na zawartość; zwraca (DaneWejsciowe, klucz danych)
+    if isinstance(df_dane, DaneWejsciowe):
+        return df_dane, klucz_danych(df_dane)
+    skrot = hashlib.sha256(pd.util.hash_pandas_object(df_dane, index=True).to_numpy().tobytes()
+                           + str(list(df_dane.columns)).encode()).hexdigest()
+    return _etap('dane', skrot, lambda: przygotuj_dane(df_dane, skrot)), skrot
+
+
+def dane_z_taryfa(df_dane, taryfa=None, okres=None):
+    # Dane z cenami taryfy (patrz taryfy.py); zwraca (DaneWejsciowe, klucz danych, TaryfaSkompilowana).
+    # Bez taryfy - ceny z pliku danych, zwrot 30% portfela, bez opłat stałych i wygasania portfela.
+    # `okres` - 'h' / 'D': dane zsumowane do godzin / dni dla szybkiego podglądu (dane.agreguj_dane)
+    dane, klucz = dane_etapu(df_dane)
+    skompilowana = None
+    if taryfa is not None:
+        definicja = wczytaj_taryfe(taryfa)
+        skrot = skrot_taryfy(definicja)
+
+        def oblicz():
+            skompilowana = skompiluj_taryfe(definicja, dane)
+            return zastosuj_taryfe(dane, skompilowana), skompilowana
+
+        dane, skompilowana = _etap('taryfa', (klucz, skrot), oblicz)
+        klucz = f"{klucz}|taryfa:{skrot}"
+    if okres is not None:
+        pelne = dane
+        dane = _etap('agregacja', (klucz, okres), lambda: agreguj_dane(pelne, okres))
+        klucz = f"{klucz}|agregacja:{okres}"
+    return dane, klucz, skompilowana
+
+
+def rozdzielczosc_danych(dane, klucz):
+    # Krok pomiarowy i długości interwałów (dane.rozdzielczosc) raz na zawartość danych
+    return _etap('rozdzielczosc', klucz, lambda: rozdzielczosc(dane.data))
+
+
+def dni_typowe_danych(dane, klucz, profil_wiatru=None, czas_h=None):
+    # Kompresja roku do dni typowych (dni_typowe.py) raz na dane i profil wiatru
+    klucz_profilu = None if profil_wiatru is None else _skrot_tablicy(np.asarray(profil_wiatru, dtype=np.float64))
+    return _etap('dni_typowe', (klucz, klucz_profilu), lambda: wyznacz_dni_typowe(
+        dane, ksztalt_wiatru(dane.miesiac, dane.godzina, profil_wiatru, czas_h)))
+
+
+def limity_ess(rozdz, moc_ladowania_kw, moc_rozladowania_kw):
+    # Limity energii ESS na krok nominalny [kWh] i mnożnik limitów per interwał dla silnika
+    # (None przy stałym kroku); moce mogą być tablicami wariantów
+    skala_limitow = None if rozdz.regularna else rozdz.czas_h / rozdz.interwal_h
+    return moc_ladowania_kw * rozdz.interwal_h, moc_rozladowania_kw * rozdz.interwal_h, skala_limitow
+
+
+def czas_wiatru(rozdz):
+    # Długości interwałów dla ksztalt_wiatru - tylko przy zmiennym kroku (przy stałym kształt się nie zmienia)
+    return None if rozdz.regularna else rozdz.czas_h
+
+
+def profil_wiatru_okresu(df_dane, profil_wiatru, okres):
+    # Zmierzona seria wiatru (wartość na interwał) zsumowana do okresów podglądu; macierz 12x24 bez zmian
+    if okres is None or profil_wiatru is None or np.ndim(profil_wiatru) != 1:
+        return profil_wiatru
+    data = dane_etapu(df_dane)[0].data
+    poczatki = poczatki_okresow(data, okres)
+    if poczatki is None:
+        return profil_wiatru
+    return np.add.reduceat(np.asarray(profil_wiatru, dtype=np.float64), poczatki)
+
+
+def zasady_taryfy(skompilowana):
+    # Argumenty podsumuj_rok i silnika zależne od taryfy (None = zasady domyślne)
+    if skompilowana is None:
+        return {'udzial_zwrotu_portfela': UDZIAL_ZWROTU_PORTFELA_DOMYSLNY, 'oplaty_stale': 0.0}, 0
+    return ({'udzial_zwrotu_portfela': skompilowana.udzial_zwrotu_portfela,
+             'oplaty_stale': skompilowana.oplaty_stale_rok}, skompilowana.wygasanie_portfela_miesiace)
+
+
+def bilans_strategii(dane, produkcja_wiatr, moc_pv_kwp, ess_pojemnosc_kwh, limit_ladowania_kwh,
+                     limit_rozladowania_kwh, strategia_ess, zasady, wygasanie_portfela=0, skala_limitow=None):
+    # Plan pracy ESS i przebieg silnika bez pamięci etapów (run_simulation i pomiar czasu strategii);
+    # strategia dostaje te same limity per interwał (`skala_limitow`) co silnik
+
+    # --- STRATEGIA PRACY ESS (patrz strategie.py; None = zachłanna autokonsumpcja w pętli silnika) ---
+    with odcinek('strategia_ess'):
+        plan_ess = wybierz_strategie(strategia_ess)(
+            dane, moc_pv_kwp * dane.produkcja_pv_1kwp, produkcja_wiatr, ess_pojemnosc_kwh,
+            ess_pojemnosc_kwh / 2, limit_ladowania_kwh, limit_rozladowania_kwh, ESS_RT_EFFICIENCY,
+            udzial_zwrotu_portfela=zasady['udzial_zwrotu_portfela'], wygasanie_portfela_miesiace=wygasanie_portfela,
+            skala_limitow=skala_limitow
+        )
+
+    # --- PĘTLA SYMULACYJNA (SILNIK NA TABLICACH NUMPY, patrz silnik.py) ---
+    with odcinek('silnik'):
+        return silnik.symuluj_bilans(
+            dane.produkcja_pv_1kwp, produkcja_wiatr, dane.konsumpcja,
+            dane.cena_eksportu, dane.cena_energii, dane.koszt_dystrybucji,
+            dane.kod_miesiaca, moc_pv_kwp, ess_pojemnosc_kwh,
+            limit_ladowania_kwh, limit_rozladowania_kwh, ESS_RT_EFFICIENCY, plan_ess=plan_ess,
+            wygasanie_portfela_miesiace=wygasanie_portfela, skala_limitow=skala_limitow
+        )
+
+
+# --- GŁÓWNA FUNKCJA KALKULATORA (CAŁA LOGIKA SYMULACJI Z NETBILLING2.PY) ---
+@mierzony('run_simulation')
+def run_simulation(moc_pv_kwp, koszt_pv_total, moc_turbina_kw, koszt_turbiny_wiatrowej, 
+                   ess_pojemnosc_kwh, ess_moc_ladowania_kw, ess_moc_rozladowania_kw, 
+                   cena_magazynu_total, korzysta_z_dotacji, korzysta_z_ulgi_termomodernizacyjnej, 
+                   stawka_podatkowa_procent, procent_pracy_turbiny, df_dane, profil_wiatru=None,
+                   strategia_ess='autokonsumpcja', zwroc_interwaly=False, taryfa=None, rozdzielczosc=None):
+    
+    # Skalowanie produkcji wiatrowej
+    wspolczynnik_skali_wiatr = procent_pracy_turbiny / 100.0
+    roczna_produkcja_docelowa_kwh = moc_turbina_kw * REF_PRODUKCJA_WIATR_KWH_KW_ROK * wspolczynnik_skali_wiatr
+    
+    # --- DOTACJE I ULGA TERMOMODERNIZACYJNA (KROK 1 i 2) ---
+    argumenty_finansowania = (koszt_pv_total, moc_turbina_kw, koszt_turbiny_wiatrowej, ess_pojemnosc_kwh,
+                              cena_magazynu_total, korzysta_z_dotacji, korzysta_z_ulgi_termomodernizacyjnej,
+                              stawka_podatkowa_procent)
+    finansowanie = _etap('finansowanie', argumenty_finansowania, lambda: oblicz_finansowanie(*argumenty_finansowania))
+
+    # --- PRZYGOTOWANIE DANYCH (gotowe DaneWejsciowe z wczytaj_dane lub surowy DataFrame) ---
+    # Błędy danych (daty, brakujące kolumny) i definicji taryfy podnoszą ValueError z gotowym komunikatem.
+    # `taryfa` - nazwa z taryfy.TARYFY_WBUDOWANE, ścieżka .json/.yaml albo słownik (None = ceny z pliku)
+    # `rozdzielczosc` - 'h' / 'D': szybki podgląd na danych zsumowanych do godzin / dni,
+    # 'dni_typowe': fizyka tylko na dniach typowych (dni_typowe.py); None = pełne dane
+    dni_typowe = rozdzielczosc == TRYB_DNI_TYPOWYCH
+    if dni_typowe and zwroc_interwaly:
+        raise ValueError("❌ Tryb dni typowych nie zwraca wyników interwałowych - użyj pełnej rozdzielczości.")
+    okres = None if dni_typowe else rozdzielczosc
+    dane, klucz, skompilowana = dane_z_taryfa(df_dane, taryfa, okres)
+    zasady, wygasanie_portfela = zasady_taryfy(skompilowana)
+    profil_wiatru = profil_wiatru_okresu(df_dane, profil_wiatru, okres)
+
+    # Ustawienie limitów ESS dla symulacji (krok pomiarowy ze znaczników czasu)
+    rozdz = rozdzielczosc_danych(dane, klucz)
+    ESS_LADOWANIE_LIMIT_KWH, ESS_ROZLADOWANIE_LIMIT_KWH, skala_limitow = limity_ess(
+        rozdz, ess_moc_ladowania_kw, ess_moc_rozladowania_kw)
+
+    def oblicz_wiatr():
+        if moc_turbina_kw > 0:
+            return produkcja_wiatrowa_dla_danych(dane, roczna_produkcja_docelowa_kwh, profil_wiatru, czas_wiatru(rozdz))
+        return np.zeros(len(dane))
+
+    klucz_wiatru = (klucz, roczna_produkcja_docelowa_kwh if moc_turbina_kw > 0 else 0.0,
+                    None if profil_wiatru is None else _skrot_tablicy(np.asarray(profil_wiatru, dtype=np.float64)))
+    produkcja_wiatr = _etap('wiatr', klucz_wiatru, oblicz_wiatr)
+
+    przebieg = []
+
+    def przebieg_silnika():
+        # Jeden przebieg silnika na wywołanie, nawet gdy potrzebują go etap bilansu i interwałów
+        if not przebieg:
+            dane_sym, wiatr_sym, skala_sym = dane, produkcja_wiatr, skala_limitow
+            if dni_typowe:
+                # Szereg dni typowych zamiast roku; rozliczenie całego roku w zloz_rok
+                dt = dni_typowe_danych(dane, klucz, profil_wiatru, czas_wiatru(rozdz))
+                dane_sym = dane_dni_typowych(dane, dt)
+                wiatr_sym = produkcja_wiatr[dt.indeksy]
+                skala_sym = None if skala_limitow is None else skala_limitow[dt.indeksy]
+
+            bilans = bilans_strategii(dane_sym, wiatr_sym, moc_pv_kwp, ess_pojemnosc_kwh, ESS_LADOWANIE_LIMIT_KWH,
+                                      ESS_ROZLADOWANIE_LIMIT_KWH, strategia_ess, zasady,
+                                      0 if dni_typowe else wygasanie_portfela, skala_sym)
+            if dni_typowe:
+                with odcinek('zloz_rok'):
+                    bilans = zloz_rok(dt, dane, bilans, moc_pv_kwp, wiatr_sym, wygasanie_portfela)
+            przebieg.append(bilans)
+            licznik('interwaly_symulowane', len(dane_sym))
+        return przebieg[0]
+
+    def oblicz_bilans():
+        bilans = przebieg_silnika()
+        with odcinek('raporty'):
+            return {'sumy': bilans['sumy'],
+                    'raport_miesieczny_dane': raport_miesieczny(bilans['kody_miesiecy'], bilans['miesiace'], moc_pv_kwp),
+                    'raport_dzienny_dane': raport_dzienny(dane.data, bilans['interwaly'])}
+
+    klucz_bilansu = (klucz_wiatru, moc_pv_kwp, ess_pojemnosc_kwh, ess_moc_ladowania_kw, ess_moc_rozladowania_kw,
+                     strategia_ess, dni_typowe)
+    bilans = _etap('bilans', klucz_bilansu, oblicz_bilans)
+
+    # KROK 4: Obliczenia końcowe (roczne)
+    wyniki_roczne = _etap('wyniki', (klucz_bilansu, argumenty_finansowania),
+                          lambda: podsumuj_rok(bilans['sumy'], dane.suma_konsumpcji_kwh, dane.koszt_bez_pv, finansowanie,
+                                               **zasady))
+    wynik = {
+        'wyniki_roczne': dict(wyniki_roczne),
+        'raport_miesieczny_dane': [dict(wiersz) for wiersz in bilans['raport_miesieczny_dane']],
+        'raport_dzienny_dane': bilans['raport_dzienny_dane'].copy(),
+        'zasady_taryfy': dict(zasady)
+    }
+    if zwroc_interwaly:
+        # Tablice tylko do odczytu - współdzielone z pamięcią etapu
+        wynik['interwaly'] = _etap('interwaly', klucz_bilansu, lambda: z_bilansu(
+            dane.data, dane.konsumpcja, moc_pv_kwp * dane.produkcja_pv_1kwp, produkcja_wiatr,
+            przebieg_silnika()['interwaly']))
+    return wynik
+
+
+def porownaj_strategie_ess(df_dane, parametry, strategie=None, profil_wiatru=None, taryfa=None):
+    # Ta sama konfiguracja (słownik PARAMETRY_SYMULACJI) liczona każdą strategią pracy magazynu;
+    # 'Dodatkowe oszczędności' względem pierwszej strategii na liście (domyślnie autokonsumpcji).
+    # 'Czas obliczeń [s]' to strategia + silnik liczone zawsze od nowa (wyniki mogą być z pamięci etapów).
+    dane, _ = dane_etapu(df_dane)
+    p = parametry
+    dane_taryfy, klucz, skompilowana = dane_z_taryfa(dane, taryfa)
+    zasady, wygasanie_portfela = zasady_taryfy(skompilowana)
+    rozdz = rozdzielczosc_danych(dane_taryfy, klucz)
+    limit_ladowania, limit_rozladowania, skala_limitow = limity_ess(
+        rozdz, p['ess_moc_ladowania_kw'], p['ess_moc_rozladowania_kw'])
+    produkcja_wiatr_roczna = p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0)
+    produkcja_wiatr = (produkcja_wiatrowa_dla_danych(dane_taryfy, produkcja_wiatr_roczna, profil_wiatru, czas_wiatru(rozdz))
+                       if p['moc_turbina_kw'] > 0 else np.zeros(len(dane_taryfy)))
+
+    wiersze = {}
+    for nazwa in (strategie or list(STRATEGIE_ESS)):
+        wyniki = run_simulation(*(p[k] for k in PARAMETRY_SYMULACJI), dane, profil_wiatru,
+                                strategia_ess=nazwa, taryfa=taryfa)['wyniki_roczne']
+        start = time.perf_counter()
+        bilans_strategii(dane_taryfy, produkcja_wiatr, p['moc_pv_kwp'], p['ess_pojemnosc_kwh'], limit_ladowania,
+                         limit_rozladowania, nazwa, zasady, wygasanie_portfela, skala_limitow)
+        wiersze[getattr(nazwa, '__name__', nazwa)] = {**wyniki, 'Czas obliczeń [s]': time.perf_counter() - start}
+
+    tabela = pd.DataFrame.from_dict(wiersze, orient='index')
+    tabela.insert(1, 'Dodatkowe oszczędności', tabela['Oszczędności całkowite'] - tabela['Oszczędności całkowite'].iloc[0])
+    return tabela
+
+
+# =========================================================================
+# --- ANALIZA WARIANTÓW ("CO JEŚLI?") ---
+# =========================================================================
+def siatka_wariantow(parametry_bazowe, **osie):
+    # Iloczyn kartezjański osi, np. siatka_wariantow(bazowe, moc_pv_kwp=[5, 8], ess_pojemnosc_kwh=[0, 10, 15]);
+    # pozostałe parametry są brane z `parametry_bazowe`
+    nazwy = list(osie)
+    return pd.DataFrame([{**parametry_bazowe, **dict(zip(nazwy, kombinacja))}
+                         for kombinacja in itertools.product(*osie.values())])
+
+
+def _tabela_wariantow(warianty):
+    warianty = pd.DataFrame(warianty).reset_index(drop=True)
+    brakujace = [p for p in PARAMETRY_SYMULACJI if p not in warianty.columns]
+    if brakujace:
+        raise ValueError(f"Brak parametrów wariantów: {brakujace}")
+    return warianty
+
+
+def bilans_wariantow(dane, warianty, profil_wiatru=None, uzyj_jit=True, wygasanie_portfela_miesiace=0, klucz=None):
+    # Sama fizyka (bez finansów): macierz sum rocznych silnika (liczba wariantów, silnik.LICZBA_SUM)
+    # Kształt produkcji wiatrowej znormalizowany do 1 kWh/rok - skalowany wektorowo per wariant
+    rozdz = rozdzielczosc_danych(dane, klucz or klucz_danych(dane))
+    ksztalt = ksztalt_wiatru(dane.miesiac, dane.godzina, profil_wiatru, czas_wiatru(rozdz))
+    limit_ladowania, limit_rozladowania, skala_limitow = limity_ess(
+        rozdz, warianty['ess_moc_ladowania_kw'].to_numpy(dtype=np.float64),
+        warianty['ess_moc_rozladowania_kw'].to_numpy(dtype=np.float64))
+
+    produkcja_wiatr_roczna = (warianty['moc_turbina_kw'].to_numpy(dtype=np.float64) * REF_PRODUKCJA_WIATR_KWH_KW_ROK
+                              * (warianty['procent_pracy_turbiny'].to_numpy(dtype=np.float64) / 100.0))
+
+    return silnik.symuluj_bilans_wsadowo(
+        dane.produkcja_pv_1kwp, ksztalt, dane.konsumpcja,
+        dane.cena_eksportu, dane.cena_energii, dane.koszt_dystrybucji,
+        warianty['moc_pv_kwp'].to_numpy(dtype=np.float64), produkcja_wiatr_roczna,
+        warianty['ess_pojemnosc_kwh'].to_numpy(dtype=np.float64), limit_ladowania, limit_rozladowania,
+        ESS_RT_EFFICIENCY, uzyj_jit=uzyj_jit, kod_miesiaca=dane.kod_miesiaca,
+        wygasanie_portfela_miesiace=wygasanie_portfela_miesiace, skala_limitow=skala_limitow
+    )
+
+
+def podsumuj_warianty(dane, warianty, sumy, skompilowana=None):
+    # Dotacje, ulga i wyniki roczne dla każdego wariantu; wynik: parametry + klucze wyniki_roczne
+    zasady, _ = zasady_taryfy(skompilowana)
+    wiersze = []
+    for k, p in enumerate(warianty[PARAMETRY_SYMULACJI].to_dict('records')):
+        finansowanie = oblicz_finansowanie(
+            p['koszt_pv_total'], p['moc_turbina_kw'], p['koszt_turbiny_wiatrowej'], p['ess_pojemnosc_kwh'],
+            p['cena_magazynu_total'], p['korzysta_z_dotacji'], p['korzysta_z_ulgi_termomodernizacyjnej'],
+            p['stawka_podatkowa_procent']
+        )
+        wiersze.append(podsumuj_rok(sumy[k], dane.suma_konsumpcji_kwh, dane.koszt_bez_pv, finansowanie, **zasady))
+
+    return pd.concat([warianty, pd.DataFrame(wiersze, index=warianty.index)], axis=1)
+
+
+@mierzony('symuluj_warianty')
+def symuluj_warianty(df_dane, warianty, profil_wiatru=None, uzyj_jit=True, taryfa=None, rozdzielczosc=None):
+    # Jedno przygotowanie danych i jedno przejście przez rok dla wszystkich konfiguracji naraz.
+    # `df_dane` to surowy DataFrame albo DaneWejsciowe (np. z wczytaj_dane), `warianty` to DataFrame
+    # lub lista słowników z kolumnami PARAMETRY_SYMULACJI. Wynik: parametry + klucze wyniki_roczne.
+    # `rozdzielczosc` - 'h' / 'D' / 'dni_typowe' dla szybkiego przeglądu dużych siatek (jak w run_simulation)
+    warianty = _tabela_wariantow(warianty)
+    if rozdzielczosc == TRYB_DNI_TYPOWYCH:
+        dane, klucz, skompilowana = dane_z_taryfa(df_dane, taryfa)
+        _, wygasanie_portfela = zasady_taryfy(skompilowana)
+        sumy = bilans_wariantow_dni_typowych(dane, klucz, warianty, profil_wiatru, uzyj_jit, wygasanie_portfela)
+        return podsumuj_warianty(dane, warianty, sumy, skompilowana)
+    dane, klucz, skompilowana = dane_z_taryfa(df_dane, taryfa, rozdzielczosc)
+    _, wygasanie_portfela = zasady_taryfy(skompilowana)
+    profil_wiatru = profil_wiatru_okresu(df_dane, profil_wiatru, rozdzielczosc)
+    sumy = bilans_wariantow(dane, warianty, profil_wiatru, uzyj_jit, wygasanie_portfela, klucz)
+    return podsumuj_warianty(dane, warianty, sumy, skompilowana)
+
+
+def bilans_wariantow_dni_typowych(dane, klucz, warianty, profil_wiatru=None, uzyj_jit=True,
+                                  wygasanie_portfela_miesiace=0):
+    # Jak bilans_wariantow, ale fizyka każdego wariantu tylko na szeregu dni typowych (reguła zachłanna)
+    rozdz = rozdzielczosc_danych(dane, klucz)
+    dt = dni_typowe_danych(dane, klucz, profil_wiatru, czas_wiatru(rozdz))
+    dane_sym = dane_dni_typowych(dane, dt)
+    ksztalt = ksztalt_wiatru(dane.miesiac, dane.godzina, profil_wiatru, czas_wiatru(rozdz))[dt.indeksy]
+    sumy = np.zeros((len(warianty), silnik.LICZBA_SUM))
+    for k, p in enumerate(warianty[PARAMETRY_SYMULACJI].to_dict('records')):
+        limit_ladowania, limit_rozladowania, skala_limitow = limity_ess(
+            rozdz, p['ess_moc_ladowania_kw'], p['ess_moc_rozladowania_kw'])
+        wiatr = ksztalt * (p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0))
+        przebieg = silnik.symuluj_bilans(
+            dane_sym.produkcja_pv_1kwp, wiatr, dane_sym.konsumpcja, dane_sym.cena_eksportu, dane_sym.cena_energii,
+            dane_sym.koszt_dystrybucji, dane_sym.kod_miesiaca, p['moc_pv_kwp'], p['ess_pojemnosc_kwh'],
+            limit_ladowania, limit_rozladowania, ESS_RT_EFFICIENCY, uzyj_jit=uzyj_jit,
+            skala_limitow=None if skala_limitow is None else skala_limitow[dt.indeksy]
+        )
+        sumy[k] = zloz_rok(dt, dane, przebieg, p['moc_pv_kwp'], wiatr, wygasanie_portfela_miesiace, uzyj_jit,
+                           tylko_sumy=True)['sumy']
+    return sumy
+
+
+# =========================================================================
+# --- SZYBKI PODGLĄD I DOKŁADNE PRZELICZENIE W TLE ---
+# =========================================================================
+# run_simulation(..., rozdzielczosc='h' albo 'D') liczy na danych zsumowanych do godzin / dni:
+# dla 15-minutowego roku to 4x / 96x mniej interwałów. W okresie produkcja i zużycie traktowane
+# są jak jednoczesne, więc podgląd zawyża autokonsumpcję (i oszczędności) - górną granicę tej
+# różnicy bez magazynu daje oszacuj_blad_podgladu jeszcze przed dokładnym przebiegiem,
+# a po nim roznice_wynikow pokazuje różnice rzeczywiste. Tryb 'dni_typowe' (dni_typowe.py) liczy
+# fizykę na kilkunastu ważonych dniach reprezentatywnych; jego odchylenie od pełnego roku na
+# bieżących danych podaje porownaj_dni_typowe.
+_wykonawca_w_tle = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dokladna_symulacja')
+
+# Wyniki porównywane między podglądem a przebiegiem dokładnym
+KLUCZE_BLEDU_PODGLADU = ('Oszczędności całkowite', 'Rachunek do zapłaty', 'Okres zwrotu (lat)',
+                         'Procent samo-wystarczalności', 'Procent samo-zużycia')
+
+
+def przelicz_w_tle(*args, **kwargs):
+    # run_simulation w wątku roboczym; zwraca concurrent.futures.Future z wynikiem
+    return _wykonawca_w_tle.submit(run_simulation, *args, **kwargs)
+
+
+def oszacuj_blad_podgladu(df_dane, parametry, okres, profil_wiatru=None, taryfa=None):
+    # Energia, którą podgląd uznaje za autokonsumpcję, choć w pełnej rozdzielczości produkcja i zużycie
+    # się mijają: suma po okresach min(ΣP, ΣZ) - Σmin(P, Z) [kWh], oraz jej wartość wg cen zakupu
+    # (energia + dystrybucja) - górne oszacowanie zawyżenia oszczędności przez podgląd bez magazynu
+    p = parametry
+    dane, klucz, _ = dane_z_taryfa(df_dane, taryfa)
+    poczatki = poczatki_okresow(dane.data, okres)
+    if poczatki is None:
+        return {'Energia netowana w okresach [kWh]': 0.0, 'Górne oszacowanie błędu oszczędności [PLN]': 0.0}
+    rozdz = rozdzielczosc_danych(dane, klucz)
+    roczna_wiatr = p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0)
+    produkcja = p['moc_pv_kwp'] * dane.produkcja_pv_1kwp
+    if roczna_wiatr > 0:
+        produkcja = produkcja + produkcja_wiatrowa_dla_danych(dane, roczna_wiatr, profil_wiatru, czas_wiatru(rozdz))
+
+    netowane = (np.minimum(np.add.reduceat(produkcja, poczatki), np.add.reduceat(dane.konsumpcja, poczatki))
+                - np.add.reduceat(np.minimum(produkcja, dane.konsumpcja), poczatki))
+    cena_zakupu = np.add.reduceat(dane.konsumpcja * (dane.cena_energii + dane.koszt_dystrybucji), poczatki)
+    zuzycie = np.add.reduceat(dane.konsumpcja, poczatki)
+    cena_zakupu = np.divide(cena_zakupu, zuzycie, out=np.zeros_like(zuzycie), where=zuzycie > 0)
+    return {'Energia netowana w okresach [kWh]': float(netowane.sum()),
+            'Górne oszacowanie błędu oszczędności [PLN]': float((netowane * cena_zakupu).sum())}
+
+
+def roznice_wynikow(podglad, dokladny, klucze=KLUCZE_BLEDU_PODGLADU):
+    # Wyniki roczne podglądu i przebiegu dokładnego (słowniki wyniki_roczne) z różnicą bezwzględną i względną
+    wiersze = {}
+    for k in klucze:
+        a, b = float(podglad[k]), float(dokladny[k])
+        roznica = a - b if np.isfinite(a) and np.isfinite(b) else (0.0 if a == b else float('inf'))
+        wiersze[k] = {'Podgląd': a, 'Dokładnie': b, 'Różnica': roznica,
+                      'Różnica [%]': 100.0 * roznica / abs(b) if np.isfinite(b) and b != 0 else float('nan')}
+    return pd.DataFrame.from_dict(wiersze, orient='index')
+
+
+def porownaj_dni_typowe(df_dane, parametry, profil_wiatru=None, taryfa=None, strategia_ess='autokonsumpcja'):
+    # Odchylenie trybu dni typowych od pełnego roku dla bieżących danych i konfiguracji (słownik PARAMETRY_SYMULACJI)
+    argumenty = [parametry[p] for p in PARAMETRY_SYMULACJI]
+    przyblizone = run_simulation(*argumenty, df_dane, profil_wiatru, strategia_ess=strategia_ess, taryfa=taryfa,
+                                 rozdzielczosc=TRYB_DNI_TYPOWYCH)['wyniki_roczne']
+    dokladne = run_simulation(*argumenty, df_dane, profil_wiatru, strategia_ess=strategia_ess,
+                              taryfa=taryfa)['wyniki_roczne']
+    tabela = roznice_wynikow(przyblizone, dokladne)
+    dane, klucz, _ = dane_z_taryfa(df_dane, taryfa)
+    dt = dni_typowe_danych(dane, klucz, profil_wiatru, czas_wiatru(rozdzielczosc_danych(dane, klucz)))
+    tabela.attrs.update({'dni_typowe': len(dt.dni_typowe), 'interwaly_dni_typowych': len(dt),
+                         'interwaly_roku': len(dane)})
+    return tabela
+
+
+def najlepszy_wariant(tabela_wariantow, kryterium='Okres zwrotu (lat)'):
+    # Wiersz z najkrótszym okresem zwrotu (lub minimum innego kryterium); None gdy żaden się nie zwraca
+    skonczone = tabela_wariantow[np.isfinite(tabela_wariantow[kryterium])]
+    if skonczone.empty:
+        return None
+    return skonczone.loc[skonczone[kryterium].idxmin()]
@@ -0,0 +1,166 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import silnik
+from pomiary import mierzony
+from kalkulator import (
+    REF_PRODUKCJA_WIATR_KWH_KW_ROK, ESS_RT_EFFICIENCY, oblicz_finansowanie, podsumuj_rok, dane_z_taryfa,
+    zasady_taryfy, ksztalt_wiatru, rozdzielczosc_danych, limity_ess, czas_wiatru
+)
+
+# =========================================================================
+# --- ANALIZA NIEPEWNOŚCI (MONTE CARLO: POGODA I CENY) ---
+# =========================================================================
+# N losowych lat dla jednej konfiguracji: uzysk PV (czynnik roczny i dobowy), praca turbiny
+# wokół `procent_pracy_turbiny` (czynnik roczny, rozkład dobowy) oraz ścieżki cen (poziom
+# ceny energii, skorelowany z nim poziom ceny eksportu i dobowe wahania ceny eksportu).
+# Czynniki są lognormalne o średniej 1, więc wartość oczekiwana każdej serii zostaje
+# przy danych wejściowych. Scenariusze liczone są paczkami tablic (scenariusze × interwały)
+# przez silnik.symuluj_scenariusze - z numbą w wątkach na wszystkich rdzeniach.
+# Magazyn pracuje w trybie autokonsumpcji (reguła zachłanna silnika).
+
+LICZBA_SCENARIUSZY = 1000
+PERCENTYLE = (10, 50, 90)
+
+# Scenariusze generowane i liczone paczkami: 4 tablice paczka × interwały (float64)
+ROZMIAR_PACZKI = 64
+
+# Odchylenia standardowe logarytmów czynników (≈ względne odchylenie) i korelacja poziomów cen
+ZMIENNOSCI = {
+    'uzysk_pv_roczny': 0.05,
+    'uzysk_pv_dobowy': 0.20,
+    'praca_turbiny_roczna': 0.15,
+    'wiatr_dobowy': 0.50,
+    'cena_energii': 0.15,
+    'cena_eksportu': 0.25,
+    'cena_eksportu_dobowa': 0.20,
+    'korelacja_cen': 0.7,
+}
+
+# Wyniki raportowane jako percentyle
+KOLUMNY_PERCENTYLI = ('Oszczędności całkowite', 'Okres zwrotu (lat)', 'Rachunek do zapłaty',
+                      'Procent samo-wystarczalności', 'Produkcja PV [kWh]', 'Produkcja Wiatr [kWh]')
+
+
+def _lognormalny(rng, sigma, rozmiar):
+    # exp(N(-sigma²/2, sigma)) - średnia 1
+    return np.exp(sigma * rng.standard_normal(rozmiar) - sigma * sigma / 2)
+
+
+def losuj_czynniki(liczba_scenariuszy, liczba_dni, zmiennosci=None, ziarno=None):
+    # Czynniki roczne (liczba scenariuszy,) i dobowe (liczba scenariuszy, liczba dni)
+    zmiennosci = {**ZMIENNOSCI, **(zmiennosci or {})}
+    nieznane = sorted(set(zmiennosci) - set(ZMIENNOSCI))
+    if nieznane:
+        raise ValueError(f"❌ Nieznane parametry zmienności: {nieznane}. Dozwolone: {list(ZMIENNOSCI)}")
+    if liczba_scenariuszy < 1:
+        raise ValueError("❌ Liczba scenariuszy musi być dodatnia.")
+    rho = zmiennosci['korelacja_cen']
+    if not -1.0 <= rho <= 1.0:
+        raise ValueError(f"❌ Korelacja cen musi należeć do przedziału [-1, 1], otrzymano {rho}.")
+
+    rng = np.random.default_rng(ziarno)
+    S, D = liczba_scenariuszy, liczba_dni
+    z_energii = rng.standard_normal(S)
+    z_eksportu = rho * z_energii + np.sqrt(1.0 - rho * rho) * rng.standard_normal(S)
+    s_en, s_eks = zmiennosci['cena_energii'], zmiennosci['cena_eksportu']
+    return {
+        'uzysk_pv': _lognormalny(rng, zmiennosci['uzysk_pv_roczny'], S),
+        'praca_turbiny': _lognormalny(rng, zmiennosci['praca_turbiny_roczna'], S),
+        'cena_energii': np.exp(s_en * z_energii - s_en * s_en / 2),
+        'cena_eksportu': np.exp(s_eks * z_eksportu - s_eks * s_eks / 2),
+        'pv_dobowy': _lognormalny(rng, zmiennosci['uzysk_pv_dobowy'], (S, D)),
+        'wiatr_dobowy': _lognormalny(rng, zmiennosci['wiatr_dobowy'], (S, D)),
+        'cena_eksportu_dobowa': _lognormalny(rng, zmiennosci['cena_eksportu_dobowa'], (S, D)),
+    }
+
+
+def _paczka_serii(dane, ksztalt, dzien, ksztalt_dobowy, czynniki, wybor, produkcja_wiatr_roczna):
+    # Serie interwałowe scenariuszy `wybor`: (pv 1 kWp, wiatr, cena eksportu, cena energii).
+    # Czynniki roczne łączone z dobowymi na macierzy (scenariusze, dni), potem jedno np.take
+    # (układ C, wiersz = scenariusz - silnik nie kopiuje) i jedno mnożenie na serię
+    pv_dobowy = czynniki['pv_dobowy'][wybor] * czynniki['uzysk_pv'][wybor, None]
+    wiatr_dobowy = czynniki['wiatr_dobowy'][wybor]
+    # Rozkład dobowy przesuwa produkcję w roku, a roczną ilość wyznacza czynnik pracy turbiny
+    suma = wiatr_dobowy @ ksztalt_dobowy
+    skala = np.divide(produkcja_wiatr_roczna * czynniki['praca_turbiny'][wybor], suma,
+                      out=np.zeros_like(suma), where=suma > 0)
+    wiatr_dobowy = wiatr_dobowy * skala[:, None]
+    eksport_dobowy = czynniki['cena_eksportu_dobowa'][wybor] * czynniki['cena_eksportu'][wybor, None]
+
+    pv = np.take(pv_dobowy, dzien, axis=1)
+    pv *= dane.produkcja_pv_1kwp
+    wiatr = np.take(wiatr_dobowy, dzien, axis=1)
+    wiatr *= ksztalt
+    cena_eksportu = np.take(eksport_dobowy, dzien, axis=1)
+    cena_eksportu *= dane.cena_eksportu
+    cena_energii = dane.cena_energii * czynniki['cena_energii'][wybor, None]
+    return pv, wiatr, cena_eksportu, cena_energii
+
+
+@mierzony('analiza_monte_carlo')
+def analiza_monte_carlo(df_dane, parametry, liczba_scenariuszy=LICZBA_SCENARIUSZY, zmiennosci=None, ziarno=None,
+                        profil_wiatru=None, watki=None, uzyj_jit=True, taryfa=None):
+    # `parametry` - słownik z kluczami PARAMETRY_SYMULACJI (jak DOMYSLNE_PARAMETRY), `taryfa` jak w run_simulation.
+    # Wynik: {'scenariusze': wiersz na scenariusz (czynniki + klucze wyniki_roczne),
+    #         'percentyle': P10/P50/P90 z KOLUMNY_PERCENTYLI, 'czas_calkowity_s': ...}
+    start = time.perf_counter()
+    p = parametry
+    dane, klucz, skompilowana = dane_z_taryfa(df_dane, taryfa)
+    zasady, wygasanie_portfela = zasady_taryfy(skompilowana)
+    rozdz = rozdzielczosc_danych(dane, klucz)
+    limit_ladowania, limit_rozladowania, skala_limitow = limity_ess(
+        rozdz, p['ess_moc_ladowania_kw'], p['ess_moc_rozladowania_kw'])
+    dzien = np.unique(np.asarray(dane.data, dtype='datetime64[D]'), return_inverse=True)[1].reshape(-1)
+    czynniki = losuj_czynniki(int(liczba_scenariuszy), int(dzien.max()) + 1 if len(dzien) else 0, zmiennosci, ziarno)
+    ksztalt = ksztalt_wiatru(dane.miesiac, dane.godzina, profil_wiatru, czas_wiatru(rozdz))
+    ksztalt_dobowy = np.bincount(dzien, weights=ksztalt, minlength=czynniki['wiatr_dobowy'].shape[1])
+    produkcja_wiatr_roczna = p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0)
+
+    S = int(liczba_scenariuszy)
+    sumy = np.zeros((S, silnik.LICZBA_SUM))
+    for od in range(0, S, ROZMIAR_PACZKI):
+        wybor = slice(od, min(od + ROZMIAR_PACZKI, S))
+        pv, wiatr, cena_eksportu, cena_energii = _paczka_serii(dane, ksztalt, dzien, ksztalt_dobowy, czynniki,
+                                                               wybor, produkcja_wiatr_roczna)
+        sumy[wybor] = silnik.symuluj_scenariusze(
+            pv, wiatr, dane.konsumpcja, cena_eksportu, cena_energii, dane.koszt_dystrybucji,
+            p['moc_pv_kwp'], p['ess_pojemnosc_kwh'], limit_ladowania, limit_rozladowania, ESS_RT_EFFICIENCY,
+            watki=watki, uzyj_jit=uzyj_jit, kod_miesiaca=dane.kod_miesiaca,
+            wygasanie_portfela_miesiace=wygasanie_portfela, skala_limitow=skala_limitow
+        )
+
+    # Koszt bez instalacji zmienia się z poziomem ceny energii (dystrybucja bez zmian)
+    koszt_energii_bazowy = float((dane.konsumpcja * dane.cena_energii).sum())
+    koszt_dystrybucji_bazowy = float((dane.konsumpcja * dane.koszt_dystrybucji).sum())
+    finansowanie = oblicz_finansowanie(
+        p['koszt_pv_total'], p['moc_turbina_kw'], p['koszt_turbiny_wiatrowej'], p['ess_pojemnosc_kwh'],
+        p['cena_magazynu_total'], p['korzysta_z_dotacji'], p['korzysta_z_ulgi_termomodernizacyjnej'],
+        p['stawka_podatkowa_procent']
+    )
+    wiersze = [podsumuj_rok(sumy[s], dane.suma_konsumpcji_kwh,
+                            koszt_energii_bazowy * czynniki['cena_energii'][s] + koszt_dystrybucji_bazowy, finansowanie,
+                            **zasady)
+               for s in range(S)]
+
+    scenariusze = pd.DataFrame({
+        'Czynnik uzysku PV': czynniki['uzysk_pv'],
+        'Czynnik pracy turbiny': czynniki['praca_turbiny'],
+        'Czynnik ceny energii': czynniki['cena_energii'],
+        'Czynnik ceny eksportu': czynniki['cena_eksportu'],
+    })
+    scenariusze = pd.concat([scenariusze, pd.DataFrame(wiersze)], axis=1)
+    return {
+        'scenariusze': scenariusze,
+        'percentyle': percentyle(scenariusze),
+        'czas_calkowity_s': time.perf_counter() - start,
+    }
+
+
+def percentyle(scenariusze, kolumny=KOLUMNY_PERCENTYLI, poziomy=PERCENTYLE):
+    # Percentyl empiryczny bez interpolacji (okres zwrotu bywa nieskończony); wiersze 'P10', 'P50', ...
+    wartosci = scenariusze[list(kolumny)].to_numpy(dtype=np.float64)
+    return pd.DataFrame(np.percentile(wartosci, poziomy, axis=0, method='inverted_cdf'),
+                        index=[f"P{q}" for q in poziomy], columns=list(kolumny))
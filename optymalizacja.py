@@ -0,0 +1,186 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from kalkulator import PARAMETRY_SYMULACJI, dane_z_taryfa, zasady_taryfy, bilans_wariantow, podsumuj_warianty
+from projekcja import LATA_PROJEKCJI, STOPA_DYSKONTOWA, ESKALACJA_CENY_ENERGII
+
+# =========================================================================
+# --- DOBÓR OPTYMALNEGO SYSTEMU (PV, POJEMNOŚĆ I MOC ESS) ---
+# =========================================================================
+# Przeszukiwanie siatki od zgrubnej do dokładnej: każdy poziom to jeden przebieg
+# wsadowy silnika, a kolejny poziom zawęża zakres wokół najlepszego punktu.
+# Wyniki fizyczne (sumy roczne) są zapamiętywane niezależnie od kosztów i dotacji,
+# więc zmiana krzywych cen czy zasad finansowania nie wymaga nowych symulacji.
+# Taryfa (taryfy.py) zmienia ceny i rozliczenie portfela, więc jest częścią klucza danych.
+
+KRYTERIA = {
+    'okres_zwrotu': ('Okres zwrotu (lat)', 'min'),
+    'npv': ('NPV uproszczone [PLN]', 'max'),
+}
+
+MAX_BILANSOW_W_PAMIECI = 50000
+_pamiec_bilansow = OrderedDict()   # klucz fizyczny wariantu -> wektor sum rocznych silnika
+
+
+def krzywa_kosztu(cena):
+    # Zamienia opis ceny na funkcję rozmiar -> koszt całkowity [zł]. `cena` to stała cena
+    # jednostkowa (zł/kWp, zł/kWh), lista punktów [(rozmiar, cena jednostkowa), ...]
+    # interpolowana liniowo albo gotowa funkcja rozmiar -> koszt całkowity.
+    if callable(cena):
+        return cena
+    if np.isscalar(cena):
+        return lambda rozmiar: np.asarray(rozmiar, dtype=np.float64) * float(cena)
+    rozmiary, ceny = np.array(sorted(cena), dtype=np.float64).T
+    return lambda rozmiar: np.asarray(rozmiar, dtype=np.float64) * np.interp(rozmiar, rozmiary, ceny)
+
+
+def parsuj_punkty_ceny(tekst):
+    # "3:5500, 10:4500, 20:4000" -> [(3.0, 5500.0), ...]; pojedyncza liczba = stała cena jednostkowa
+    try:
+        if ':' not in tekst:
+            return float(tekst.replace(',', '.'))
+        punkty = []
+        for para in tekst.replace(';', ',').split(','):
+            if para.strip():
+                rozmiar, cena = para.split(':')
+                punkty.append((float(rozmiar), float(cena)))
+    except ValueError as e:
+        raise ValueError(f"❌ Niepoprawny opis krzywej cen '{tekst}' (oczekiwano np. 3:5500, 10:4500). {e}") from e
+    if not punkty:
+        raise ValueError(f"❌ Niepoprawny opis krzywej cen '{tekst}' (oczekiwano np. 3:5500, 10:4500).")
+    return punkty
+
+
+def _klucz_danych(klucz, profil_wiatru):
+    skrot = hashlib.sha1(klucz.encode())
+    if profil_wiatru is not None:
+        skrot.update(np.ascontiguousarray(profil_wiatru, dtype=np.float64).tobytes())
+    return skrot.hexdigest()
+
+
+def _wartosci_osi(od, do, liczba_punktow, krok):
+    if do - od < krok:
+        return np.array([round(od / krok) * krok])
+    return np.unique(np.round(np.linspace(od, do, liczba_punktow) / krok) * krok)
+
+
+def npv_uproszczone(oszczednosci_roczne, koszt_inwestycji, lata=LATA_PROJEKCJI, stopa_dyskontowa=STOPA_DYSKONTOWA,
+                    eskalacja=ESKALACJA_CENY_ENERGII):
+    # Stałe (rosnące o `eskalacja`) oszczędności z pierwszego roku, zdyskontowane na `lata` lat - bez
+    # degradacji PV, zaniku pojemności ESS i przenoszenia portfela, więc zawyża NPV względem
+    # projekcja.projekcja_wieloletnia (tam pełne NPV wybranej konfiguracji)
+    t = np.arange(1, lata + 1)
+    mnoznik = ((1.0 + eskalacja) ** (t - 1) / (1.0 + stopa_dyskontowa) ** t).sum()
+    return np.asarray(oszczednosci_roczne) * mnoznik - np.asarray(koszt_inwestycji)
+
+
+def optymalizuj_system(df_dane, parametry_bazowe, cena_pv, cena_ess, zakres_pv_kwp=(0.0, 20.0),
+                       zakres_ess_kwh=(0.0, 30.0), zakres_mocy_ess_kw=(2.0, 10.0), kryterium='okres_zwrotu',
+                       punkty_na_os=5, poziomy=4, krok_pv_kwp=0.5, krok_ess_kwh=0.5, krok_mocy_ess_kw=0.5,
+                       lata=LATA_PROJEKCJI, stopa_dyskontowa=STOPA_DYSKONTOWA, eskalacja=ESKALACJA_CENY_ENERGII,
+                       profil_wiatru=None, uzyj_jit=True, taryfa=None):
+    # Szuka mocy PV, pojemności ESS i mocy ładowania/rozładowania ESS (jednakowej w obie strony)
+    # minimalizujących okres zwrotu albo maksymalizujących NPV uproszczone. Pozostałe parametry (wiatr,
+    # dotacje, ulga) są brane z `parametry_bazowe`; koszty PV i ESS liczone z krzywych cen.
+    # `taryfa` jak w run_simulation.
+    if kryterium not in KRYTERIA:
+        raise ValueError(f"Nieznane kryterium '{kryterium}', dostępne: {list(KRYTERIA)}")
+    kolumna_kryterium, kierunek = KRYTERIA[kryterium]
+    start = time.perf_counter()
+
+    dane, klucz_taryfy, skompilowana = dane_z_taryfa(df_dane, taryfa)
+    _, wygasanie_portfela = zasady_taryfy(skompilowana)
+    koszt_pv = krzywa_kosztu(cena_pv)
+    koszt_ess = krzywa_kosztu(cena_ess)
+    klucz_danych = _klucz_danych(klucz_taryfy, profil_wiatru)
+    wiatr = (float(parametry_bazowe['moc_turbina_kw']), float(parametry_bazowe['procent_pracy_turbiny']))
+
+    zakresy = [tuple(zakres_pv_kwp), tuple(zakres_ess_kwh), tuple(zakres_mocy_ess_kw)]
+    kroki = [krok_pv_kwp, krok_ess_kwh, krok_mocy_ess_kw]
+    ocenione = {}   # (pv, ess, moc) -> wektor sum
+    liczba_symulacji = 0
+    czas_symulacji = 0.0
+
+    granice = list(zakresy)
+    for _ in range(poziomy):
+        osie = [_wartosci_osi(od, do, punkty_na_os, krok) for (od, do), krok in zip(granice, kroki)]
+        punkty = set()
+        for pv in osie[0]:
+            for ess in osie[1]:
+                # Bez magazynu moc ESS nie ma znaczenia - jeden punkt zamiast całej osi
+                for moc in (osie[2] if ess > 0 else osie[2][:1]):
+                    punkty.add((float(pv), float(ess), float(moc)))
+
+        do_symulacji = []
+        for punkt in punkty:
+            klucz = (klucz_danych, wiatr, punkt)
+            if klucz in _pamiec_bilansow:
+                _pamiec_bilansow.move_to_end(klucz)
+                ocenione[punkt] = _pamiec_bilansow[klucz]
+            elif punkt not in ocenione:
+                do_symulacji.append(punkt)
+
+        if do_symulacji:
+            t0 = time.perf_counter()
+            nowe = pd.DataFrame([{**parametry_bazowe, 'moc_pv_kwp': pv, 'ess_pojemnosc_kwh': ess,
+                                  'ess_moc_ladowania_kw': moc, 'ess_moc_rozladowania_kw': moc}
+                                 for pv, ess, moc in do_symulacji])
+            sumy = bilans_wariantow(dane, nowe, profil_wiatru, uzyj_jit, wygasanie_portfela, klucz_taryfy)
+            czas_symulacji += time.perf_counter() - t0
+            liczba_symulacji += len(do_symulacji)
+            for punkt, wektor in zip(do_symulacji, sumy):
+                ocenione[punkt] = wektor
+                _pamiec_bilansow[(klucz_danych, wiatr, punkt)] = wektor
+            while len(_pamiec_bilansow) > MAX_BILANSOW_W_PAMIECI:
+                _pamiec_bilansow.popitem(last=False)
+
+        tabela = _ocen(dane, parametry_bazowe, ocenione, koszt_pv, koszt_ess, lata, stopa_dyskontowa, eskalacja,
+                       skompilowana)
+        najlepszy = _najlepszy(tabela, kolumna_kryterium, kierunek)
+        if najlepszy is None:
+            break
+
+        # Zawężenie zakresu wokół najlepszego punktu (o jeden krok bieżącej siatki w każdą stronę)
+        srodek = (najlepszy['moc_pv_kwp'], najlepszy['ess_pojemnosc_kwh'], najlepszy['ess_moc_ladowania_kw'])
+        nowe_granice = []
+        for (od, do), (z_od, z_do), os, c in zip(granice, zakresy, osie, srodek):
+            rozstaw = (do - od) / max(len(os) - 1, 1)
+            nowe_granice.append((max(z_od, c - rozstaw), min(z_do, c + rozstaw)))
+        if all(do - od < krok for (od, do), krok in zip(nowe_granice, kroki)):
+            break
+        granice = nowe_granice
+
+    tabela = _ocen(dane, parametry_bazowe, ocenione, koszt_pv, koszt_ess, lata, stopa_dyskontowa, eskalacja,
+                   skompilowana)
+    return {
+        'najlepszy': _najlepszy(tabela, kolumna_kryterium, kierunek),
+        'tabela': tabela.sort_values(kolumna_kryterium, ascending=(kierunek == 'min')).reset_index(drop=True),
+        'liczba_symulacji': liczba_symulacji,
+        'liczba_ocen': len(ocenione),
+        'czas_symulacji_s': czas_symulacji,
+        'czas_calkowity_s': time.perf_counter() - start,
+    }
+
+
+def _ocen(dane, parametry_bazowe, ocenione, koszt_pv, koszt_ess, lata, stopa_dyskontowa, eskalacja, skompilowana=None):
+    punkty = list(ocenione)
+    warianty = pd.DataFrame([{**parametry_bazowe, 'moc_pv_kwp': pv, 'ess_pojemnosc_kwh': ess,
+                              'ess_moc_ladowania_kw': moc, 'ess_moc_rozladowania_kw': moc}
+                             for pv, ess, moc in punkty])[PARAMETRY_SYMULACJI]
+    warianty['koszt_pv_total'] = koszt_pv(warianty['moc_pv_kwp'].to_numpy())
+    warianty['cena_magazynu_total'] = koszt_ess(warianty['ess_pojemnosc_kwh'].to_numpy())
+    tabela = podsumuj_warianty(dane, warianty, np.array([ocenione[p] for p in punkty]), skompilowana)
+    tabela['NPV uproszczone [PLN]'] = npv_uproszczone(tabela['Oszczędności całkowite'], tabela['Koszt inwestycji Całkowity'],
+                                          lata, stopa_dyskontowa, eskalacja)
+    return tabela
+
+
+def _najlepszy(tabela, kolumna, kierunek):
+    skonczone = tabela[np.isfinite(tabela[kolumna])]
+    if skonczone.empty:
+        return None
+    return skonczone.loc[skonczone[kolumna].idxmin() if kierunek == 'min' else skonczone[kolumna].idxmax()]
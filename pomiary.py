@@ -0,0 +1,171 @@
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import marshal
+import pstats
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+try:
+    import resource
+except ImportError:  # Windows - bez szczytowego RSS procesu
+    resource = None
+
+# =========================================================================
+# --- POMIARY W TRAKCIE DZIAŁANIA (ODCINKI, LICZNIKI, PAMIĘĆ, PROFILER) ---
+# =========================================================================
+# with pomiar() as p:                      # albo rozpocznij_pomiar() / zakoncz_pomiar(p)
+#     run_simulation(...)
+# p.jako_slownik()                         # czasy odcinków, liczniki wierszy, szczyt pamięci
+#
+# Kod kalkulatora oznacza etapy przez `with odcinek('nazwa'):` i liczy wiersze przez
+# licznik('nazwa', n). Poza aktywnym pomiarem obie funkcje kończą się na odczycie zmiennej
+# kontekstowej, więc instrumentacja zostaje w kodzie na stałe. Zmienna kontekstowa oddziela
+# pomiary równoległych sesji Streamlit (każda sesja w swoim wątku).
+# Śledzenie pamięci (tracemalloc) spowalnia alokacje i profiler (cProfile) spowalnia wywołania
+# funkcji Pythona - oba tylko na żądanie.
+
+_aktywny = contextvars.ContextVar('pomiar', default=None)
+
+
+@dataclass(eq=False)
+class Pomiar:
+    odcinki: dict = field(default_factory=dict)     # ścieżka 'a/b' -> [liczba wywołań, czas łączny s]
+    liczniki: dict = field(default_factory=dict)    # nazwa -> suma
+    czas_calkowity_s: float = 0.0
+    szczyt_pamieci_mb: float = None                 # szczyt alokacji Pythona i NumPy (tracemalloc)
+    szczyt_rss_mb: float = None                     # szczyt pamięci procesu od jego startu
+    profiler: cProfile.Profile = None
+    _stos: list = field(default_factory=list)
+    _start: float = 0.0
+    _token: object = None
+    _sledz_pamiec: bool = False
+    _wlasny_tracemalloc: bool = False
+
+    def jako_slownik(self):
+        odcinki = [{'odcinek': nazwa, 'wywolania': liczba, 'czas_s': czas,
+                    'udzial_procent': 100.0 * czas / self.czas_calkowity_s if self.czas_calkowity_s > 0 else 0.0}
+                   for nazwa, (liczba, czas) in self.odcinki.items()]
+        return {
+            'czas_calkowity_s': self.czas_calkowity_s,
+            'odcinki': odcinki,
+            'liczniki': dict(self.liczniki),
+            'szczyt_pamieci_mb': self.szczyt_pamieci_mb,
+            'szczyt_rss_mb': self.szczyt_rss_mb,
+        }
+
+
+@contextlib.contextmanager
+def odcinek(nazwa):
+    p = _aktywny.get()
+    if p is None:
+        yield
+        return
+    p._stos.append(nazwa)
+    # Wpis przy wejściu - kolejność odcinków jak w przebiegu (rodzic przed etapami)
+    wpis = p.odcinki.setdefault('/'.join(p._stos), [0, 0.0])
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wpis[0] += 1
+        wpis[1] += time.perf_counter() - start
+        p._stos.pop()
+
+
+def mierzony(nazwa):
+    # Dekorator: każde wywołanie funkcji jako odcinek `nazwa`
+    def dekorator(funkcja):
+        @functools.wraps(funkcja)
+        def opakowana(*args, **kwargs):
+            if _aktywny.get() is None:
+                return funkcja(*args, **kwargs)
+            with odcinek(nazwa):
+                return funkcja(*args, **kwargs)
+        return opakowana
+    return dekorator
+
+
+def licznik(nazwa, wartosc=1):
+    p = _aktywny.get()
+    if p is not None:
+        p.liczniki[nazwa] = p.liczniki.get(nazwa, 0) + wartosc
+
+
+def rozpocznij_pomiar(sledz_pamiec=False, profiluj=False):
+    p = Pomiar()
+    p._sledz_pamiec = sledz_pamiec
+    if sledz_pamiec:
+        p._wlasny_tracemalloc = not tracemalloc.is_tracing()
+        if p._wlasny_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    if profiluj:
+        p.profiler = cProfile.Profile()
+        p.profiler.enable()
+    p._token = _aktywny.set(p)
+    p._start = time.perf_counter()
+    return p
+
+
+def zakoncz_pomiar(p):
+    p.czas_calkowity_s = time.perf_counter() - p._start
+    if p.profiler is not None:
+        p.profiler.disable()
+    if p._sledz_pamiec and tracemalloc.is_tracing():
+        p.szczyt_pamieci_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        if p._wlasny_tracemalloc:
+            tracemalloc.stop()
+    if resource is not None:
+        # ru_maxrss w KiB (Linux)
+        p.szczyt_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if p._token is not None:
+        _aktywny.reset(p._token)
+        p._token = None
+    return p
+
+
+@contextlib.contextmanager
+def pomiar(sledz_pamiec=False, profiluj=False):
+    p = rozpocznij_pomiar(sledz_pamiec, profiluj)
+    try:
+        yield p
+    finally:
+        zakoncz_pomiar(p)
+
+
+def zapisz_json(p, cel):
+    # `cel` - ścieżka albo obiekt plikowy (np. sys.stderr)
+    if isinstance(cel, str):
+        with open(cel, 'w', encoding='utf-8') as f:
+            json.dump(p.jako_slownik(), f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(p.jako_slownik(), cel, ensure_ascii=False, indent=2)
+
+
+def profil_tekst(p, limit=30, sortowanie='cumulative'):
+    # Najdroższe funkcje z cProfile (pusty tekst, gdy pomiar był bez profilera)
+    if p.profiler is None:
+        return ''
+    bufor = io.StringIO()
+    pstats.Stats(p.profiler, stream=bufor).strip_dirs().sort_stats(sortowanie).print_stats(limit)
+    return bufor.getvalue()
+
+
+def zapisz_profil(p, sciezka):
+    # Plik .prof (pstats / snakeviz)
+    if p.profiler is None:
+        raise ValueError("❌ Pomiar był uruchomiony bez profilera (profiluj=True).")
+    p.profiler.dump_stats(sciezka)
+
+
+def profil_bajty(p):
+    # Zawartość pliku .prof (np. do st.download_button)
+    if p.profiler is None:
+        return b''
+    p.profiler.create_stats()
+    return marshal.dumps(p.profiler.stats)
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+import silnik
+from kalkulator import (
+    REF_PRODUKCJA_WIATR_KWH_KW_ROK, ESS_RT_EFFICIENCY, oblicz_finansowanie, dane_z_taryfa, zasady_taryfy,
+    ksztalt_wiatru, rozdzielczosc_danych, limity_ess, czas_wiatru
+)
+
+# =========================================================================
+# --- PROJEKCJA WIELOLETNIA (DEGRADACJA, STARZENIE ESS, ESKALACJA CEN) ---
+# =========================================================================
+# Wszystkie lata projekcji są liczone jednym przebiegiem wsadowym silnika (oś
+# konfiguracji = lata: zdegradowana moc PV i pojemność ESS), a portfel z eskalacją
+# cen i przeniesieniem salda między latami rozliczany jest w postaci zamkniętej
+# (silnik.statystyki_portfela) - bez ponownego przechodzenia pętli rok po roku.
+# Z taryfą (taryfy.py) ceny, zwrot nadwyżki portfela i opłaty stałe pochodzą z niej, a przy
+# wygasaniu środków portfel rozliczany jest miesiąc po miesiącu (silnik.portfele_miesieczne).
+
+# Domyślne założenia projekcji
+LATA_PROJEKCJI = 25
+DEGRADACJA_PV_ROCZNA = 0.005           # 0,5% mocy PV rocznie
+ZANIK_ESS_NA_CYKL = 0.20 / 6000        # 20% pojemności po 6000 pełnych cyklach
+ZANIK_ESS_KALENDARZOWY = 0.01          # 1% pojemności rocznie niezależnie od cykli
+ESKALACJA_CENY_ENERGII = 0.03
+ESKALACJA_DYSTRYBUCJI = 0.03
+ESKALACJA_CENY_EKSPORTU = 0.02
+STOPA_DYSKONTOWA = 0.05
+
+
+def npv(przeplywy, stopa):
+    przeplywy = np.asarray(przeplywy, dtype=np.float64)
+    return float((przeplywy / (1.0 + stopa) ** np.arange(len(przeplywy))).sum())
+
+
+def irr(przeplywy, dolna=-0.99, gorna=1.0, tolerancja=1e-7):
+    # Bisekcja NPV(r) = 0; NaN gdy NPV nie zmienia znaku w przedziale
+    przeplywy = np.asarray(przeplywy, dtype=np.float64)
+    while npv(przeplywy, gorna) > 0 and gorna < 100:
+        gorna *= 2
+    npv_dolna = npv(przeplywy, dolna)
+    if np.sign(npv_dolna) == np.sign(npv(przeplywy, gorna)):
+        return float('nan')
+    while gorna - dolna > tolerancja:
+        srodek = (dolna + gorna) / 2
+        npv_srodek = npv(przeplywy, srodek)
+        if np.sign(npv_srodek) == np.sign(npv_dolna):
+            dolna, npv_dolna = srodek, npv_srodek
+        else:
+            gorna = srodek
+    return (dolna + gorna) / 2
+
+
+def okres_zwrotu_z_przeplywow(przeplywy):
+    # Pierwszy moment, w którym skumulowany przepływ (od roku 0) staje się nieujemny,
+    # z interpolacją liniową wewnątrz roku; inf gdy inwestycja się nie zwraca
+    skumulowane = np.cumsum(przeplywy)
+    for t in range(1, len(skumulowane)):
+        if skumulowane[t] >= 0:
+            return (t - 1) + (-skumulowane[t - 1]) / przeplywy[t] if przeplywy[t] > 0 else float(t)
+    return float('inf')
+
+
+def projekcja_wieloletnia(df_dane, parametry, lata=LATA_PROJEKCJI,
+                          degradacja_pv_roczna=DEGRADACJA_PV_ROCZNA, zanik_ess_na_cykl=ZANIK_ESS_NA_CYKL,
+                          zanik_ess_kalendarzowy=ZANIK_ESS_KALENDARZOWY, eskalacja_ceny_energii=ESKALACJA_CENY_ENERGII,
+                          eskalacja_dystrybucji=ESKALACJA_DYSTRYBUCJI, eskalacja_ceny_eksportu=ESKALACJA_CENY_EKSPORTU,
+                          stopa_dyskontowa=STOPA_DYSKONTOWA, przenos_portfela=True, profil_wiatru=None,
+                          uzyj_jit=True, taryfa=None):
+    # `parametry` to słownik z kluczami kalkulator.PARAMETRY_SYMULACJI (jak argumenty run_simulation),
+    # `taryfa` jak w run_simulation. Zwraca {'podsumowanie': {...}, 'lata': DataFrame z wierszem na rok}.
+    dane, klucz, skompilowana = dane_z_taryfa(df_dane, taryfa)
+    zasady, wygasanie_portfela = zasady_taryfy(skompilowana)
+    p = parametry
+    finansowanie = oblicz_finansowanie(
+        p['koszt_pv_total'], p['moc_turbina_kw'], p['koszt_turbiny_wiatrowej'], p['ess_pojemnosc_kwh'],
+        p['cena_magazynu_total'], p['korzysta_z_dotacji'], p['korzysta_z_ulgi_termomodernizacyjnej'],
+        p['stawka_podatkowa_procent']
+    )
+
+    rozdz = rozdzielczosc_danych(dane, klucz)
+    ksztalt = ksztalt_wiatru(dane.miesiac, dane.godzina, profil_wiatru, czas_wiatru(rozdz))
+    produkcja_wiatr_roczna = p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0)
+    limit_ladowania, limit_rozladowania, skala_limitow = limity_ess(
+        rozdz, p['ess_moc_ladowania_kw'], p['ess_moc_rozladowania_kw'])
+    wejscia = (dane.produkcja_pv_1kwp, ksztalt, dane.konsumpcja, dane.cena_eksportu, dane.cena_energii,
+               dane.koszt_dystrybucji)
+
+    # 1. Pierwszy rok: liczba pełnych cykli ESS, od której zależy zanik pojemności
+    pojemnosc = float(p['ess_pojemnosc_kwh'])
+    sumy_rok_1 = silnik.symuluj_bilans_wsadowo(*wejscia, [p['moc_pv_kwp']], [produkcja_wiatr_roczna], [pojemnosc],
+                                               limit_ladowania, limit_rozladowania, ESS_RT_EFFICIENCY,
+                                               uzyj_jit=uzyj_jit, skala_limitow=skala_limitow)
+    cykle_rok_1 = sumy_rok_1[0, silnik.S_AC_ESS] / pojemnosc if pojemnosc > 0 else 0.0
+
+    # 2. Fizyka kolejnych lat (liczba cykli rocznie przyjęta stała - skaluje się z pojemnością)
+    rok = np.arange(lata)
+    moc_pv_lata = p['moc_pv_kwp'] * (1.0 - degradacja_pv_roczna) ** rok
+    zuzycie_ess = np.clip(rok * (zanik_ess_na_cykl * cykle_rok_1 + zanik_ess_kalendarzowy), 0.0, 1.0)
+    pojemnosc_lata = pojemnosc * (1.0 - zuzycie_ess)
+
+    # 3. Jeden przebieg wsadowy dla wszystkich lat
+    sumy, przeplywy = silnik.symuluj_bilans_wsadowo(
+        *wejscia, moc_pv_lata, np.full(lata, produkcja_wiatr_roczna), pojemnosc_lata,
+        limit_ladowania, limit_rozladowania, ESS_RT_EFFICIENCY, zapisz_przeplywy=True, uzyj_jit=uzyj_jit,
+        skala_limitow=skala_limitow
+    )
+
+    # 4. Rozliczenie z eskalacją cen i portfelem przenoszonym między latami
+    mnoznik_energii = (1.0 + eskalacja_ceny_energii) ** rok
+    mnoznik_dystrybucji = (1.0 + eskalacja_dystrybucji) ** rok
+    mnoznik_eksportu = (1.0 + eskalacja_ceny_eksportu) ** rok
+
+    eksport = przeplywy['Sprzedaz_Siec_KWh']
+    zakup = przeplywy['Zakup_Siec_KWh']
+    wplywy_bazowe = eksport * np.maximum(dane.cena_eksportu, 0.0)
+    koszty_energii_bazowe = zakup * dane.cena_energii
+    suma_z, minimum_s = silnik.statystyki_portfela(wplywy_bazowe * mnoznik_eksportu[:, None],
+                                                   koszty_energii_bazowe * mnoznik_energii[:, None])
+    wplywy = wplywy_bazowe.sum(axis=1) * mnoznik_eksportu
+    koszty_energii = koszty_energii_bazowe.sum(axis=1) * mnoznik_energii
+    dystrybucja = (zakup @ dane.koszt_dystrybucji) * mnoznik_dystrybucji
+    # Opłaty stałe taryfy (na rachunku z instalacją i bez niej) rosną jak dystrybucja
+    oplaty_stale = zasady['oplaty_stale'] * mnoznik_dystrybucji
+    koszt_bez_pv = ((dane.konsumpcja @ dane.cena_energii) * mnoznik_energii
+                    + (dane.konsumpcja @ dane.koszt_dystrybucji) * mnoznik_dystrybucji + oplaty_stale)
+
+    if wygasanie_portfela:
+        # Kody miesięcy kolejnych lat przesunięte o długość danych, żeby koszyki wpłat wygasały między latami
+        poczatki, kody_miesiecy = silnik.poczatki_miesiecy(dane.kod_miesiaca)
+        poprawne = [kod for kod in kody_miesiecy if kod >= 0]
+        rozpietosc = max(poprawne) - min(poprawne) + 1 if poprawne else 0
+        koszyki, aktualny_kod = None, -1
+
+    rachunek = np.empty(lata)
+    wyplata = np.empty(lata)
+    portfel_koniec = np.empty(lata)
+    portfel_poczatek = 0.0
+    for y in range(lata):
+        if wygasanie_portfela:
+            kody_roku = [kod + y * rozpietosc if kod >= 0 else kod for kod in kody_miesiecy]
+            miesieczna, koniec, wygasly, koszyki, aktualny_kod = silnik.portfele_miesieczne(
+                wplywy_bazowe[y:y + 1] * mnoznik_eksportu[y], koszty_energii_bazowe[y:y + 1] * mnoznik_energii[y],
+                poczatki, kody_roku, wygasanie_portfela, [portfel_poczatek], koszyki, aktualny_kod)
+            portfel_koniec[y], wygasly, kompensacja = koniec[0], wygasly[0], miesieczna.sum()
+        else:
+            portfel_koniec[y] = silnik.portfel_koncowy(suma_z[y], minimum_s[y], portfel_poczatek)
+            wygasly = 0.0
+            kompensacja = portfel_poczatek + wplywy[y] - portfel_koniec[y]
+        rachunek[y] = dystrybucja[y] + (koszty_energii[y] - kompensacja) + oplaty_stale[y]
+        # Środki wygasłe w trakcie roku rozliczane jak nadwyżka na koniec roku (jak w podsumuj_rok)
+        wyplata[y] = (portfel_koniec[y] + wygasly) * zasady['udzial_zwrotu_portfela']
+        przenoszone = 1.0 - zasady['udzial_zwrotu_portfela'] if przenos_portfela else 0.0
+        portfel_poczatek = portfel_koniec[y] * przenoszone
+        if wygasanie_portfela:
+            koszyki = koszyki * przenoszone
+
+    oszczednosci = koszt_bez_pv - rachunek + wyplata
+
+    # 5. Wskaźniki finansowe (rok 0 = nakład inwestycyjny po dotacji i uldze)
+    przeplywy_pieniezne = np.concatenate([[-finansowanie['koszt_inwestycji_netto']], oszczednosci])
+    zdyskontowane = przeplywy_pieniezne / (1.0 + stopa_dyskontowa) ** np.arange(lata + 1)
+
+    tabela = pd.DataFrame({
+        'Rok': rok + 1,
+        'Moc PV efektywna [kWp]': moc_pv_lata,
+        'Pojemność ESS [kWh]': pojemnosc_lata,
+        'Cykle ESS': np.divide(sumy[:, silnik.S_AC_ESS], pojemnosc_lata, out=np.zeros(lata), where=pojemnosc_lata > 0),
+        'Produkcja PV [kWh]': sumy[:, silnik.S_PRODUKCJA_PV],
+        'Produkcja Wiatr [kWh]': sumy[:, silnik.S_PRODUKCJA_WIATR],
+        'Rachunek do zapłaty': rachunek,
+        'Wypłata z portfela': wyplata,
+        'Portfel na koniec roku': portfel_koniec,
+        'Oszczędności': oszczednosci,
+        'Przepływ zdyskontowany': zdyskontowane[1:],
+        'Skumulowany przepływ zdyskontowany': np.cumsum(zdyskontowane)[1:],
+    })
+
+    stopa_irr = irr(przeplywy_pieniezne)
+    return {
+        'podsumowanie': {
+            'NPV [PLN]': float(zdyskontowane.sum()),
+            'IRR [%]': stopa_irr * 100 if np.isfinite(stopa_irr) else float('nan'),
+            'Zdyskontowany okres zwrotu (lat)': okres_zwrotu_z_przeplywow(zdyskontowane),
+            'Okres zwrotu (lat)': okres_zwrotu_z_przeplywow(przeplywy_pieniezne),
+            'Oszczędności łączne [PLN]': float(oszczednosci.sum()),
+            'Koszt inwestycji Całkowity': finansowanie['koszt_inwestycji_netto'],
+            'Cykle ESS w 1. roku': cykle_rok_1,
+        },
+        'lata': tabela,
+    }
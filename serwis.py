@@ -0,0 +1,436 @@
+import argparse
+import asyncio
+import concurrent.futures
+import glob
+import hashlib
+import json
+import math
+import os
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dane import WERSJA_FORMATU, OKRESY_AGREGACJI
+from dni_typowe import TRYB_DNI_TYPOWYCH
+from kalkulator import PARAMETRY_SYMULACJI, run_simulation, wczytaj_dane
+from cli import PARAMETRY_LOGICZNE, uzupelnij_scenariusze
+from strategie import STRATEGIE_ESS
+from taryfy import TARYFY_WBUDOWANE, wczytaj_taryfe, skrot_taryfy
+
+# =========================================================================
+# --- SERWIS WYCEN HTTP/JSON (ASYNCIO + PULA PROCESÓW + PAMIĘĆ WYNIKÓW NA DYSKU) ---
+# =========================================================================
+# python serwis.py --katalog pamiec_serwisu --dane dane_zuzycia.csv --port 8765
+#
+# POST /dane     treść = plik CSV danych (jak dla wczytaj_dane) -> {"dane": skrót SHA-256 zawartości}
+# POST /wycena   {"dane": skrót (domyślnie pierwszy plik --dane), "parametry": {parametry run_simulation},
+#                 "taryfa": nazwa wbudowana albo obiekt, "strategia_ess": ..., "rozdzielczosc": "h"/"D"/"dni_typowe",
+#                 "profil_wiatru": macierz 12x24 albo seria} -> {"wyniki_roczne": {...}, "raport_miesieczny_dane": [...]}
+# GET  /zdrowie  zbiory danych, procesy robocze, statystyki pamięci wyników
+#
+# Pętla zdarzeń tylko przyjmuje zapytania; symulacje liczą procesy robocze (każdy z własną pamięcią
+# etapów kalkulatora i plikami .cache.npz obok zbiorów w <katalog>/dane, dokąd kopiowane są też pliki
+# --dane). Identyczne zapytania w trakcie liczenia czekają na jeden przebieg. Wynik (gotowa treść
+# JSON) trafia do SQLite (<katalog>/wyniki.sqlite) pod kluczem = SHA-256 ze skrótu danych
+# i znormalizowanych parametrów: przeżywa restart i jest wspólny dla kilku instancji serwisu na tym
+# samym katalogu, a najdawniej używane wpisy ponad limit są usuwane. Nagłówek X-Pamiec-Wynikow:
+# z_pamieci / obliczenie / polaczone.
+# Tylko biblioteka standardowa (bez frameworka HTTP); taryfy z plików nie są przyjmowane z sieci.
+
+# Podbić przy każdej zmianie logiki symulacji - unieważnia wyniki zapisane na dysku
+WERSJA_WYNIKOW = 1
+MAX_WYNIKOW_NA_DYSKU = 20_000
+MAX_ROZMIAR_ZAPYTANIA = 256 * 1024 * 1024
+LIMIT_BEZCZYNNOSCI_S = 30.0
+POLA_WYCENY = ('dane', 'parametry', 'taryfa', 'strategia_ess', 'rozdzielczosc', 'profil_wiatru')
+ROZDZIELCZOSCI = (None, *OKRESY_AGREGACJI, TRYB_DNI_TYPOWYCH)
+_STATUSY = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class _BladHttp(Exception):
+    def __init__(self, status, komunikat):
+        super().__init__(komunikat)
+        self.status = status
+
+
+@dataclass(eq=False)
+class StanSerwisu:
+    katalog: str
+    procesy: int
+    pula: concurrent.futures.ProcessPoolExecutor
+    pamiec: sqlite3.Connection
+    max_wynikow: int = MAX_WYNIKOW_NA_DYSKU
+    zbiory: dict = field(default_factory=dict)      # skrót zawartości -> ścieżka pliku CSV
+    domyslny_zbior: str = None
+    w_toku: dict = field(default_factory=dict)      # klucz wyniku -> asyncio.Task liczący wynik
+    statystyki: dict = field(default_factory=lambda: {'z_pamieci': 0, 'obliczenia': 0, 'polaczone': 0, 'bledy': 0})
+    blokada: threading.Lock = field(default_factory=threading.Lock)
+
+
+# --- PAMIĘĆ WYNIKÓW (SQLITE, LRU) ---
+def otworz_pamiec(sciezka):
+    # WAL: odczyty nie czekają na zapis, kilka procesów może dzielić jeden plik
+    pamiec = sqlite3.connect(sciezka, timeout=30.0, check_same_thread=False)
+    pamiec.execute('PRAGMA journal_mode=WAL')
+    with pamiec:
+        pamiec.execute('CREATE TABLE IF NOT EXISTS wyniki (klucz TEXT PRIMARY KEY, wynik BLOB NOT NULL, uzyty REAL NOT NULL)')
+        pamiec.execute('CREATE INDEX IF NOT EXISTS wyniki_uzyty ON wyniki (uzyty)')
+    return pamiec
+
+
+def _odczytaj_wynik(stan, klucz):
+    with stan.blokada, stan.pamiec:
+        wiersz = stan.pamiec.execute('SELECT wynik FROM wyniki WHERE klucz = ?', (klucz,)).fetchone()
+        if wiersz is not None:
+            stan.pamiec.execute('UPDATE wyniki SET uzyty = ? WHERE klucz = ?', (time.time(), klucz))
+    return None if wiersz is None else bytes(wiersz[0])
+
+
+def _zapisz_wynik(stan, klucz, wynik):
+    with stan.blokada, stan.pamiec:
+        stan.pamiec.execute('INSERT OR REPLACE INTO wyniki VALUES (?, ?, ?)', (klucz, wynik, time.time()))
+        stan.pamiec.execute('DELETE FROM wyniki WHERE klucz IN '
+                            '(SELECT klucz FROM wyniki ORDER BY uzyty DESC LIMIT -1 OFFSET ?)', (stan.max_wynikow,))
+
+
+def _liczba_wynikow(stan):
+    with stan.blokada:
+        return stan.pamiec.execute('SELECT COUNT(*) FROM wyniki').fetchone()[0]
+
+
+# --- PROCESY ROBOCZE ---
+def _na_json(wartosc):
+    # Wyniki kalkulatora -> typy JSON (liczby NumPy, okresy pandas; NaN i nieskończoność jako null)
+    if isinstance(wartosc, dict):
+        return {str(k): _na_json(v) for k, v in wartosc.items()}
+    if isinstance(wartosc, (list, tuple)):
+        return [_na_json(v) for v in wartosc]
+    if isinstance(wartosc, np.generic):
+        wartosc = wartosc.item()
+    if isinstance(wartosc, float):
+        return wartosc if math.isfinite(wartosc) else None
+    if isinstance(wartosc, (pd.Period, pd.Timestamp)):
+        return str(wartosc)
+    return wartosc
+
+
+def _json(wartosc):
+    return json.dumps(_na_json(wartosc), ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+def _wycen(sciezka, parametry, taryfa, strategia_ess, rozdzielczosc, profil_wiatru):
+    # W procesie roboczym; zwraca gotową treść odpowiedzi (JSON w bajtach)
+    wynik = run_simulation(**parametry, df_dane=wczytaj_dane(sciezka), profil_wiatru=profil_wiatru,
+                           strategia_ess=strategia_ess, taryfa=taryfa, rozdzielczosc=rozdzielczosc)
+    return _json({'wyniki_roczne': wynik['wyniki_roczne'], 'raport_miesieczny_dane': wynik['raport_miesieczny_dane']})
+
+
+def _sprawdz_dane(sciezka):
+    # W procesie roboczym: parsowanie przesłanego pliku (i zapis .cache.npz obok niego)
+    return len(wczytaj_dane(sciezka))
+
+
+def _nowa_pula(procesy):
+    return concurrent.futures.ProcessPoolExecutor(max_workers=procesy)
+
+
+async def _w_puli(stan, funkcja, *argumenty):
+    pula = stan.pula
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pula, funkcja, *argumenty)
+    except concurrent.futures.process.BrokenProcessPool:
+        # Proces roboczy padł (np. brak pamięci) - kolejne zapytania dostają nową pulę
+        if stan.pula is pula:
+            stan.pula = _nowa_pula(stan.procesy)
+            pula.shutdown(wait=False)
+        raise
+
+
+# --- WYCENY ---
+def znormalizuj_zapytanie(stan, zapytanie):
+    # Zapytanie /wycena -> (klucz wyniku, argumenty _wycen); błędy wejścia podnoszą ValueError
+    if not isinstance(zapytanie, dict):
+        raise ValueError("❌ Zapytanie musi być obiektem JSON.")
+    nieznane = sorted(set(zapytanie) - set(POLA_WYCENY))
+    if nieznane:
+        raise ValueError(f"❌ Nieznane pola zapytania: {nieznane}. Dozwolone: {list(POLA_WYCENY)}")
+
+    skrot_danych = zapytanie.get('dane') or stan.domyslny_zbior
+    if skrot_danych is None:
+        raise ValueError("❌ Brak zbioru danych - podaj 'dane' (skrót zwrócony przez POST /dane).")
+    if not isinstance(skrot_danych, str) or skrot_danych not in stan.zbiory:
+        raise _BladHttp(404, f"❌ Nieznany zbiór danych '{skrot_danych}' - wyślij plik przez POST /dane.")
+
+    parametry = zapytanie.get('parametry') or {}
+    if not isinstance(parametry, dict):
+        raise ValueError("❌ 'parametry' musi być obiektem {parametr: wartość}.")
+    wiersz = uzupelnij_scenariusze(pd.DataFrame([parametry])).iloc[0]
+    parametry = {p: bool(wiersz[p]) if p in PARAMETRY_LOGICZNE else float(wiersz[p]) for p in PARAMETRY_SYMULACJI}
+
+    taryfa = zapytanie.get('taryfa')
+    if taryfa is not None:
+        if not isinstance(taryfa, (dict, str)) or isinstance(taryfa, str) and taryfa not in TARYFY_WBUDOWANE:
+            raise ValueError(f"❌ 'taryfa' musi być nazwą wbudowanej taryfy ({', '.join(TARYFY_WBUDOWANE)}) albo obiektem.")
+        taryfa = wczytaj_taryfe(taryfa)
+
+    strategia_ess = zapytanie.get('strategia_ess') or 'autokonsumpcja'
+    if not isinstance(strategia_ess, str) or strategia_ess not in STRATEGIE_ESS:
+        raise ValueError(f"❌ Nieznana strategia pracy magazynu '{strategia_ess}', dostępne: {list(STRATEGIE_ESS)}")
+    rozdzielczosc = zapytanie.get('rozdzielczosc')
+    if rozdzielczosc not in ROZDZIELCZOSCI:
+        raise ValueError(f"❌ Nieznana rozdzielczość '{rozdzielczosc}' (dozwolone: {ROZDZIELCZOSCI[1:]} albo brak).")
+
+    profil_wiatru = zapytanie.get('profil_wiatru')
+    skrot_profilu = None
+    if profil_wiatru is not None:
+        try:
+            profil_wiatru = np.asarray(profil_wiatru, dtype=np.float64)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"❌ 'profil_wiatru' musi być macierzą 12x24 albo serią liczb. {e}") from e
+        skrot_profilu = hashlib.sha1(profil_wiatru.tobytes() + str(profil_wiatru.shape).encode()).hexdigest()
+
+    opis = {'wersja': [WERSJA_WYNIKOW, WERSJA_FORMATU], 'dane': skrot_danych, 'parametry': parametry,
+            'taryfa': None if taryfa is None else skrot_taryfy(taryfa), 'strategia_ess': strategia_ess,
+            'rozdzielczosc': rozdzielczosc, 'profil_wiatru': skrot_profilu}
+    klucz = hashlib.sha256(json.dumps(opis, sort_keys=True).encode()).hexdigest()
+    return klucz, (stan.zbiory[skrot_danych], parametry, taryfa, strategia_ess, rozdzielczosc, profil_wiatru)
+
+
+async def _odczytaj_lub_oblicz(stan, klucz, argumenty):
+    wynik = await asyncio.to_thread(_odczytaj_wynik, stan, klucz)
+    if wynik is not None:
+        stan.statystyki['z_pamieci'] += 1
+        return 'z_pamieci', wynik
+    wynik = await _w_puli(stan, _wycen, *argumenty)
+    stan.statystyki['obliczenia'] += 1
+    await asyncio.to_thread(_zapisz_wynik, stan, klucz, wynik)
+    return 'obliczenie', wynik
+
+
+async def wycen(stan, zapytanie):
+    # Zwraca (klucz, źródło wyniku, treść JSON); identyczne zapytania w toku dzielą jedno zadanie
+    klucz, argumenty = znormalizuj_zapytanie(stan, zapytanie)
+    zadanie = stan.w_toku.get(klucz)
+    if zadanie is not None:
+        stan.statystyki['polaczone'] += 1
+        return klucz, 'polaczone', (await asyncio.shield(zadanie))[1]
+
+    def zakonczone(zadanie):
+        stan.w_toku.pop(klucz, None)
+        if not zadanie.cancelled():
+            zadanie.exception()  # błąd odebrany także wtedy, gdy wszyscy czekający się rozłączyli
+
+    # shield: rozłączenie klienta nie przerywa przebiegu, na który czekają inni
+    zadanie = stan.w_toku[klucz] = asyncio.ensure_future(_odczytaj_lub_oblicz(stan, klucz, argumenty))
+    zadanie.add_done_callback(zakonczone)
+    zrodlo, wynik = await asyncio.shield(zadanie)
+    return klucz, zrodlo, wynik
+
+
+def _zapisz_plik(sciezka, zawartosc):
+    # Zapis przez plik tymczasowy - inne procesy nigdy nie widzą niepełnego pliku
+    deskryptor, tymczasowy = tempfile.mkstemp(dir=os.path.dirname(sciezka), suffix='.tmp')
+    try:
+        with os.fdopen(deskryptor, 'wb') as f:
+            f.write(zawartosc)
+        os.replace(tymczasowy, sciezka)
+    except BaseException:
+        os.unlink(tymczasowy)
+        raise
+
+
+async def przyjmij_dane(stan, zawartosc):
+    # Zbiór danych zapisany pod skrótem zawartości; ponowne przesłanie tego samego pliku nic nie liczy
+    skrot = await asyncio.to_thread(lambda: hashlib.sha256(zawartosc).hexdigest())
+    if skrot not in stan.zbiory:
+        sciezka = os.path.join(stan.katalog, 'dane', skrot + '.csv')
+        await asyncio.to_thread(_zapisz_plik, sciezka, zawartosc)
+        try:
+            await _w_puli(stan, _sprawdz_dane, sciezka)
+        except Exception:
+            os.unlink(sciezka)
+            raise
+        stan.zbiory[skrot] = sciezka
+    return {'dane': skrot}
+
+
+# --- HTTP ---
+async def _wiersz(czytnik):
+    try:
+        return await czytnik.readline()
+    except ValueError:  # wiersz dłuższy niż bufor strumienia
+        raise _BladHttp(400, "❌ Zbyt długi wiersz zapytania lub nagłówka HTTP.") from None
+
+
+async def _czytaj_zapytanie(czytnik):
+    # (metoda, ścieżka, wersja, nagłówki, treść) albo None po zamknięciu połączenia przez klienta
+    wiersz = await asyncio.wait_for(_wiersz(czytnik), LIMIT_BEZCZYNNOSCI_S)
+    if not wiersz.strip():
+        return None
+    czesci = wiersz.decode('latin-1').split()
+    if len(czesci) != 3:
+        raise _BladHttp(400, "❌ Niepoprawny wiersz zapytania HTTP.")
+    metoda, cel, wersja = czesci
+    naglowki = {}
+    while True:
+        wiersz = await _wiersz(czytnik)
+        if wiersz in (b'\r\n', b'\n', b''):
+            break
+        nazwa, _, wartosc = wiersz.decode('latin-1').partition(':')
+        naglowki[nazwa.strip().lower()] = wartosc.strip()
+    if 'chunked' in naglowki.get('transfer-encoding', '').lower():
+        raise _BladHttp(411, "❌ Wymagany nagłówek Content-Length (bez Transfer-Encoding: chunked).")
+    try:
+        dlugosc = int(naglowki.get('content-length', 0))
+    except ValueError:
+        raise _BladHttp(400, "❌ Niepoprawny nagłówek Content-Length.") from None
+    if not 0 <= dlugosc <= MAX_ROZMIAR_ZAPYTANIA:
+        raise _BladHttp(413, f"❌ Treść zapytania większa niż {MAX_ROZMIAR_ZAPYTANIA // (1024 * 1024)} MB.")
+    tresc = await czytnik.readexactly(dlugosc) if dlugosc else b''
+    return metoda.upper(), cel.split('?', 1)[0], wersja, naglowki, tresc
+
+
+def _odpowiedz(status, tresc, naglowki=None, zamknij=False):
+    wiersze = [f"HTTP/1.1 {status} {_STATUSY[status]}", 'Content-Type: application/json; charset=utf-8',
+               f"Content-Length: {len(tresc)}", f"Connection: {'close' if zamknij else 'keep-alive'}"]
+    wiersze += [f"{nazwa}: {wartosc}" for nazwa, wartosc in (naglowki or {}).items()]
+    return ('\r\n'.join(wiersze) + '\r\n\r\n').encode('latin-1') + tresc
+
+
+async def _obsluz(stan, metoda, sciezka, tresc):
+    # Zwraca (status, treść JSON, dodatkowe nagłówki)
+    dozwolone = {'/wycena': 'POST', '/dane': 'POST', '/zdrowie': 'GET'}
+    if sciezka not in dozwolone:
+        raise _BladHttp(404, f"❌ Nieznana ścieżka '{sciezka}' (dostępne: {', '.join(dozwolone)}).")
+    if metoda != dozwolone[sciezka]:
+        raise _BladHttp(405, f"❌ {sciezka} przyjmuje tylko {dozwolone[sciezka]}.")
+
+    if sciezka == '/wycena':
+        klucz, zrodlo, wynik = await wycen(stan, json.loads(tresc or b'{}'))
+        return 200, wynik, {'X-Klucz-Wyniku': klucz, 'X-Pamiec-Wynikow': zrodlo}
+    if sciezka == '/dane':
+        if not tresc:
+            raise ValueError("❌ Pusta treść - oczekiwano pliku CSV danych.")
+        return 200, _json(await przyjmij_dane(stan, tresc)), {}
+    return 200, _json({'status': 'ok', 'procesy': stan.procesy, 'zbiory_danych': sorted(stan.zbiory),
+                       'domyslny_zbior': stan.domyslny_zbior, 'w_toku': len(stan.w_toku),
+                       'wyniki_na_dysku': await asyncio.to_thread(_liczba_wynikow, stan),
+                       'max_wynikow': stan.max_wynikow, **stan.statystyki}), {}
+
+
+async def _obsluz_polaczenie(stan, czytnik, pisarz):
+    try:
+        while True:
+            zamknij = False
+            try:
+                zapytanie = await _czytaj_zapytanie(czytnik)
+                if zapytanie is None:
+                    break
+                metoda, sciezka, wersja, naglowki, tresc = zapytanie
+                polaczenie = naglowki.get('connection', '').lower()
+                zamknij = polaczenie == 'close' or (wersja == 'HTTP/1.0' and polaczenie != 'keep-alive')
+                status, odpowiedz, dodatkowe = await _obsluz(stan, metoda, sciezka, tresc)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                break
+            except _BladHttp as e:
+                # Błąd przed odczytem treści (411, 413) zostawia ją w strumieniu - połączenie do zamknięcia
+                status, odpowiedz, dodatkowe = e.status, _json({'blad': str(e)}), {}
+                zamknij = zamknij or e.status in (400, 411, 413)
+            except ValueError as e:
+                status, odpowiedz, dodatkowe = 400, _json({'blad': str(e)}), {}
+            except Exception as e:
+                stan.statystyki['bledy'] += 1
+                status, odpowiedz, dodatkowe = 500, _json({'blad': f"{type(e).__name__}: {e}"}), {}
+            pisarz.write(_odpowiedz(status, odpowiedz, dodatkowe, zamknij))
+            await pisarz.drain()
+            if zamknij:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        pisarz.close()
+
+
+# --- URUCHOMIENIE ---
+def utworz_stan(katalog, dane=(), procesy=None, max_wynikow=MAX_WYNIKOW_NA_DYSKU):
+    # Zbiory danych: przesłane wcześniej (<katalog>/dane/<skrót>.csv) i pliki `dane` (pierwszy = domyślny).
+    # Pliki `dane` są kopiowane pod skrót zawartości jak przesłane - późniejsza edycja oryginału nie zmienia
+    # danych zapisanych pod starym skrótem (ani wyników w pamięci)
+    os.makedirs(os.path.join(katalog, 'dane'), exist_ok=True)
+    procesy = procesy or os.cpu_count() or 1
+    stan = StanSerwisu(katalog=katalog, procesy=procesy, pula=_nowa_pula(procesy),
+                       pamiec=otworz_pamiec(os.path.join(katalog, 'wyniki.sqlite')), max_wynikow=max_wynikow)
+    for sciezka in glob.glob(os.path.join(katalog, 'dane', '*.csv')):
+        stan.zbiory[os.path.splitext(os.path.basename(sciezka))[0]] = sciezka
+    for sciezka in dane:
+        with open(sciezka, 'rb') as f:
+            zawartosc = f.read()
+        skrot = hashlib.sha256(zawartosc).hexdigest()
+        if skrot not in stan.zbiory:
+            stan.zbiory[skrot] = os.path.join(katalog, 'dane', skrot + '.csv')
+            _zapisz_plik(stan.zbiory[skrot], zawartosc)
+        stan.domyslny_zbior = stan.domyslny_zbior or skrot
+    return stan
+
+
+def zamknij_stan(stan):
+    stan.pula.shutdown(cancel_futures=True)
+    stan.pamiec.close()
+
+
+async def uruchom(stan, host='127.0.0.1', port=8765):
+    serwer = await asyncio.start_server(lambda czytnik, pisarz: _obsluz_polaczenie(stan, czytnik, pisarz), host, port)
+    print(f"Serwis wycen: http://{host}:{port} (procesy: {stan.procesy}, zbiory danych: {len(stan.zbiory)}, "
+          f"katalog: {stan.katalog})", file=sys.stderr)
+    async with serwer:
+        zadanie = asyncio.ensure_future(serwer.serve_forever())
+        try:
+            # SIGTERM kończy serwis tak jak Ctrl+C - z zamknięciem puli procesów i pamięci wyników
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, zadanie.cancel)
+        except NotImplementedError:  # Windows
+            pass
+        try:
+            await zadanie
+        except asyncio.CancelledError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serwis wycen HTTP/JSON z pamięcią wyników na dysku.")
+    parser.add_argument('--katalog', default='pamiec_serwisu',
+                        help="katalog przesłanych danych i pamięci wyników (domyślnie: %(default)s)")
+    parser.add_argument('--dane', nargs='*', default=[], help="pliki danych dostępne od startu (pierwszy = domyślny)")
+    parser.add_argument('--host', default='127.0.0.1', help="adres nasłuchu (domyślnie: %(default)s)")
+    parser.add_argument('--port', type=int, default=8765, help="port (domyślnie: %(default)s)")
+    parser.add_argument('-j', '--procesy', type=int, help="liczba procesów roboczych (domyślnie liczba rdzeni)")
+    parser.add_argument('--max-wynikow', type=int, default=MAX_WYNIKOW_NA_DYSKU,
+                        help="limit wyników w pamięci na dysku (domyślnie: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        stan = utworz_stan(args.katalog, args.dane, args.procesy, args.max_wynikow)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        asyncio.run(uruchom(stan, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        zamknij_stan(stan)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,623 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# =========================================================================
+# --- SILNIK SYMULACJI: PĘTLA BILANSU NA TABLICACH NUMPY ---
+# =========================================================================
+# Ta sama logika co dawna pętla `df.iterrows()` w run_simulation (autokonsumpcja
+# PV/Wiatr, ładowanie/rozładowanie ESS, portfel net-billingu, zakup z sieci),
+# ale na ciągłych tablicach. Jeżeli dostępna jest numba, pętla jest kompilowana
+# (JIT); w przeciwnym razie działa ta sama funkcja w czystym Pythonie na listach.
+# Kolejność działań zmiennoprzecinkowych jest zachowana 1:1, więc wyniki są
+# identyczne z poprzednią implementacją.
+
+try:
+    from numba import njit
+except ImportError:  # numba jest opcjonalna
+    njit = None
+
+# Kolumny macierzy miesięcznej (jeden wiersz na segment miesiąca)
+M_PORTFEL_POCZATEK = 0
+M_PORTFEL_KONIEC = 1
+M_DYSTRYBUCJA = 2
+M_ENERGIA_DO_ZAPLATY = 3
+M_PRODUKCJA = 4
+M_KONSUMPCJA = 5
+M_AUTOKONSUMPCJA = 6
+M_SPRZEDAZ = 7
+M_ZAKUP = 8
+M_AC_PV = 9
+M_AC_WIATR = 10
+M_AC_ESS = 11
+LICZBA_KOLUMN_MIESIECZNYCH = 12
+
+# Pozycje wektora sum rocznych
+S_PRODUKCJA_PV = 0
+S_PRODUKCJA_WIATR = 1
+S_AC_PV = 2
+S_AC_WIATR = 3
+S_AC_ESS = 4
+S_WYSLANA_DO_SIECI = 5
+S_DYSTRYBUCJA = 6
+S_ENERGIA_DO_ZAPLATY = 7
+S_KOMPENSACJA = 8
+S_PORTFEL = 9
+S_SOC = 10
+S_PORTFEL_WYGASLY = 11
+LICZBA_SUM = 12
+
+# Nazwy tablic interwałowych zwracanych przez symuluj_bilans
+KOLUMNY_INTERWALOWE = ('AC_PV_KWh', 'AC_Wiatr_KWh', 'AC_ESS_KWh', 'ESS_Ladowanie_KWh',
+                       'ESS_Rozladowanie_KWh', 'Sprzedaz_Siec_KWh', 'Zakup_Siec_KWh', 'ESS_SoC_KWh', 'Portfel_PLN')
+_I_EKSPORT = KOLUMNY_INTERWALOWE.index('Sprzedaz_Siec_KWh')
+_I_ZAKUP = KOLUMNY_INTERWALOWE.index('Zakup_Siec_KWh')
+
+
+def _petla_bilansu(moc_pv_kwp, produkcja_pv_1kwp, produkcja_wiatr, konsumpcja,
+                   cena_eksportu, cena_energii, koszt_dystrybucji, segment, kody_segmentow, kod_poczatkowy,
+                   ess_pojemnosc_kwh, ess_soc_kwh, limit_ladowania_kwh, limit_rozladowania_kwh,
+                   sprawnosc, plan, skala_limitow, miesiace, sumy, koszyki, ac_pv, ac_wiatr, ac_ess, ess_lad, ess_rozl,
+                   eksport, zakup, soc, portfel):
+    # `miesiace` to spłaszczona macierz [segment * LICZBA_KOLUMN_MIESIECZNYCH + kolumna]
+    # `koszyki` - puste: portfel bez wygasania; inaczej L koszyków wpłat (koszyk = kod miesiąca % L):
+    # wpłata z miesiąca m wygasa na początku miesiąca m + L, kompensacja zużywa najstarsze wpłaty
+    # (`kody_segmentow` - kod miesiąca segmentu, `kod_poczatkowy` - miesiąc poprzedniego fragmentu albo -1)
+    # `plan` - pusty: zachłanna autokonsumpcja; inaczej zadany przepływ ESS po stronie AC na
+    # interwał (> 0 ładowanie, najpierw z nadwyżki, reszta z sieci; < 0 rozładowanie, najpierw
+    # na pokrycie niedoboru, reszta do sieci), przycinany do pojemności, SoC i limitów mocy
+    # `skala_limitow` - pusta: limity na każdy interwał; inaczej mnożnik limitów per interwał
+    # (długość interwału / krok nominalny - dane o mieszanej lub nieregularnej rozdzielczości)
+    bez_planu = len(plan) == 0
+    stale_limity = len(skala_limitow) == 0
+    lim_lad = limit_ladowania_kwh
+    lim_rozl = limit_rozladowania_kwh
+    # Stan początkowy z `sumy` (zera dla nowej symulacji, stan poprzedniego fragmentu przy kontynuacji)
+    K = LICZBA_KOLUMN_MIESIECZNYCH
+    portfel_pln = sumy[S_PORTFEL]
+    suma_produkcji_pv_kwh = sumy[S_PRODUKCJA_PV]
+    suma_produkcji_wiatr_kwh = sumy[S_PRODUKCJA_WIATR]
+    suma_autokonsumpcji_pv_kwh = sumy[S_AC_PV]
+    suma_autokonsumpcji_wiatr_kwh = sumy[S_AC_WIATR]
+    suma_autokonsumpcji_z_ess_kwh = sumy[S_AC_ESS]
+    suma_wyslana_do_sieci_kwh = sumy[S_WYSLANA_DO_SIECI]
+    koszt_dystrybucji_suma = sumy[S_DYSTRYBUCJA]
+    koszt_energii_do_zaplaty = sumy[S_ENERGIA_DO_ZAPLATY]
+    oszczednosci_kompensacja_suma = sumy[S_KOMPENSACJA]
+    portfel_wygasly = sumy[S_PORTFEL_WYGASLY]
+    aktualny_segment = -1
+    L = len(koszyki)
+    aktualny_kod = kod_poczatkowy
+
+    for i in range(len(konsumpcja)):
+        s = segment[i]
+        if s != aktualny_segment and s >= 0:
+            aktualny_segment = s
+            if L > 0:
+                # Wygasają wpłaty z miesięcy m - L dla każdego rozpoczętego miesiąca m
+                kod = kody_segmentow[s]
+                if aktualny_kod >= 0:
+                    for m in range(aktualny_kod + 1, min(kod, aktualny_kod + L) + 1):
+                        wygasa = min(koszyki[m % L], portfel_pln)
+                        koszyki[m % L] = 0.0
+                        portfel_pln -= wygasa
+                        portfel_wygasly += wygasa
+                if kod > aktualny_kod:
+                    aktualny_kod = kod
+            miesiace[s * K + M_PORTFEL_POCZATEK] = portfel_pln
+        b = aktualny_segment * K
+
+        produkcja_pv = moc_pv_kwp * produkcja_pv_1kwp[i]
+        produkcja_w = produkcja_wiatr[i]
+        suma_produkcji_pv_kwh += produkcja_pv
+        suma_produkcji_wiatr_kwh += produkcja_w
+
+        kons = konsumpcja[i]
+        if b >= 0:
+            miesiace[b + M_PRODUKCJA] += produkcja_pv + produkcja_w
+            miesiace[b + M_KONSUMPCJA] += kons
+        pozostala_konsumpcja = kons
+
+        # KROK 1: Autokonsumpcja bezpośrednia (PV + Wiatr)
+        autokonsumpcja_z_pv = min(produkcja_pv, pozostala_konsumpcja)
+        suma_autokonsumpcji_pv_kwh += autokonsumpcja_z_pv
+        pozostala_konsumpcja -= autokonsumpcja_z_pv
+        nadwyzka_pv = produkcja_pv - autokonsumpcja_z_pv
+
+        autokonsumpcja_z_wiatru = min(produkcja_w, pozostala_konsumpcja)
+        suma_autokonsumpcji_wiatr_kwh += autokonsumpcja_z_wiatru
+        pozostala_konsumpcja -= autokonsumpcja_z_wiatru
+        nadwyzka_wiatr = produkcja_w - autokonsumpcja_z_wiatru
+
+        nadwyzka = nadwyzka_pv + nadwyzka_wiatr
+        niedobor = pozostala_konsumpcja
+
+        energia_do_magazynu = 0.0
+        energia_z_ess = 0.0
+        rozladowanie = 0.0
+        if not stale_limity:
+            lim_lad = limit_ladowania_kwh * skala_limitow[i]
+            lim_rozl = limit_rozladowania_kwh * skala_limitow[i]
+        if bez_planu:
+            # A. Nadwyżka (ładowanie ESS)
+            if nadwyzka > 0:
+                brakuje_do_pelna = ess_pojemnosc_kwh - ess_soc_kwh
+                max_netto = min(brakuje_do_pelna, lim_lad)
+                energia_do_pobrania = max_netto / sprawnosc
+                energia_do_magazynu = min(nadwyzka, energia_do_pobrania)
+                if energia_do_magazynu > 0:
+                    ess_soc_kwh += energia_do_magazynu * sprawnosc
+                    nadwyzka -= energia_do_magazynu
+
+            # B. Niedobór (rozładowanie ESS)
+            if niedobor > 0:
+                max_rozladowanie = min(ess_soc_kwh, lim_rozl)
+                energia_z_ess = min(niedobor, max_rozladowanie)
+                if energia_z_ess > 0:
+                    ess_soc_kwh -= energia_z_ess
+                    niedobor -= energia_z_ess
+                    suma_autokonsumpcji_z_ess_kwh += energia_z_ess
+            rozladowanie = energia_z_ess
+        elif plan[i] > 0:
+            # A'. Ładowanie wg planu
+            max_netto = min(ess_pojemnosc_kwh - ess_soc_kwh, lim_lad)
+            energia_do_magazynu = min(plan[i], max_netto / sprawnosc)
+            if energia_do_magazynu > 0:
+                ess_soc_kwh += energia_do_magazynu * sprawnosc
+                z_nadwyzki = min(nadwyzka, energia_do_magazynu)
+                nadwyzka -= z_nadwyzki
+                niedobor += energia_do_magazynu - z_nadwyzki
+            else:
+                energia_do_magazynu = 0.0
+        elif plan[i] < 0:
+            # B'. Rozładowanie wg planu
+            rozladowanie = min(-plan[i], ess_soc_kwh, lim_rozl)
+            if rozladowanie > 0:
+                ess_soc_kwh -= rozladowanie
+                energia_z_ess = min(niedobor, rozladowanie)
+                niedobor -= energia_z_ess
+                suma_autokonsumpcji_z_ess_kwh += energia_z_ess
+                nadwyzka += rozladowanie - energia_z_ess
+            else:
+                rozladowanie = 0.0
+
+        if b >= 0:
+            miesiace[b + M_AC_PV] += autokonsumpcja_z_pv
+            miesiace[b + M_AC_WIATR] += autokonsumpcja_z_wiatru
+            if energia_z_ess > 0:
+                miesiace[b + M_AC_ESS] += energia_z_ess
+            miesiace[b + M_AUTOKONSUMPCJA] += autokonsumpcja_z_pv + autokonsumpcja_z_wiatru + energia_z_ess
+
+        # D. Eksport pozostałej nadwyżki (net-billing)
+        wyslana = 0.0
+        if nadwyzka > 0:
+            wyslana = nadwyzka
+            cena_sprzedazy = cena_eksportu[i]
+            if cena_sprzedazy < 0:
+                cena_sprzedazy = 0.0
+            portfel_pln += wyslana * cena_sprzedazy
+            if L > 0 and aktualny_kod >= 0:
+                koszyki[aktualny_kod % L] += wyslana * cena_sprzedazy
+            suma_wyslana_do_sieci_kwh += wyslana
+            if b >= 0:
+                miesiace[b + M_SPRZEDAZ] += wyslana
+
+        # E. Pobór z sieci (pozostały niedobór)
+        pobrana = 0.0
+        if niedobor > 0:
+            pobrana = niedobor
+            koszt_dystrybucji_dodatek = niedobor * koszt_dystrybucji[i]
+            koszt_dystrybucji_suma += koszt_dystrybucji_dodatek
+            if b >= 0:
+                miesiace[b + M_DYSTRYBUCJA] += koszt_dystrybucji_dodatek
+
+            koszt_energii_czynnej = niedobor * cena_energii[i]
+            kompensacja_z_portfela = min(portfel_pln, koszt_energii_czynnej)
+            portfel_pln -= kompensacja_z_portfela
+            oszczednosci_kompensacja_suma += kompensacja_z_portfela
+            if L > 0 and aktualny_kod >= 0:
+                do_pokrycia = kompensacja_z_portfela
+                for m in range(aktualny_kod - L + 1, aktualny_kod + 1):
+                    if do_pokrycia <= 0:
+                        break
+                    z_koszyka = min(koszyki[m % L], do_pokrycia)
+                    koszyki[m % L] -= z_koszyka
+                    do_pokrycia -= z_koszyka
+
+            pozostaly_koszt = koszt_energii_czynnej - kompensacja_z_portfela
+            koszt_energii_do_zaplaty += pozostaly_koszt
+            if b >= 0:
+                miesiace[b + M_ENERGIA_DO_ZAPLATY] += pozostaly_koszt
+                miesiace[b + M_ZAKUP] += niedobor
+            portfel_pln = max(0.0, portfel_pln)
+
+        if b >= 0:
+            miesiace[b + M_PORTFEL_KONIEC] = portfel_pln
+
+        ac_pv[i] = autokonsumpcja_z_pv
+        ac_wiatr[i] = autokonsumpcja_z_wiatru
+        ac_ess[i] = energia_z_ess
+        ess_lad[i] = energia_do_magazynu
+        ess_rozl[i] = rozladowanie
+        eksport[i] = wyslana
+        zakup[i] = pobrana
+        soc[i] = ess_soc_kwh
+        portfel[i] = portfel_pln
+
+    sumy[S_PRODUKCJA_PV] = suma_produkcji_pv_kwh
+    sumy[S_PRODUKCJA_WIATR] = suma_produkcji_wiatr_kwh
+    sumy[S_AC_PV] = suma_autokonsumpcji_pv_kwh
+    sumy[S_AC_WIATR] = suma_autokonsumpcji_wiatr_kwh
+    sumy[S_AC_ESS] = suma_autokonsumpcji_z_ess_kwh
+    sumy[S_WYSLANA_DO_SIECI] = suma_wyslana_do_sieci_kwh
+    sumy[S_DYSTRYBUCJA] = koszt_dystrybucji_suma
+    sumy[S_ENERGIA_DO_ZAPLATY] = koszt_energii_do_zaplaty
+    sumy[S_KOMPENSACJA] = oszczednosci_kompensacja_suma
+    sumy[S_PORTFEL] = portfel_pln
+    sumy[S_SOC] = ess_soc_kwh
+    sumy[S_PORTFEL_WYGASLY] = portfel_wygasly
+
+
+_petla_bilansu_jit = njit(cache=True, nogil=True)(_petla_bilansu) if njit is not None else None
+
+
+def _skala(skala_limitow):
+    return np.zeros(0) if skala_limitow is None else np.ascontiguousarray(skala_limitow, dtype=np.float64)
+
+
+def segmenty_miesieczne(kod_miesiaca):
+    # Kod miesiąca = rok * 12 + (miesiąc - 1), wartość < 0 oznacza brak daty.
+    # Nowy segment zaczyna się przy każdej zmianie kodu (jak porównanie Miesiąc_Rok
+    # w dawnej pętli); wiersze bez daty dziedziczą segment poprzedniego wiersza.
+    kod = np.asarray(kod_miesiaca, dtype=np.int64)
+    idx_poprawnych = np.flatnonzero(kod >= 0)
+    kody = kod[idx_poprawnych]
+    zmiana = np.ones(len(kody), dtype=bool)
+    zmiana[1:] = kody[1:] != kody[:-1]
+    segment = np.full(len(kod), -1, dtype=np.int64)
+    segment[idx_poprawnych] = np.cumsum(zmiana) - 1
+    segment = np.maximum.accumulate(segment) if len(segment) else segment
+    return segment, kody[zmiana]
+
+
+def poczatki_miesiecy(kod_miesiaca):
+    # Indeksy pierwszych interwałów segmentów miesięcznych i kody ich miesięcy (-1 = początek bez daty)
+    segment, kody_segmentow = segmenty_miesieczne(kod_miesiaca)
+    poczatki = np.flatnonzero(np.diff(segment, prepend=-2))
+    return poczatki, [int(kody_segmentow[s]) if s >= 0 else -1 for s in segment[poczatki]]
+
+
+def symuluj_bilans(produkcja_pv_1kwp, produkcja_wiatr, konsumpcja, cena_eksportu, cena_energii,
+                   koszt_dystrybucji, kod_miesiaca, moc_pv_kwp, ess_pojemnosc_kwh,
+                   limit_ladowania_kwh, limit_rozladowania_kwh, sprawnosc, ess_soc_poczatek_kwh=None,
+                   uzyj_jit=True, stan=None, plan_ess=None, wygasanie_portfela_miesiace=0, skala_limitow=None):
+    # `plan_ess` - przepływy ESS z strategie.py (None = zachłanna autokonsumpcja, jak dawniej).
+    # `skala_limitow` - mnożnik limitów mocy ESS per interwał (None = dane o stałym kroku).
+    # `wygasanie_portfela_miesiace` - po ilu miesiącach wygasa niewykorzystana wpłata (0 = nigdy).
+    # `stan` to wynik['stan'] poprzedniego fragmentu tego samego szeregu: sumy, SoC i portfel są
+    # kontynuowane, a miesiąc przecinający granicę fragmentów akumulowany dalej w tym samym wierszu
+    n = len(konsumpcja)
+    segment, kody_segmentow = segmenty_miesieczne(kod_miesiaca)
+    miesiace = np.zeros(len(kody_segmentow) * LICZBA_KOLUMN_MIESIECZNYCH)
+    sumy = np.zeros(LICZBA_SUM)
+    koszyki = np.zeros(int(wygasanie_portfela_miesiace or 0))
+    kod_poczatkowy = -1
+    kontynuacja_miesiaca = False
+    if stan is not None:
+        sumy[:] = stan['sumy']
+        kod_poczatkowy = stan['kod_miesiaca']
+        if len(koszyki) and len(stan.get('koszyki', ())) == len(koszyki):
+            koszyki[:] = stan['koszyki']
+        ess_soc_poczatek_kwh = stan['sumy'][S_SOC]
+        kontynuacja_miesiaca = len(kody_segmentow) > 0 and stan['kod_miesiaca'] == kody_segmentow[0]
+        if kontynuacja_miesiaca:
+            miesiace[:LICZBA_KOLUMN_MIESIECZNYCH] = stan['miesiac']
+    if ess_soc_poczatek_kwh is None:
+        ess_soc_poczatek_kwh = ess_pojemnosc_kwh / 2
+
+    wejscia = [np.ascontiguousarray(a, dtype=np.float64) for a in
+               (produkcja_pv_1kwp, produkcja_wiatr, konsumpcja, cena_eksportu, cena_energii, koszt_dystrybucji)]
+    skalary = (float(ess_pojemnosc_kwh), float(ess_soc_poczatek_kwh), float(limit_ladowania_kwh),
+               float(limit_rozladowania_kwh), float(sprawnosc))
+
+    plan = np.zeros(0) if plan_ess is None else np.ascontiguousarray(plan_ess, dtype=np.float64)
+    skala = _skala(skala_limitow)
+
+    if uzyj_jit and _petla_bilansu_jit is not None:
+        wyjscia = [np.empty(n) for _ in KOLUMNY_INTERWALOWE]
+        _petla_bilansu_jit(float(moc_pv_kwp), *wejscia, segment, kody_segmentow, kod_poczatkowy, *skalary, plan,
+                           skala, miesiace, sumy, koszyki, *wyjscia)
+    else:
+        # Fallback bez numby: listy Pythona są wielokrotnie szybsze od indeksowania tablic NumPy
+        miesiace_lista = miesiace.tolist()
+        sumy_lista = sumy.tolist()
+        koszyki_lista = koszyki.tolist()
+        wyjscia = [[0.0] * n for _ in KOLUMNY_INTERWALOWE]
+        _petla_bilansu(float(moc_pv_kwp), *[a.tolist() for a in wejscia], segment.tolist(), kody_segmentow.tolist(),
+                       kod_poczatkowy, *skalary, plan.tolist(), skala.tolist(), miesiace_lista, sumy_lista, koszyki_lista, *wyjscia)
+        miesiace = np.array(miesiace_lista)
+        sumy = np.array(sumy_lista)
+        koszyki = np.array(koszyki_lista)
+        wyjscia = [np.array(w) for w in wyjscia]
+
+    miesiace = miesiace.reshape(len(kody_segmentow), LICZBA_KOLUMN_MIESIECZNYCH)
+    if kontynuacja_miesiaca:
+        # Pętla otwiera segment od nowa - saldo początkowe miesiąca pochodzi z poprzedniego fragmentu
+        miesiace[0, M_PORTFEL_POCZATEK] = stan['miesiac'][M_PORTFEL_POCZATEK]
+    if len(kody_segmentow):
+        stan_koncowy = {'sumy': sumy.copy(), 'kod_miesiaca': int(kody_segmentow[-1]), 'miesiac': miesiace[-1].copy()}
+    else:
+        stan_koncowy = {'sumy': sumy.copy(), 'kod_miesiaca': stan['kod_miesiaca'] if stan else -1,
+                        'miesiac': stan['miesiac'] if stan else np.zeros(LICZBA_KOLUMN_MIESIECZNYCH)}
+    stan_koncowy['koszyki'] = koszyki.copy()
+
+    return {
+        'interwaly': dict(zip(KOLUMNY_INTERWALOWE, wyjscia)),
+        'sumy': sumy,
+        'miesiace': miesiace,
+        'kody_miesiecy': kody_segmentow,
+        'stan': stan_koncowy,
+    }
+
+
+# =========================================================================
+# --- SYMULACJA WSADOWA: WIELE KONFIGURACJI W JEDNYM PRZEJŚCIU PRZEZ ROK ---
+# =========================================================================
+def _petla_wsadowa_numpy(produkcja_pv_1kwp, ksztalt_wiatru, konsumpcja, cena_eksportu, cena_energii,
+                         koszt_dystrybucji, moc_pv_kwp, produkcja_wiatr_roczna, ess_pojemnosc_kwh,
+                         limit_ladowania_kwh, limit_rozladowania_kwh, sprawnosc, eksport=None, zakup=None,
+                         skala_limitow=None):
+    # Stan (SoC, portfel, sumy) to wektory po osi konfiguracji; czas przechodzimy raz.
+    # Warunki z pętli skalarnej zastąpione maskami - kolejność działań bez zmian.
+    # Opcjonalne `eksport`/`zakup` (n, K) zbierają przepływy z siecią per interwał.
+    K = len(moc_pv_kwp)
+    soc = ess_pojemnosc_kwh / 2
+    portfel = np.zeros(K)
+    sumy = np.zeros((LICZBA_SUM, K))
+    zero = np.zeros(K)
+    lim_lad, lim_rozl = limit_ladowania_kwh, limit_rozladowania_kwh
+
+    for i in range(len(konsumpcja)):
+        if skala_limitow is not None:
+            lim_lad = limit_ladowania_kwh * skala_limitow[i]
+            lim_rozl = limit_rozladowania_kwh * skala_limitow[i]
+        pv = moc_pv_kwp * produkcja_pv_1kwp[i]
+        wiatr = ksztalt_wiatru[i] * produkcja_wiatr_roczna
+        sumy[S_PRODUKCJA_PV] += pv
+        sumy[S_PRODUKCJA_WIATR] += wiatr
+
+        kons = konsumpcja[i]
+        ac_pv = np.minimum(pv, kons)
+        sumy[S_AC_PV] += ac_pv
+        pozostala = kons - ac_pv
+        nadwyzka_pv = pv - ac_pv
+
+        ac_wiatr = np.minimum(wiatr, pozostala)
+        sumy[S_AC_WIATR] += ac_wiatr
+        pozostala = pozostala - ac_wiatr
+        nadwyzka = nadwyzka_pv + (wiatr - ac_wiatr)
+
+        # A. Ładowanie ESS z nadwyżki
+        do_magazynu = np.minimum(nadwyzka, np.minimum(ess_pojemnosc_kwh - soc, lim_lad) / sprawnosc)
+        m = (nadwyzka > 0) & (do_magazynu > 0)
+        soc = np.where(m, soc + do_magazynu * sprawnosc, soc)
+        nadwyzka = np.where(m, nadwyzka - do_magazynu, nadwyzka)
+
+        # B. Rozładowanie ESS na niedobór
+        z_ess = np.minimum(pozostala, np.minimum(soc, lim_rozl))
+        m = (pozostala > 0) & (z_ess > 0)
+        soc = np.where(m, soc - z_ess, soc)
+        pozostala = np.where(m, pozostala - z_ess, pozostala)
+        sumy[S_AC_ESS] += np.where(m, z_ess, zero)
+
+        # D. Eksport (net-billing); cena skalarna albo wektor cen scenariuszy
+        m = nadwyzka > 0
+        cena_sprzedazy = np.maximum(cena_eksportu[i], 0.0)
+        portfel = np.where(m, portfel + nadwyzka * cena_sprzedazy, portfel)
+        wyslana = np.where(m, nadwyzka, zero)
+        sumy[S_WYSLANA_DO_SIECI] += wyslana
+        if eksport is not None:
+            eksport[i] = wyslana
+
+        # E. Zakup z sieci
+        m = pozostala > 0
+        sumy[S_DYSTRYBUCJA] += np.where(m, pozostala * koszt_dystrybucji[i], zero)
+        koszt_energii = pozostala * cena_energii[i]
+        kompensacja = np.minimum(portfel, koszt_energii)
+        sumy[S_KOMPENSACJA] += np.where(m, kompensacja, zero)
+        sumy[S_ENERGIA_DO_ZAPLATY] += np.where(m, koszt_energii - kompensacja, zero)
+        portfel = np.where(m, np.maximum(0.0, portfel - kompensacja), portfel)
+        if zakup is not None:
+            zakup[i] = np.where(m, pozostala, zero)
+
+    sumy[S_PORTFEL] = portfel
+    sumy[S_SOC] = soc
+    return sumy.T.copy()
+
+
+def symuluj_bilans_wsadowo(produkcja_pv_1kwp, ksztalt_wiatru, konsumpcja, cena_eksportu, cena_energii,
+                           koszt_dystrybucji, moc_pv_kwp, produkcja_wiatr_roczna, ess_pojemnosc_kwh,
+                           limit_ladowania_kwh, limit_rozladowania_kwh, sprawnosc, zapisz_przeplywy=False,
+                           uzyj_jit=True, kod_miesiaca=None, wygasanie_portfela_miesiace=0, skala_limitow=None):
+    # Zwraca macierz sum rocznych o kształcie (liczba konfiguracji, LICZBA_SUM).
+    # Produkcja wiatrowa konfiguracji k = ksztalt_wiatru * produkcja_wiatr_roczna[k].
+    # Z `zapisz_przeplywy=True` zwraca (sumy, przeplywy), gdzie przeplywy to słownik
+    # {'Sprzedaz_Siec_KWh', 'Zakup_Siec_KWh'} tablic (liczba konfiguracji, liczba interwałów).
+    # Wygasanie portfela wymaga kalendarza (`kod_miesiaca`) - liczone jest pętlą skalarną.
+    # `skala_limitow` jak w symuluj_bilans (limity konfiguracji na krok nominalny).
+    skala = _skala(skala_limitow)
+    wejscia = [np.ascontiguousarray(a, dtype=np.float64) for a in
+               (produkcja_pv_1kwp, ksztalt_wiatru, konsumpcja, cena_eksportu, cena_energii, koszt_dystrybucji)]
+    K = len(moc_pv_kwp)
+    konfiguracje = [np.broadcast_to(np.asarray(a, dtype=np.float64), (K,)).copy() for a in
+                    (moc_pv_kwp, produkcja_wiatr_roczna, ess_pojemnosc_kwh, limit_ladowania_kwh, limit_rozladowania_kwh)]
+
+    n = len(wejscia[2])
+    eksport = np.zeros((K, n)) if zapisz_przeplywy else None
+    zakup = np.zeros((K, n)) if zapisz_przeplywy else None
+    L = int(wygasanie_portfela_miesiace or 0)
+    if L > 0 and kod_miesiaca is None:
+        raise ValueError("Wygasanie portfela wymaga podania kod_miesiaca.")
+
+    if uzyj_jit and _petla_bilansu_jit is not None:
+        # Z numbą skompilowana pętla skalarna na konfigurację jest szybsza niż wektory NumPy
+        pv_1kwp, ksztalt, kons, c_eks, c_en, k_dys = wejscia
+        if L > 0:
+            segment, kody_segmentow = segmenty_miesieczne(kod_miesiaca)
+        else:
+            segment, kody_segmentow = np.full(n, -1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        bufory = [np.empty(n) for _ in KOLUMNY_INTERWALOWE]
+        sumy = np.zeros((K, LICZBA_SUM))
+        for k in range(K):
+            moc, wiatr_roczna, pojemnosc, lim_lad, lim_rozl = (float(a[k]) for a in konfiguracje)
+            if zapisz_przeplywy:
+                bufory[_I_EKSPORT], bufory[_I_ZAKUP] = eksport[k], zakup[k]
+            _petla_bilansu_jit(moc, pv_1kwp, ksztalt * wiatr_roczna, kons, c_eks, c_en, k_dys, segment,
+                               kody_segmentow, -1, pojemnosc, pojemnosc / 2, lim_lad, lim_rozl, float(sprawnosc),
+                               np.zeros(0), skala, np.zeros(len(kody_segmentow) * LICZBA_KOLUMN_MIESIECZNYCH), sumy[k],
+                               np.zeros(L), *bufory)
+    elif L > 0:
+        # Bez numby z wygasaniem: pętla skalarna (na listach) dla każdej konfiguracji
+        sumy = np.zeros((K, LICZBA_SUM))
+        for k in range(K):
+            moc, wiatr_roczna, pojemnosc, lim_lad, lim_rozl = (float(a[k]) for a in konfiguracje)
+            wynik = symuluj_bilans(wejscia[0], wejscia[1] * wiatr_roczna, *wejscia[2:], kod_miesiaca, moc, pojemnosc,
+                                   lim_lad, lim_rozl, sprawnosc, uzyj_jit=False, wygasanie_portfela_miesiace=L,
+                                   skala_limitow=skala_limitow)
+            sumy[k] = wynik['sumy']
+            if zapisz_przeplywy:
+                eksport[k], zakup[k] = wynik['interwaly']['Sprzedaz_Siec_KWh'], wynik['interwaly']['Zakup_Siec_KWh']
+    else:
+        eksport_t = np.zeros((n, K)) if zapisz_przeplywy else None
+        zakup_t = np.zeros((n, K)) if zapisz_przeplywy else None
+        sumy = _petla_wsadowa_numpy(*[a.tolist() for a in wejscia], *konfiguracje, float(sprawnosc),
+                                    eksport_t, zakup_t, skala.tolist() if len(skala) else None)
+        if zapisz_przeplywy:
+            eksport[:], zakup[:] = eksport_t.T, zakup_t.T
+
+    if zapisz_przeplywy:
+        return sumy, {'Sprzedaz_Siec_KWh': eksport, 'Zakup_Siec_KWh': zakup}
+    return sumy
+
+
+# =========================================================================
+# --- SCENARIUSZE: JEDNA KONFIGURACJA, WIELE LAT POGODOWO-CENOWYCH NARAZ ---
+# =========================================================================
+def symuluj_scenariusze(produkcja_pv_1kwp, produkcja_wiatr, konsumpcja, cena_eksportu, cena_energii,
+                        koszt_dystrybucji, moc_pv_kwp, ess_pojemnosc_kwh, limit_ladowania_kwh,
+                        limit_rozladowania_kwh, sprawnosc, watki=None, uzyj_jit=True, kod_miesiaca=None,
+                        wygasanie_portfela_miesiace=0, skala_limitow=None):
+    # produkcja_pv_1kwp, produkcja_wiatr, cena_eksportu, cena_energii: tablice (liczba scenariuszy,
+    # liczba interwałów); konsumpcja i koszt_dystrybucji wspólne. Zwraca macierz sum rocznych
+    # (liczba scenariuszy, LICZBA_SUM). `watki` - liczba wątków (domyślnie liczba rdzeni).
+    # Wygasanie portfela i `skala_limitow` jak w symuluj_bilans_wsadowo (wygasanie wymaga `kod_miesiaca`).
+    skala = _skala(skala_limitow)
+    serie = [np.ascontiguousarray(a, dtype=np.float64) for a in
+             (produkcja_pv_1kwp, produkcja_wiatr, cena_eksportu, cena_energii)]
+    if any(a.ndim != 2 or a.shape != serie[0].shape for a in serie):
+        raise ValueError("Serie scenariuszy muszą być tablicami (liczba scenariuszy, liczba interwałów) o jednym kształcie.")
+    pv_1kwp, wiatr, c_eks, c_en = serie
+    kons, k_dys = (np.ascontiguousarray(a, dtype=np.float64) for a in (konsumpcja, koszt_dystrybucji))
+    S = len(pv_1kwp)
+    L = int(wygasanie_portfela_miesiace or 0)
+    if L > 0 and kod_miesiaca is None:
+        raise ValueError("Wygasanie portfela wymaga podania kod_miesiaca.")
+
+    if uzyj_jit and _petla_bilansu_jit is not None:
+        # Skompilowana pętla zwalnia GIL (nogil=True), więc scenariusze liczone w wątkach
+        # zajmują wszystkie rdzenie bez procesów potomnych i bez warstwy wątków numby
+        n = len(kons)
+        if L > 0:
+            segment, kody_segmentow = segmenty_miesieczne(kod_miesiaca)
+        else:
+            segment, kody_segmentow = np.full(n, -1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        sumy = np.zeros((S, LICZBA_SUM))
+        skalary = (float(ess_pojemnosc_kwh), float(ess_pojemnosc_kwh) / 2, float(limit_ladowania_kwh),
+                   float(limit_rozladowania_kwh), float(sprawnosc))
+
+        def licz(s):
+            _petla_bilansu_jit(float(moc_pv_kwp), pv_1kwp[s], wiatr[s], kons, c_eks[s], c_en[s], k_dys, segment,
+                               kody_segmentow, -1, *skalary, np.zeros(0), skala,
+                               np.zeros(len(kody_segmentow) * LICZBA_KOLUMN_MIESIECZNYCH), sumy[s], np.zeros(L),
+                               *[np.empty(n) for _ in KOLUMNY_INTERWALOWE])
+
+        watki = max(1, min(watki or os.cpu_count() or 1, S))
+        if watki == 1:
+            for s in range(S):
+                licz(s)
+        else:
+            with ThreadPoolExecutor(watki) as pula:
+                list(pula.map(licz, range(S)))
+        return sumy
+
+    if L > 0:
+        return np.array([symuluj_bilans(pv_1kwp[s], wiatr[s], kons, c_eks[s], c_en[s], k_dys, kod_miesiaca,
+                                        moc_pv_kwp, ess_pojemnosc_kwh, limit_ladowania_kwh, limit_rozladowania_kwh,
+                                        sprawnosc, uzyj_jit=False, wygasanie_portfela_miesiace=L,
+                                        skala_limitow=skala_limitow)['sumy']
+                         for s in range(S)]).reshape(S, LICZBA_SUM)
+
+    # Bez numby: pętla wsadowa NumPy z osią scenariuszy zamiast osi konfiguracji
+    jedynki = np.ones(S)
+    return _petla_wsadowa_numpy(pv_1kwp.T, wiatr.T, kons.tolist(), c_eks.T, c_en.T, k_dys.tolist(),
+                                float(moc_pv_kwp) * jedynki, jedynki, float(ess_pojemnosc_kwh) * jedynki,
+                                float(limit_ladowania_kwh) * jedynki, float(limit_rozladowania_kwh) * jedynki,
+                                float(sprawnosc), skala_limitow=skala.tolist() if len(skala) else None)
+
+
+# =========================================================================
+# --- PORTFEL NET-BILLINGU W POSTACI ZAMKNIĘTEJ (DLA WIELU LAT NARAZ) ---
+# =========================================================================
+# W jednym interwale jest albo eksport (wpływ do portfela), albo zakup (kompensacja
+# z portfela), więc saldo spełnia rekurencję p_t = max(0, p_{t-1} + z_t), gdzie
+# z = wpływ - koszt energii czynnej. Dla dowolnego salda początkowego p0 saldo
+# końcowe to p_T = S_T - min(-p0, min_t S_t), S = cumsum(z). Wystarczą więc dwie
+# liczby na rok, a nie kolejna pętla po interwałach.
+def statystyki_portfela(wplywy, koszty_energii):
+    # wplywy/koszty_energii: (liczba lat, liczba interwałów); zwraca (S_T, min_t S_t) per rok
+    S = np.cumsum(np.asarray(wplywy, dtype=np.float64) - np.asarray(koszty_energii, dtype=np.float64), axis=-1)
+    return S[..., -1], S.min(axis=-1)
+
+
+def portfel_koncowy(suma_z, minimum_s, portfel_poczatkowy):
+    return suma_z - np.minimum(-np.asarray(portfel_poczatkowy, dtype=np.float64), minimum_s)
+
+
+def portfele_miesieczne(wplywy, koszty_energii, poczatki, kody_miesiecy, wygasanie, portfel=None, koszyki=None,
+                        aktualny_kod=-1):
+    # Portfele wielu szeregów (wiersze) miesiąc po miesiącu w postaci zamkniętej (jak wyżej), z wygasaniem
+    # wpłat po `wygasanie` miesiącach: wpłaty miesiąca trafiają do koszyka, kompensacja zużywa najstarsze
+    # koszyki (jak pętla silnika). `portfel`, `koszyki` i `aktualny_kod` kontynuują poprzedni okres.
+    # Zwraca (kompensacja (wiersze, miesiące), saldo końcowe, suma wygasła, koszyki, kod ostatniego miesiąca).
+    n = len(wplywy)
+    narastajaco = np.cumsum(wplywy - koszty_energii, axis=1)
+    przed = np.hstack([np.zeros((n, 1)), narastajaco])[:, poczatki]
+    suma_z = np.hstack([przed[:, 1:], narastajaco[:, -1:]]) - przed
+    minimum = np.minimum.reduceat(narastajaco, poczatki, axis=1) - przed
+    wplywy_miesieczne = np.add.reduceat(wplywy, poczatki, axis=1)
+
+    portfel = np.zeros(n) if portfel is None else np.asarray(portfel, dtype=np.float64)
+    koszyki = np.zeros((n, wygasanie)) if koszyki is None else np.array(koszyki, dtype=np.float64)
+    wygasly = np.zeros(n)
+    kompensacja = np.empty((n, len(poczatki)))
+    for g, kod in enumerate(kody_miesiecy):
+        if wygasanie > 0 and kod >= 0:
+            if aktualny_kod >= 0:
+                for m in range(aktualny_kod + 1, min(kod, aktualny_kod + wygasanie) + 1):
+                    wygasa = np.minimum(koszyki[:, m % wygasanie], portfel)
+                    koszyki[:, m % wygasanie] = 0.0
+                    portfel = portfel - wygasa
+                    wygasly += wygasa
+            aktualny_kod = max(aktualny_kod, kod)
+        koniec = portfel_koncowy(suma_z[:, g], minimum[:, g], portfel)
+        kompensacja[:, g] = portfel + wplywy_miesieczne[:, g] - koniec
+        if wygasanie > 0 and aktualny_kod >= 0:
+            koszyki[:, aktualny_kod % wygasanie] += wplywy_miesieczne[:, g]
+            do_pokrycia = kompensacja[:, g].copy()
+            for m in range(aktualny_kod - wygasanie + 1, aktualny_kod + 1):
+                z_koszyka = np.minimum(koszyki[:, m % wygasanie], do_pokrycia)
+                koszyki[:, m % wygasanie] -= z_koszyka
+                do_pokrycia -= z_koszyka
+        portfel = koniec
+    return kompensacja, portfel, wygasly, koszyki, aktualny_kod
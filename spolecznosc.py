@@ -0,0 +1,280 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import silnik
+from pomiary import mierzony
+from dane import wczytaj_konsumpcje
+from kalkulator import (
+    REF_PRODUKCJA_WIATR_KWH_KW_ROK, ESS_RT_EFFICIENCY, DOMYSLNE_PARAMETRY, oblicz_finansowanie, podsumuj_rok,
+    dane_z_taryfa, zasady_taryfy, produkcja_wiatrowa_dla_danych, rozdzielczosc_danych, limity_ess, czas_wiatru,
+    wczytaj_dane
+)
+from cli import FORMATY_WYJSCIA, wczytaj_scenariusze, zapisz_wyniki
+from taryfy import TARYFY_WBUDOWANE
+from wyceny import dopasuj_konsumpcje, pliki_klientow
+
+# =========================================================================
+# --- SPOŁECZNOŚĆ ENERGETYCZNA (WIELU PROSUMENTÓW ZA JEDNYM PRZYŁĄCZEM) ---
+# =========================================================================
+# python spolecznosc.py czlonkowie/ --dane-wspolne dane_zuzycia.csv --klucze klucze.csv -o raport.csv
+#
+# Wspólna instalacja PV, turbina i magazyn: parametry (moce, koszty) dotyczą całej społeczności,
+# a klucze podziału przydzielają członkom produkcję PV i wiatru oraz koszty urządzeń.
+# Bilans w interwale:
+#  1. członek zużywa najpierw przydzieloną mu produkcję PV, potem wiatru (jak w run_simulation),
+#  2. nadwyżki członków pokrywają niedobory pozostałych (energia płynie za przyłączem), resztą
+#     ładowany jest wspólny magazyn, a niedobór pokrywany z magazynu - zachłanna reguła silnika
+#     liczona na sumach społeczności,
+#  3. reszta nadwyżki i niedoboru to wymiana z siecią, dzielona między członków proporcjonalnie
+#     do ich nadwyżek i niedoborów.
+# Każdy członek ma własny portfel net-billingu. Energia przekazana wewnątrz społeczności nie jest
+# rozliczana między członkami; koszt inwestycji po dotacjach i uldze dzielony jest kluczami PV,
+# wiatru i ESS w proporcji do kosztów tych urządzeń.
+# Pętla po czasie działa tylko na sumach społeczności (silnik), a członkowie liczeni są paczkami
+# macierzy członkowie × interwały. Portfele rozliczane są miesiąc po miesiącu w postaci zamkniętej
+# (jak silnik.statystyki_portfela), przy wygasaniu portfela z koszykami wpłat jak w silniku.
+
+# Członkowie liczeni paczkami: kilka tablic paczka × interwały (float64)
+ROZMIAR_PACZKI_CZLONKOW = 32
+KLUCZE_PODZIALU = ('pv', 'wiatr', 'ess')
+
+
+def klucz_podzialu(klucz, liczba_czlonkow, domyslny, nazwa):
+    # Wagi członków znormalizowane do sumy 1; None = `domyslny`
+    wagi = np.asarray(domyslny if klucz is None else klucz, dtype=np.float64).reshape(-1)
+    if len(wagi) != liczba_czlonkow:
+        raise ValueError(f"❌ Klucz podziału {nazwa} ma {len(wagi)} pozycji, a społeczność {liczba_czlonkow} członków.")
+    if not np.isfinite(wagi).all() or (wagi < 0).any() or wagi.sum() <= 0:
+        raise ValueError(f"❌ Klucz podziału {nazwa} musi mieć nieujemne wagi o dodatniej sumie.")
+    return wagi / wagi.sum()
+
+
+def _bilans_czlonkow(konsumpcja, klucz_pv, klucz_wiatru, produkcja_pv, produkcja_wiatr):
+    # Autokonsumpcja przydzielonej produkcji w paczce członków; tablice (członkowie, interwały):
+    # (autokonsumpcja PV, autokonsumpcja wiatru, nadwyżka, niedobór)
+    pv = klucz_pv[:, None] * produkcja_pv
+    wiatr = klucz_wiatru[:, None] * produkcja_wiatr
+    ac_pv = np.minimum(pv, konsumpcja)
+    pozostala = konsumpcja - ac_pv
+    ac_wiatr = np.minimum(wiatr, pozostala)
+    return ac_pv, ac_wiatr, (pv - ac_pv) + (wiatr - ac_wiatr), pozostala - ac_wiatr
+
+
+def _udzial(czesc, calosc):
+    return np.divide(czesc, calosc, out=np.zeros_like(calosc), where=calosc > 0)
+
+
+@mierzony('symuluj_spolecznosc')
+def symuluj_spolecznosc(df_dane, konsumpcje, parametry, klucz_pv=None, klucz_wiatru=None, klucz_ess=None,
+                        nazwy=None, profil_wiatru=None, taryfa=None, uzyj_jit=True):
+    # `df_dane` - kalendarz, ceny i uzysk PV (surowy DataFrame lub DaneWejsciowe, jego profil zużycia nie
+    # jest używany), `konsumpcje` - macierz (członkowie, interwały) na kalendarzu `df_dane` albo DataFrame
+    # z kolumną na członka, `parametry` - słownik PARAMETRY_SYMULACJI całej społeczności, klucze podziału -
+    # wagi członków (None = proporcjonalnie do rocznego zużycia), `taryfa` jak w run_simulation.
+    # Wynik: {'czlonkowie': wiersz na członka, 'spolecznosc': wyniki roczne całości,
+    #         'rachunki_miesieczne': członkowie × miesiące, 'czas_calkowity_s': ...}
+    start = time.perf_counter()
+    p = parametry
+    dane, klucz, skompilowana = dane_z_taryfa(df_dane, taryfa)
+    zasady, wygasanie_portfela = zasady_taryfy(skompilowana)
+
+    if isinstance(konsumpcje, pd.DataFrame):
+        nazwy = list(konsumpcje.columns) if nazwy is None else nazwy
+        konsumpcje = konsumpcje.to_numpy(dtype=np.float64).T
+    konsumpcje = np.atleast_2d(np.asarray(konsumpcje, dtype=np.float64))
+    N, T = konsumpcje.shape
+    if N == 0 or T != len(dane):
+        raise ValueError(f"❌ Profile zużycia członków muszą mieć kształt (liczba członków, {len(dane)} interwałów), "
+                         f"otrzymano {konsumpcje.shape}.")
+    if not np.isfinite(konsumpcje).all():
+        raise ValueError("❌ Profile zużycia członków zawierają braki lub wartości nieskończone.")
+    nazwy = [f"Członek {i + 1}" for i in range(N)] if nazwy is None else [str(nazwa) for nazwa in nazwy]
+    if len(nazwy) != N:
+        raise ValueError(f"❌ Podano {len(nazwy)} nazw dla {N} członków.")
+
+    zuzycie = konsumpcje.sum(axis=1)
+    domyslny = zuzycie if zuzycie.sum() > 0 else np.ones(N)
+    k_pv, k_wiatr, k_ess = (klucz_podzialu(k, N, domyslny, nazwa) for k, nazwa in
+                            ((klucz_pv, 'PV'), (klucz_wiatru, 'wiatru'), (klucz_ess, 'ESS')))
+
+    rozdz = rozdzielczosc_danych(dane, klucz)
+    limit_ladowania, limit_rozladowania, skala_limitow = limity_ess(
+        rozdz, p['ess_moc_ladowania_kw'], p['ess_moc_rozladowania_kw'])
+    produkcja_pv = p['moc_pv_kwp'] * dane.produkcja_pv_1kwp
+    produkcja_wiatr = np.zeros(T)
+    if p['moc_turbina_kw'] > 0:
+        produkcja_wiatr = produkcja_wiatrowa_dla_danych(
+            dane, p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0),
+            profil_wiatru, czas_wiatru(rozdz))
+    paczki = [slice(od, min(od + ROZMIAR_PACZKI_CZLONKOW, N)) for od in range(0, N, ROZMIAR_PACZKI_CZLONKOW)]
+
+    # 1. Nadwyżki i niedobory członków po autokonsumpcji przydzielonej produkcji - sumy społeczności
+    nadwyzka_suma = np.zeros(T)
+    niedobor_suma = np.zeros(T)
+    for paczka in paczki:
+        _, _, nadwyzka, niedobor = _bilans_czlonkow(konsumpcje[paczka], k_pv[paczka], k_wiatr[paczka],
+                                                    produkcja_pv, produkcja_wiatr)
+        nadwyzka_suma += nadwyzka.sum(axis=0)
+        niedobor_suma += niedobor.sum(axis=0)
+
+    # 2. Wspólny magazyn na sumach społeczności; autokonsumpcja silnika to energia przekazana między członkami
+    wspolny = silnik.symuluj_bilans(
+        nadwyzka_suma, np.zeros(T), niedobor_suma, dane.cena_eksportu, dane.cena_energii, dane.koszt_dystrybucji,
+        dane.kod_miesiaca, 1.0, p['ess_pojemnosc_kwh'], limit_ladowania, limit_rozladowania, ESS_RT_EFFICIENCY,
+        uzyj_jit=uzyj_jit, skala_limitow=skala_limitow)['interwaly']
+    udzial_eksportu = _udzial(wspolny['Sprzedaz_Siec_KWh'], nadwyzka_suma)
+    udzial_zakupu = _udzial(wspolny['Zakup_Siec_KWh'], niedobor_suma)
+    udzial_ze_spolecznosci = _udzial(wspolny['AC_PV_KWh'] + wspolny['AC_ESS_KWh'], niedobor_suma)
+
+    # 3. Wymiana z siecią i portfele członków
+    poczatki, kody_miesiecy = silnik.poczatki_miesiecy(dane.kod_miesiaca)
+    cena_sprzedazy = np.maximum(dane.cena_eksportu, 0.0)
+    sumy = np.zeros((N, silnik.LICZBA_SUM))
+    zakup_suma = np.zeros(N)
+    rachunki = np.zeros((N, len(poczatki)))
+    koszt_bez_pv = np.zeros(N)
+    for paczka in paczki:
+        kons = konsumpcje[paczka]
+        ac_pv, ac_wiatr, nadwyzka, niedobor = _bilans_czlonkow(kons, k_pv[paczka], k_wiatr[paczka],
+                                                               produkcja_pv, produkcja_wiatr)
+        eksport = nadwyzka * udzial_eksportu
+        zakup = niedobor * udzial_zakupu
+        wplywy = eksport * cena_sprzedazy
+        koszty = zakup * dane.cena_energii
+        dystrybucja = zakup * dane.koszt_dystrybucji
+        kompensacja, portfel, wygasly = silnik.portfele_miesieczne(wplywy, koszty, poczatki, kody_miesiecy,
+                                                                   wygasanie_portfela)[:3]
+
+        s = sumy[paczka]
+        s[:, silnik.S_PRODUKCJA_PV] = k_pv[paczka] * produkcja_pv.sum()
+        s[:, silnik.S_PRODUKCJA_WIATR] = k_wiatr[paczka] * produkcja_wiatr.sum()
+        s[:, silnik.S_AC_PV] = ac_pv.sum(axis=1)
+        s[:, silnik.S_AC_WIATR] = ac_wiatr.sum(axis=1)
+        s[:, silnik.S_AC_ESS] = (niedobor * udzial_ze_spolecznosci).sum(axis=1)
+        s[:, silnik.S_WYSLANA_DO_SIECI] = eksport.sum(axis=1)
+        s[:, silnik.S_DYSTRYBUCJA] = dystrybucja.sum(axis=1)
+        s[:, silnik.S_KOMPENSACJA] = kompensacja.sum(axis=1)
+        s[:, silnik.S_ENERGIA_DO_ZAPLATY] = koszty.sum(axis=1) - s[:, silnik.S_KOMPENSACJA]
+        s[:, silnik.S_PORTFEL] = portfel
+        s[:, silnik.S_PORTFEL_WYGASLY] = wygasly
+        zakup_suma[paczka] = zakup.sum(axis=1)
+        rachunki[paczka] = (np.add.reduceat(dystrybucja, poczatki, axis=1)
+                            + np.add.reduceat(koszty, poczatki, axis=1) - kompensacja)
+        koszt_bez_pv[paczka] = kons @ (dane.cena_energii + dane.koszt_dystrybucji)
+
+    # 4. Wyniki: koszt inwestycji członka wg kluczy ważonych kosztami urządzeń
+    finansowanie = oblicz_finansowanie(
+        p['koszt_pv_total'], p['moc_turbina_kw'], p['koszt_turbiny_wiatrowej'], p['ess_pojemnosc_kwh'],
+        p['cena_magazynu_total'], p['korzysta_z_dotacji'], p['korzysta_z_ulgi_termomodernizacyjnej'],
+        p['stawka_podatkowa_procent']
+    )
+    koszty_urzadzen = (p['koszt_pv_total'], p['koszt_turbiny_wiatrowej'] if p['moc_turbina_kw'] > 0 else 0.0,
+                       p['cena_magazynu_total'] if p['ess_pojemnosc_kwh'] > 0 else 0.0)
+    udzial_kosztow = sum(k * koszt for k, koszt in zip((k_pv, k_wiatr, k_ess), koszty_urzadzen))
+    udzial_kosztow = udzial_kosztow / sum(koszty_urzadzen) if sum(koszty_urzadzen) > 0 else k_pv
+
+    wiersze = [podsumuj_rok(sumy[i], zuzycie[i], koszt_bez_pv[i],
+                            {nazwa: wartosc * udzial_kosztow[i] for nazwa, wartosc in finansowanie.items()}, **zasady)
+               for i in range(N)]
+    czlonkowie = pd.DataFrame({
+        'Członek': nazwy,
+        'Klucz PV': k_pv,
+        'Klucz wiatru': k_wiatr,
+        'Klucz ESS': k_ess,
+        'Zużycie [kWh]': zuzycie,
+        'Energia ze społeczności [kWh]': sumy[:, silnik.S_AC_ESS],
+        'Eksport [kWh]': sumy[:, silnik.S_WYSLANA_DO_SIECI],
+        'Zakup [kWh]': zakup_suma,
+        'Rachunek bez instalacji': koszt_bez_pv + zasady['oplaty_stale'],
+    })
+    # Samo-zużycie członka nie jest określone - zużywa też energię innych członków
+    czlonkowie = pd.concat([czlonkowie, pd.DataFrame(wiersze).drop(columns='Procent samo-zużycia')], axis=1)
+
+    sumy_spolecznosci = sumy.sum(axis=0)
+    sumy_spolecznosci[silnik.S_SOC] = wspolny['ESS_SoC_KWh'][-1]
+    spolecznosc = podsumuj_rok(sumy_spolecznosci, float(zuzycie.sum()), float(koszt_bez_pv.sum()), finansowanie,
+                               **{**zasady, 'oplaty_stale': zasady['oplaty_stale'] * N})
+    miesiace = [str(pd.Period(year=kod // 12, month=kod % 12 + 1, freq='M')) if kod >= 0 else 'bez daty'
+                for kod in kody_miesiecy]
+    return {
+        'czlonkowie': czlonkowie,
+        'spolecznosc': spolecznosc,
+        'rachunki_miesieczne': pd.DataFrame(rachunki, index=pd.Index(nazwy, name='Członek'), columns=miesiace),
+        'czas_calkowity_s': time.perf_counter() - start,
+    }
+
+
+def konsumpcje_z_plikow(pliki, dane):
+    # Profile zużycia członków (pliki w układzie dane_zuzycia.csv) na kalendarzu `dane`:
+    # (nazwy, macierz (członkowie, interwały), odsetek kalendarza pokryty danymi członka)
+    konsumpcje = np.zeros((len(pliki), len(dane)))
+    pokrycie = np.zeros(len(pliki))
+    for i, sciezka in enumerate(pliki):
+        data, konsumpcja = wczytaj_konsumpcje(sciezka)
+        konsumpcje[i], pokrycie[i] = dopasuj_konsumpcje(dane.data, data, konsumpcja)
+    return [os.path.splitext(os.path.basename(sciezka))[0] for sciezka in pliki], konsumpcje, pokrycie
+
+
+def wczytaj_klucze(sciezka, nazwy):
+    # Plik CSV: kolumna 'czlonek' (nazwa pliku członka bez rozszerzenia) i dowolne z kolumn KLUCZE_PODZIALU
+    klucze = pd.read_csv(sciezka, sep=None, engine='python', encoding='utf-8-sig')
+    klucze.columns = [str(c).strip().lower() for c in klucze.columns]
+    if 'czlonek' not in klucze.columns:
+        raise ValueError(f"❌ Plik kluczy '{sciezka}' musi mieć kolumnę 'czlonek'.")
+    klucze = klucze.set_index(klucze['czlonek'].astype(str))
+    brakujacy = [nazwa for nazwa in nazwy if nazwa not in klucze.index]
+    if brakujacy:
+        raise ValueError(f"❌ Brak kluczy podziału dla członków: {brakujacy}.")
+    return {k: pd.to_numeric(klucze.loc[nazwy, k]).to_numpy(dtype=np.float64) if k in klucze.columns else None
+            for k in KLUCZE_PODZIALU}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Społeczność energetyczna: wielu prosumentów ze wspólną instalacją i magazynem.")
+    parser.add_argument('czlonkowie', nargs='+', help="pliki .csv członków (profil zużycia) lub katalogi z plikami .csv")
+    parser.add_argument('--dane-wspolne', required=True, help="plik z kalendarzem, cenami i uzyskiem PV")
+    parser.add_argument('--parametry', help="plik .json lub .csv z jednym scenariuszem dla całej społeczności "
+                                            "(domyślnie ustawienia domyślne)")
+    parser.add_argument('--klucze', help="plik .csv kluczy podziału: kolumna 'czlonek' i kolumny "
+                                         + ', '.join(KLUCZE_PODZIALU) + " (domyślnie wg rocznego zużycia)")
+    parser.add_argument('--taryfa', help="taryfa i zasady net-billingu: " + ', '.join(TARYFY_WBUDOWANE)
+                        + " albo plik .json/.yaml (domyślnie ceny z pliku danych)")
+    parser.add_argument('-o', '--wyjscie', default='-', help="plik raportu; '-' = standardowe wyjście (domyślnie)")
+    parser.add_argument('--format', choices=FORMATY_WYJSCIA, help="format raportu (domyślnie z rozszerzenia pliku, inaczej csv)")
+    parser.add_argument('--bez-jit', action='store_true', help="nie kompiluj pętli bilansu numbą")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        parametry = dict(DOMYSLNE_PARAMETRY)
+        if args.parametry:
+            scenariusze = wczytaj_scenariusze(args.parametry)
+            if len(scenariusze) != 1:
+                raise ValueError(f"❌ Plik parametrów '{args.parametry}' musi zawierać dokładnie jeden scenariusz.")
+            parametry.update(scenariusze.drop(columns='nazwa', errors='ignore').iloc[0].to_dict())
+        dane = wczytaj_dane(args.dane_wspolne)
+        nazwy, konsumpcje, pokrycie = konsumpcje_z_plikow(pliki_klientow(args.czlonkowie), dane)
+        klucze = wczytaj_klucze(args.klucze, nazwy) if args.klucze else {}
+        wynik = symuluj_spolecznosc(dane, konsumpcje, parametry, klucze.get('pv'), klucze.get('wiatr'),
+                                    klucze.get('ess'), nazwy, taryfa=args.taryfa, uzyj_jit=not args.bez_jit)
+        raport = wynik['czlonkowie']
+        raport.insert(1, 'Pokrycie danych [%]', pokrycie * 100)
+        raport = pd.concat([raport, pd.DataFrame([{'Członek': 'Społeczność', **wynik['spolecznosc']}])],
+                           ignore_index=True)
+        zapisz_wyniki(raport, args.wyjscie, args.format)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(f"Członków: {len(nazwy)}, czas: {time.perf_counter() - start:.2f} s"
+          + (f" -> {args.wyjscie}" if args.wyjscie != '-' else ''), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import numpy as np
+
+import silnik
+from taryfy import UDZIAL_ZWROTU_PORTFELA_DOMYSLNY
+
+# =========================================================================
+# --- STRATEGIE PRACY MAGAZYNU ENERGII (ESS) ---
+# =========================================================================
+# Strategia to funkcja:
+#   strategia(dane, produkcja_pv, produkcja_wiatr, ess_pojemnosc_kwh, ess_soc_poczatek_kwh,
+#             limit_ladowania_kwh, limit_rozladowania_kwh, sprawnosc,
+#             udzial_zwrotu_portfela=..., wygasanie_portfela_miesiace=0, skala_limitow=None) -> plan albo None
+# gdzie `dane` to DaneWejsciowe (z cenami wybranej taryfy), zasady portfela pochodzą z taryfy
+# (kalkulator.zasady_taryfy), limity dotyczą kroku nominalnego, `skala_limitow` to mnożnik
+# limitów per interwał dla danych o zmiennym kroku (jak w silniku; None = stały krok), a plan
+# to przepływ ESS po stronie AC na interwał [kWh] (> 0 ładowanie, < 0 rozładowanie),
+# wykonywany przez silnik.symuluj_bilans(plan_ess=...).
+# None oznacza zachłanną autokonsumpcję wbudowaną w pętlę silnika (zachowanie dotychczasowe).
+#
+# Arbitraż dobowy: programowanie dynamiczne po dyskretnych poziomach SoC, doba po dobie,
+# z horyzontem dziś + jutro (ceny na dzień następny są znane) i zatwierdzaniem tylko
+# bieżącej doby; przyjmuje idealną prognozę zużycia i produkcji. Koszt interwału: zakup po
+# (dystrybucja + w * cena energii), eksport po w * max(cena eksportu, 0), gdzie w to wartość
+# złotówki w portfelu net-billingu: 1, gdy portfel jest przejadany w ciągu roku, albo udział
+# zwrotu nadwyżki z taryfy, gdy (wg przebiegu zachłannego z wygasaniem portfela taryfy) zostaje
+# w nim nadwyżka lub część środków wygasa - jak wypłata w kalkulator.podsumuj_rok.
+# Właściwe rozliczenie portfela robi potem silnik, tak samo jak dla reguły zachłannej.
+
+# Siatka SoC: co najmniej KROKI_NA_LIMIT kroków w limicie mocy na interwał
+# (zgrubna siatka marnuje małe nadwyżki i niedobory), w granicach MIN..MAX poziomów
+KROKI_NA_LIMIT = 16
+MIN_POZIOMOW_SOC = 41
+MAX_POZIOMOW_SOC = 401
+HORYZONT_DNI = 2
+
+
+def autokonsumpcja(dane, produkcja_pv, produkcja_wiatr, ess_pojemnosc_kwh, ess_soc_poczatek_kwh,
+                   limit_ladowania_kwh, limit_rozladowania_kwh, sprawnosc,
+                   udzial_zwrotu_portfela=UDZIAL_ZWROTU_PORTFELA_DOMYSLNY, wygasanie_portfela_miesiace=0,
+                   skala_limitow=None):
+    # Ładowanie z nadwyżki, rozładowanie przy niedoborze - reguła z pętli silnika
+    return None
+
+
+def _kolejnosc_ruchow(w_gore, w_dol):
+    # 0, +1, -1, +2, -2, ... - przy równym koszcie wygrywa mniejszy ruch (brak zbędnych cykli)
+    ruchy = [0]
+    for m in range(1, max(w_gore, w_dol) + 1):
+        if m <= w_gore:
+            ruchy.append(m)
+        if m <= w_dol:
+            ruchy.append(-m)
+    return np.array(ruchy, dtype=np.int64)
+
+
+def _dp_okna(netto, kupno, sprzedaz, poziom, liczba_poziomow, krok_kwh, ruchy, w_gore, w_dol, sprawnosc, zatwierdz,
+             plan):
+    # Wstecz: minimalny koszt od interwału t do końca okna dla każdego poziomu SoC;
+    # naprzód: decyzje dla pierwszych `zatwierdz` interwałów od poziomu `poziom`.
+    # `w_gore` / `w_dol` - największy ruch (w krokach SoC) w interwale t
+    H = len(netto)
+    N = liczba_poziomow
+    R = len(ruchy)
+    przeplyw = np.empty(R)
+    for r in range(R):
+        przeplyw[r] = ruchy[r] * krok_kwh / sprawnosc if ruchy[r] > 0 else ruchy[r] * krok_kwh
+    koszt_ruchu = np.empty(R)
+    dozwolony = np.empty(R, dtype=np.bool_)
+    V = np.zeros(N)
+    V_nowe = np.zeros(N)
+    decyzje = np.zeros((H, N), dtype=np.int64)
+    for t in range(H - 1, -1, -1):
+        # Koszt sieci zależy tylko od ruchu, nie od poziomu wyjściowego
+        for r in range(R):
+            siec = netto[t] + przeplyw[r]
+            koszt_ruchu[r] = siec * kupno[t] if siec > 0 else siec * sprzedaz[t]
+            dozwolony[r] = -w_dol[t] <= ruchy[r] <= w_gore[t]
+        for j in range(N):
+            najlepszy = np.inf
+            najlepszy_ruch = 0
+            for r in range(R):
+                cel = j + ruchy[r]
+                if cel < 0 or cel >= N or not dozwolony[r]:
+                    continue
+                koszt = koszt_ruchu[r] + V[cel]
+                if koszt < najlepszy:
+                    najlepszy = koszt
+                    najlepszy_ruch = ruchy[r]
+            V_nowe[j] = najlepszy
+            decyzje[t, j] = najlepszy_ruch
+        V, V_nowe = V_nowe, V
+    for t in range(zatwierdz):
+        m = decyzje[t, poziom]
+        plan[t] = m * krok_kwh / sprawnosc if m > 0 else m * krok_kwh
+        poziom += m
+    return poziom
+
+
+_dp_okna_jit = silnik.njit(cache=True, nogil=True)(_dp_okna) if silnik.njit is not None else None
+
+
+def _dp_okna_numpy(netto, kupno, sprzedaz, poziom, liczba_poziomow, krok_kwh, ruchy, w_gore, w_dol, sprawnosc,
+                   zatwierdz, plan):
+    # Ta sama rekurencja co _dp_okna, wektorowo po poziomach SoC (bez numby)
+    N = liczba_poziomow
+    przeplyw = np.where(ruchy > 0, ruchy * krok_kwh / sprawnosc, ruchy * krok_kwh)
+    cel = np.arange(N)[:, None] + ruchy[None, :]
+    niedozwolone = (cel < 0) | (cel >= N)
+    cel = np.clip(cel, 0, N - 1)
+    decyzje = np.zeros((len(netto), N), dtype=np.int64)
+    V = np.zeros(N)
+    for t in range(len(netto) - 1, -1, -1):
+        siec = netto[t] + przeplyw
+        koszt = np.where(siec > 0, siec * kupno[t], siec * sprzedaz[t])[None, :] + V[cel]
+        koszt[niedozwolone | ((ruchy > w_gore[t]) | (ruchy < -w_dol[t]))[None, :]] = np.inf
+        wybor = koszt.argmin(axis=1)
+        decyzje[t] = ruchy[wybor]
+        V = koszt[np.arange(N), wybor]
+    for t in range(zatwierdz):
+        m = decyzje[t, poziom]
+        plan[t] = m * krok_kwh / sprawnosc if m > 0 else m * krok_kwh
+        poziom += m
+    return poziom
+
+
+def arbitraz_dobowy(dane, produkcja_pv, produkcja_wiatr, ess_pojemnosc_kwh, ess_soc_poczatek_kwh,
+                    limit_ladowania_kwh, limit_rozladowania_kwh, sprawnosc,
+                    udzial_zwrotu_portfela=UDZIAL_ZWROTU_PORTFELA_DOMYSLNY, wygasanie_portfela_miesiace=0,
+                    skala_limitow=None, liczba_poziomow=None, horyzont_dni=HORYZONT_DNI, wartosc_portfela=None,
+                    uzyj_jit=True):
+    if ess_pojemnosc_kwh <= 0 or min(limit_ladowania_kwh, limit_rozladowania_kwh) <= 0:
+        return None
+    n = len(dane)
+    if wartosc_portfela is None:
+        zachlanny = silnik.symuluj_bilans(
+            produkcja_pv, produkcja_wiatr, dane.konsumpcja, dane.cena_eksportu, dane.cena_energii,
+            dane.koszt_dystrybucji, dane.kod_miesiaca, 1.0, ess_pojemnosc_kwh, limit_ladowania_kwh,
+            limit_rozladowania_kwh, sprawnosc, ess_soc_poczatek_kwh, uzyj_jit=uzyj_jit,
+            wygasanie_portfela_miesiace=wygasanie_portfela_miesiace, skala_limitow=skala_limitow
+        )
+        nadwyzka = zachlanny['sumy'][silnik.S_PORTFEL] + zachlanny['sumy'][silnik.S_PORTFEL_WYGASLY]
+        wartosc_portfela = udzial_zwrotu_portfela if nadwyzka > 0 else 1.0
+    netto = dane.konsumpcja - produkcja_pv - produkcja_wiatr
+    kupno = dane.koszt_dystrybucji + wartosc_portfela * dane.cena_energii
+    sprzedaz = wartosc_portfela * np.maximum(dane.cena_eksportu, 0.0)
+
+    if liczba_poziomow is None:
+        liczba_poziomow = int(np.ceil(ess_pojemnosc_kwh / min(limit_ladowania_kwh, limit_rozladowania_kwh)
+                                      * KROKI_NA_LIMIT)) + 1
+        liczba_poziomow = min(max(liczba_poziomow, MIN_POZIOMOW_SOC), MAX_POZIOMOW_SOC)
+    krok_kwh = ess_pojemnosc_kwh / (liczba_poziomow - 1)
+    # Największy ruch SoC na interwał; przy zmiennym kroku limity skalowane jak w silniku
+    skala = np.ones(n) if skala_limitow is None else np.asarray(skala_limitow, dtype=np.float64)
+    w_gore = (limit_ladowania_kwh * skala / krok_kwh + 1e-9).astype(np.int64)
+    w_dol = (limit_rozladowania_kwh * skala / krok_kwh + 1e-9).astype(np.int64)
+    ruchy = _kolejnosc_ruchow(int(w_gore.max(initial=0)), int(w_dol.max(initial=0)))
+
+    dzien = np.asarray(dane.data, dtype='datetime64[D]')
+    poczatki = np.flatnonzero(np.r_[True, dzien[1:] != dzien[:-1]])
+    granice = np.r_[poczatki, n]
+
+    dp = _dp_okna_jit if uzyj_jit and _dp_okna_jit is not None else _dp_okna_numpy
+    plan = np.zeros(n)
+    poziom = int(round(ess_soc_poczatek_kwh / krok_kwh))
+    for d in range(len(poczatki)):
+        od, do_dnia = granice[d], granice[d + 1]
+        do_okna = granice[min(d + horyzont_dni, len(poczatki))]
+        poziom = dp(netto[od:do_okna], kupno[od:do_okna], sprzedaz[od:do_okna], poziom, liczba_poziomow,
+                    krok_kwh, ruchy, w_gore[od:do_okna], w_dol[od:do_okna], float(sprawnosc), do_dnia - od,
+                    plan[od:do_dnia])
+    return plan
+
+
+STRATEGIE_ESS = {
+    'autokonsumpcja': autokonsumpcja,
+    'arbitraz_dobowy': arbitraz_dobowy,
+}
+OPISY_STRATEGII_ESS = {
+    'autokonsumpcja': 'Autokonsumpcja (ładowanie z nadwyżki)',
+    'arbitraz_dobowy': 'Arbitraż cenowy (plan dobowy)',
+}
+
+
+def wybierz_strategie(strategia):
+    # Nazwa z STRATEGIE_ESS albo własna funkcja o sygnaturze strategii
+    if callable(strategia):
+        return strategia
+    if strategia not in STRATEGIE_ESS:
+        raise ValueError(f"Nieznana strategia pracy magazynu '{strategia}', dostępne: {list(STRATEGIE_ESS)}")
+    return STRATEGIE_ESS[strategia]
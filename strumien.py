@@ -0,0 +1,215 @@
+import argparse
+import calendar
+import sys
+
+import numpy as np
+import pandas as pd
+
+import silnik
+from dane import (
+    COL_CENA_EKSPORTU, COL_PRODUKCJA_PV_1KWP, COL_KONSUMPCJA, COL_CENA_ENERGII, COL_KOSZT_DYSTRYBUCJI,
+    REQUIRED_COLS, convert_to_numeric, parsuj_daty, rozdzielczosc, kalendarz
+)
+from kalkulator import (
+    REF_PRODUKCJA_WIATR_KWH_KW_ROK, ESS_RT_EFFICIENCY, PROFIL_WIATR_12X24, oblicz_finansowanie, podsumuj_rok,
+    raport_miesieczny
+)
+from taryfy import UDZIAL_ZWROTU_PORTFELA_DOMYSLNY
+
+# =========================================================================
+# --- SYMULACJA STRUMIENIOWA (WIELOLETNIE DANE Z LICZNIKA, FRAGMENTAMI) ---
+# =========================================================================
+# Plik CSV czytany jest fragmentami po `rozmiar_fragmentu` wierszy, więc zużycie pamięci
+# zależy od rozmiaru fragmentu, a nie pliku. Stan symulacji (SoC, portfel, sumy i bieżący
+# miesiąc) przechodzi między fragmentami przez silnik.symuluj_bilans(stan=...). Lata
+# rozliczeniowe to kolejne 12 miesięcy od miesiąca pierwszej daty; na koniec roku część portfela
+# (taryfy.UDZIAL_ZWROTU_PORTFELA_DOMYSLNY) jest wypłacana, a reszta (z SoC magazynu) przechodzi
+# na kolejny rok.
+#
+# Różnice względem wczytaj_dane: braki cen uzupełniane są średnią z dotychczas
+# wczytanych wierszy (średnia z całego pliku nie jest znana przed jego końcem),
+# a wiersze muszą być w kolejności chronologicznej.
+
+ROZMIAR_FRAGMENTU = 200_000
+_KOLUMNY_CEN = (COL_CENA_EKSPORTU, COL_CENA_ENERGII, COL_KOSZT_DYSTRYBUCJI)
+
+
+def czytaj_fragmenty(sciezka, rozmiar_fragmentu=ROZMIAR_FRAGMENTU):
+    # Generator oczyszczonych fragmentów (słowniki tablic jak pola DaneWejsciowe), bez wierszy bez daty
+    srednie = {kol: [0.0, 0] for kol in _KOLUMNY_CEN}   # suma i liczba dotychczasowych wartości
+    pierwszy = True
+    for df in pd.read_csv(sciezka, delimiter=';', encoding='utf-8-sig', chunksize=rozmiar_fragmentu):
+        if 'Data' not in df.columns and len(df.columns) > 0:
+            df = df.rename(columns={df.columns[0]: 'Data'})
+        if pierwszy:
+            missing_cols = [c for c in REQUIRED_COLS if c not in df.columns]
+            if missing_cols:
+                raise ValueError(f"❌ BŁĄD KOLUMN: Nie znaleziono kluczowych nagłówków: {missing_cols}. Sprawdź, czy są poprawnie nazwane w pliku CSV.")
+            pierwszy = False
+
+        try:
+            data = parsuj_daty(df['Data'])
+        except Exception as e:
+            raise ValueError(f"❌ BŁĄD: Problem z konwersją kolumny 'Data' lub wyciąganiem czasu. {e}") from e
+
+        z_data = data.notna().to_numpy()
+        if not z_data.any():
+            continue
+        data = data[z_data].to_numpy(dtype='datetime64[ns]')
+        miesiac, godzina, kod_miesiaca = kalendarz(data)
+        fragment = {
+            'data': data,
+            'miesiac': miesiac,
+            'godzina': godzina,
+            'kod_miesiaca': kod_miesiaca,
+            'konsumpcja': convert_to_numeric(df[COL_KONSUMPCJA])[z_data].fillna(0).to_numpy(dtype=np.float64),
+            'produkcja_pv_1kwp': convert_to_numeric(df[COL_PRODUKCJA_PV_1KWP])[z_data].fillna(0).to_numpy(dtype=np.float64),
+        }
+        for kol, pole in zip(_KOLUMNY_CEN, ('cena_eksportu', 'cena_energii', 'koszt_dystrybucji')):
+            wartosci = convert_to_numeric(df[kol])[z_data]
+            suma_liczba = srednie[kol]
+            suma_liczba[0] += float(wartosci.sum())
+            suma_liczba[1] += int(wartosci.notna().sum())
+            srednia = suma_liczba[0] / suma_liczba[1] if suma_liczba[1] else 0.0
+            fragment[pole] = wartosci.fillna(srednia).to_numpy(dtype=np.float64)
+        yield fragment
+
+
+def wykryj_interwal_h(data):
+    # Krok pomiarowy [h] - najczęstszy odstęp między kolejnymi znacznikami czasu (jak dane.rozdzielczosc)
+    roznice = np.diff(np.asarray(data, dtype='datetime64[ns]').astype(np.int64))
+    if not (roznice > 0).any():
+        raise ValueError("❌ BŁĄD: Nie można ustalić kroku pomiarowego - za mało różnych znaczników czasu.")
+    return rozdzielczosc(data).interwal_h
+
+
+def _normalizacja_wiatru(profil, kod_poczatku_roku, interwal_h):
+    # Suma profilu 12x24 po wszystkich interwałach pełnego roku rozliczeniowego (jak w ksztalt_wiatru,
+    # ale liczona z kalendarza, bo rok nie jest jeszcze w całości wczytany)
+    suma = 0.0
+    for kod in range(kod_poczatku_roku, kod_poczatku_roku + 12):
+        rok, miesiac = kod // 12, kod % 12 + 1
+        suma += calendar.monthrange(rok, miesiac)[1] * profil[miesiac - 1].sum() / interwal_h
+    return suma
+
+
+def symuluj_strumieniowo(sciezka, parametry, rozmiar_fragmentu=ROZMIAR_FRAGMENTU, przenos_portfela=True,
+                         profil_wiatru=None, interwal_h=None, uzyj_jit=True):
+    # `parametry` - słownik z kluczami kalkulator.PARAMETRY_SYMULACJI; `profil_wiatru` - macierz 12x24.
+    # Zwraca {'lata': DataFrame (wiersz = rok rozliczeniowy, klucze wyniki_roczne), 'raport_miesieczny_dane',
+    # 'interwal_h'}.
+    p = parametry
+    finansowanie = oblicz_finansowanie(
+        p['koszt_pv_total'], p['moc_turbina_kw'], p['koszt_turbiny_wiatrowej'], p['ess_pojemnosc_kwh'],
+        p['cena_magazynu_total'], p['korzysta_z_dotacji'], p['korzysta_z_ulgi_termomodernizacyjnej'],
+        p['stawka_podatkowa_procent']
+    )
+    profil = PROFIL_WIATR_12X24 if profil_wiatru is None else np.asarray(profil_wiatru, dtype=np.float64)
+    if profil.shape != (12, 24):
+        raise ValueError("Symulacja strumieniowa obsługuje tylko profil wiatru w postaci macierzy 12x24")
+    produkcja_wiatr_roczna = p['moc_turbina_kw'] * REF_PRODUKCJA_WIATR_KWH_KW_ROK * (p['procent_pracy_turbiny'] / 100.0)
+
+    lata = []
+    miesiace = {}   # kod miesiąca -> wiersz macierzy miesięcznej silnika
+    stan = None
+    rok = None      # bieżący rok rozliczeniowy: numer i akumulatory spoza silnika
+    kod_startu = None
+
+    def zamknij_rok():
+        wyniki = podsumuj_rok(stan['sumy'], rok['konsumpcja'], rok['koszt_bez_pv'], finansowanie)
+        lata.append({'Rok rozliczeniowy': rok['numer'] + 1, 'Od': rok['od'], 'Do': rok['do'],
+                     'Liczba interwałów': rok['interwaly'], **wyniki,
+                     'Portfel na koniec roku': stan['sumy'][silnik.S_PORTFEL]})
+        nowe_sumy = np.zeros(silnik.LICZBA_SUM)
+        nowe_sumy[silnik.S_SOC] = stan['sumy'][silnik.S_SOC]
+        if przenos_portfela:
+            nowe_sumy[silnik.S_PORTFEL] = stan['sumy'][silnik.S_PORTFEL] * (1.0 - UDZIAL_ZWROTU_PORTFELA_DOMYSLNY)
+        return {**stan, 'sumy': nowe_sumy}
+
+    for fragment in czytaj_fragmenty(sciezka, rozmiar_fragmentu):
+        if interwal_h is None:
+            interwal_h = wykryj_interwal_h(fragment['data'])
+        if kod_startu is None:
+            kod_startu = int(fragment['kod_miesiaca'][0])
+        numer_roku = (fragment['kod_miesiaca'].astype(np.int64) - kod_startu) // 12
+
+        # Podział fragmentu na części należące do jednego roku rozliczeniowego
+        granice = np.flatnonzero(np.diff(numer_roku)) + 1
+        for od, do in zip(np.concatenate([[0], granice]), np.concatenate([granice, [len(numer_roku)]])):
+            numer = int(numer_roku[od])
+            if rok is None or rok['numer'] != numer:
+                if rok is not None:
+                    stan = zamknij_rok()
+                rok = {'numer': numer, 'od': fragment['data'][od], 'do': None, 'interwaly': 0,
+                       'konsumpcja': 0.0, 'koszt_bez_pv': 0.0,
+                       'norma_wiatru': _normalizacja_wiatru(profil, kod_startu + 12 * numer, interwal_h)}
+            czesc = {k: v[od:do] for k, v in fragment.items()}
+
+            produkcja_wiatr = (profil[czesc['miesiac'] - 1, czesc['godzina']] / rok['norma_wiatru']
+                               * produkcja_wiatr_roczna)
+            bilans = silnik.symuluj_bilans(
+                czesc['produkcja_pv_1kwp'], produkcja_wiatr, czesc['konsumpcja'],
+                czesc['cena_eksportu'], czesc['cena_energii'], czesc['koszt_dystrybucji'],
+                czesc['kod_miesiaca'], p['moc_pv_kwp'], p['ess_pojemnosc_kwh'],
+                p['ess_moc_ladowania_kw'] * interwal_h, p['ess_moc_rozladowania_kw'] * interwal_h,
+                ESS_RT_EFFICIENCY, uzyj_jit=uzyj_jit, stan=stan
+            )
+            stan = bilans['stan']
+            for kod, wiersz in zip(bilans['kody_miesiecy'].tolist(), bilans['miesiace']):
+                miesiace[kod] = wiersz
+
+            rok['do'] = czesc['data'][-1]
+            rok['interwaly'] += len(czesc['konsumpcja'])
+            rok['konsumpcja'] += float(czesc['konsumpcja'].sum())
+            rok['koszt_bez_pv'] += float((czesc['konsumpcja'] * (czesc['cena_energii'] + czesc['koszt_dystrybucji'])).sum())
+
+    if rok is None:
+        raise ValueError("❌ BŁĄD: Brak danych daty w pliku po konwersji.")
+    zamknij_rok()
+
+    kody = sorted(miesiace)
+    return {
+        'lata': pd.DataFrame(lata),
+        'raport_miesieczny_dane': raport_miesieczny(kody, [miesiace[k] for k in kody], p['moc_pv_kwp']),
+        'interwal_h': interwal_h,
+    }
+
+
+def main(argv=None):
+    # python strumien.py dane_wieloletnie.csv --scenariusze scenariusz.json -o lata.csv --miesiace miesiace.csv
+    from cli import FORMATY_WYJSCIA, wczytaj_scenariusze, zapisz_wyniki
+    from kalkulator import DOMYSLNE_PARAMETRY, PARAMETRY_SYMULACJI
+
+    parser = argparse.ArgumentParser(description="Symulacja strumieniowa wieloletnich danych z licznika.")
+    parser.add_argument('dane', help="plik danych w układzie dane_zuzycia.csv (dowolna liczba lat)")
+    parser.add_argument('--scenariusze', help="plik scenariuszy .json lub .csv (domyślnie ustawienia domyślne)")
+    parser.add_argument('-o', '--wyjscie', default='-', help="plik wyników rocznych; '-' = standardowe wyjście")
+    parser.add_argument('--miesiace', help="opcjonalny plik raportu miesięcznego")
+    parser.add_argument('--format', choices=FORMATY_WYJSCIA, help="format wyników (domyślnie z rozszerzenia pliku)")
+    parser.add_argument('--rozmiar-fragmentu', type=int, default=ROZMIAR_FRAGMENTU, help="wierszy CSV na fragment")
+    parser.add_argument('--bez-przenoszenia-portfela', action='store_true', help="zeruj portfel na koniec roku")
+    args = parser.parse_args(argv)
+
+    try:
+        scenariusze = (wczytaj_scenariusze(args.scenariusze) if args.scenariusze
+                       else pd.DataFrame([DOMYSLNE_PARAMETRY]))
+        lata, miesiace = [], []
+        for _, scenariusz in scenariusze.iterrows():
+            wynik = symuluj_strumieniowo(args.dane, scenariusz[PARAMETRY_SYMULACJI].to_dict(),
+                                         args.rozmiar_fragmentu, not args.bez_przenoszenia_portfela)
+            nazwa = scenariusz.get('nazwa', None)
+            lata.append(wynik['lata'].assign(nazwa=nazwa) if nazwa is not None else wynik['lata'])
+            raport = pd.DataFrame(wynik['raport_miesieczny_dane'])
+            raport['Miesiąc'] = raport['Miesiąc'].astype(str)
+            miesiace.append(raport.assign(nazwa=nazwa) if nazwa is not None else raport)
+        zapisz_wyniki(pd.concat(lata, ignore_index=True), args.wyjscie, args.format)
+        if args.miesiace:
+            zapisz_wyniki(pd.concat(miesiace, ignore_index=True), args.miesiace, args.format)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+import copy
+import hashlib
+import json
+import os
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+# =========================================================================
+# --- TARYFY I ZASADY NET-BILLINGU (DEFINICJA DEKLARATYWNA) ---
+# =========================================================================
+# Taryfa to słownik (wbudowany, plik .json albo .yaml), np.:
+#   {
+#     "nazwa": "G12w",
+#     "strefy": {"szczyt": {"cena_energii": 0.72, "dystrybucja": 0.47},
+#                "pozaszczyt": {"cena_energii": 0.45, "dystrybucja": 0.10}},
+#     "strefa_domyslna": "szczyt",
+#     "harmonogram": [{"strefa": "pozaszczyt", "godziny": "22-6"},
+#                     {"strefa": "pozaszczyt", "dni": "weekend"}],
+#     "oplaty_zmienne": [{"nazwa": "oplata_mocowa", "stawka": 0.12, "godziny": "7-22", "dni": "robocze"}],
+#     "oplaty_stale_miesieczne": {"abonament": 4.5, "oplata_mocowa": 9.87},
+#     "net_billing": {"wspolczynnik_ceny_eksportu": 1.23, "portfel_kompensuje_dystrybucje": false,
+#                     "wygasanie_portfela_miesiace": 12, "zwrot_nadwyzki_procent": 20}
+#   }
+# Brak ceny w strefie (albo brak stref) = kolumna z pliku danych. Harmonogram: pierwsza
+# pasująca reguła wygrywa, poza regułami - strefa domyślna. "godziny": "od-do" (bez godziny
+# "do", przez północ np. "22-6"), "dni": "robocze" / "weekend" / lista 0-6 (0 = poniedziałek),
+# "miesiace": "od-do" włącznie (np. "4-9"). Zakresy można łączyć przecinkiem ("13-15,22-6").
+# Taryfa kompilowana jest raz na kalendarz danych do tablic cen na interwał, więc pętla
+# silnika nie zna stref ani opłat - widzi tylko cenę eksportu (wpływ do portfela), cenę energii
+# (kompensowaną z portfela) i dystrybucję (płaconą zawsze). Ujemna cena eksportu daje 0 zł
+# (zasada zostaje w silniku).
+
+# Przykładowe stawki brutto [zł/kWh] - do podmiany na stawki sprzedawcy i OSD
+TARYFY_WBUDOWANE = {
+    'G11': {
+        'nazwa': 'G11 (całodobowa)',
+        'strefy': {'calodobowa': {'cena_energii': 0.62, 'dystrybucja': 0.37}},
+        'strefa_domyslna': 'calodobowa',
+        'oplaty_stale_miesieczne': {'oplata_stala_sieciowa': 11.0, 'abonament': 0.75},
+    },
+    'G12': {
+        'nazwa': 'G12 (dzień / noc)',
+        'strefy': {'dzienna': {'cena_energii': 0.69, 'dystrybucja': 0.46},
+                   'nocna': {'cena_energii': 0.43, 'dystrybucja': 0.10}},
+        'strefa_domyslna': 'dzienna',
+        'harmonogram': [{'strefa': 'nocna', 'godziny': '13-15,22-6'}],
+        'oplaty_stale_miesieczne': {'oplata_stala_sieciowa': 13.5, 'abonament': 0.75},
+    },
+    'G12w': {
+        'nazwa': 'G12w (dzień / noc i weekend)',
+        'strefy': {'szczyt': {'cena_energii': 0.72, 'dystrybucja': 0.47},
+                   'pozaszczyt': {'cena_energii': 0.45, 'dystrybucja': 0.10}},
+        'strefa_domyslna': 'szczyt',
+        'harmonogram': [{'strefa': 'pozaszczyt', 'godziny': '13-15,22-6'},
+                        {'strefa': 'pozaszczyt', 'dni': 'weekend'}],
+        'oplaty_stale_miesieczne': {'oplata_stala_sieciowa': 13.5, 'abonament': 0.75},
+    },
+}
+
+NET_BILLING_DOMYSLNY = {
+    'wspolczynnik_ceny_eksportu': 1.0,
+    'portfel_kompensuje_dystrybucje': False,
+    'wygasanie_portfela_miesiace': 0,   # 0 / null - portfel nie wygasa
+    'zwrot_nadwyzki_procent': 30.0,     # zwrot niewykorzystanych środków (rozliczenie roczne)
+}
+# Część portfela wypłacana na koniec roku bez taryfy (podsumuj_rok, projekcja, strategie, strumień)
+UDZIAL_ZWROTU_PORTFELA_DOMYSLNY = NET_BILLING_DOMYSLNY['zwrot_nadwyzki_procent'] / 100.0
+
+KLUCZE_TARYFY = ('nazwa', 'strefy', 'strefa_domyslna', 'harmonogram', 'oplaty_zmienne', 'oplaty_stale_miesieczne',
+                 'net_billing')
+KLUCZE_STREFY = ('cena_energii', 'dystrybucja')
+KLUCZE_WARUNKU = ('godziny', 'dni', 'miesiace')
+DNI = {'robocze': range(0, 5), 'weekend': range(5, 7), 'wszystkie': range(0, 7)}
+
+
+@dataclass(frozen=True, eq=False)
+class TaryfaSkompilowana:
+    nazwa: str
+    skrot: str                       # skrót definicji (klucz pamięci etapów)
+    strefa: np.ndarray               # int8, indeks w nazwy_stref (-1 - ceny z pliku danych)
+    nazwy_stref: tuple
+    cena_eksportu: np.ndarray        # float64 [zł/kWh]
+    cena_energii: np.ndarray         # float64 [zł/kWh] kompensowana z portfela
+    koszt_dystrybucji: np.ndarray    # float64 [zł/kWh] płacona zawsze (z opłatami zmiennymi)
+    wygasanie_portfela_miesiace: int
+    udzial_zwrotu_portfela: float
+    oplaty_stale_rok: float          # [zł] opłaty stałe za miesiące obecne w danych
+
+
+def _liczba(wartosc, opis, minimum=None, maksimum=None):
+    if isinstance(wartosc, bool) or not isinstance(wartosc, (int, float)):
+        raise ValueError(f"❌ Taryfa: {opis} musi być liczbą, otrzymano {wartosc!r}.")
+    if (minimum is not None and wartosc < minimum) or (maksimum is not None and wartosc > maksimum):
+        raise ValueError(f"❌ Taryfa: {opis} poza zakresem [{minimum}, {maksimum}], otrzymano {wartosc}.")
+    return float(wartosc)
+
+
+def _zbior(wartosc, rozmiar, opis, wlacznie):
+    # Zakres "od-do" (z zawinięciem), lista liczb albo liczba -> tablica logiczna przynależności
+    nalezy = np.zeros(rozmiar + wlacznie, dtype=bool)
+    if isinstance(wartosc, (int, float)) and not isinstance(wartosc, bool):
+        wartosc = [wartosc]
+    if isinstance(wartosc, str):
+        for zakres in wartosc.replace(' ', '').split(','):
+            try:
+                od, _, do = zakres.partition('-')
+                od, do = int(od), int(do) if do else int(od) + (0 if wlacznie else 1)
+            except ValueError:
+                raise ValueError(f"❌ Taryfa: niepoprawny zakres {opis} '{zakres}' (oczekiwano np. '22-6').") from None
+            do += wlacznie
+            if not (wlacznie <= od < rozmiar + wlacznie and wlacznie <= do <= rozmiar + wlacznie):
+                raise ValueError(f"❌ Taryfa: zakres {opis} '{zakres}' poza dozwolonymi wartościami.")
+            if od < do:
+                nalezy[od:do] = True
+            else:
+                nalezy[od:] = True
+                nalezy[wlacznie:do] = True
+    elif isinstance(wartosc, (list, tuple)):
+        for v in wartosc:
+            if isinstance(v, bool) or not isinstance(v, int) or not wlacznie <= v < rozmiar + wlacznie:
+                raise ValueError(f"❌ Taryfa: niepoprawna wartość {opis} {v!r}.")
+            nalezy[v] = True
+    else:
+        raise ValueError(f"❌ Taryfa: niepoprawny opis {opis} {wartosc!r}.")
+    return nalezy
+
+
+def _sprawdz_warunek(regula, opis):
+    if not isinstance(regula, dict):
+        raise ValueError(f"❌ Taryfa: {opis} musi być obiektem, otrzymano {regula!r}.")
+    if 'godziny' in regula:
+        _zbior(regula['godziny'], 24, 'godzin', 0)
+    if 'miesiace' in regula:
+        _zbior(regula['miesiace'], 12, 'miesięcy', 1)
+    dni = regula.get('dni')
+    if dni is not None and not (isinstance(dni, str) and dni in DNI):
+        _zbior(dni, 7, 'dni', 0)
+
+
+def sprawdz_taryfe(taryfa):
+    # Walidacja definicji; zwraca kopię z uzupełnionymi domyślnymi zasadami net-billingu
+    if not isinstance(taryfa, dict):
+        raise ValueError("❌ Taryfa musi być obiektem (słownikiem) z kluczami: " + ', '.join(KLUCZE_TARYFY))
+    nieznane = sorted(set(taryfa) - set(KLUCZE_TARYFY))
+    if nieznane:
+        raise ValueError(f"❌ Nieznane klucze taryfy: {nieznane}. Dozwolone: {list(KLUCZE_TARYFY)}")
+    taryfa = copy.deepcopy(taryfa)
+
+    strefy = taryfa['strefy'] = taryfa.get('strefy') or {}
+    if not isinstance(strefy, dict):
+        raise ValueError("❌ Taryfa: 'strefy' musi być obiektem {nazwa: {cena_energii, dystrybucja}}.")
+    for nazwa, ceny in strefy.items():
+        if not isinstance(ceny, dict) or set(ceny) - set(KLUCZE_STREFY):
+            raise ValueError(f"❌ Taryfa: strefa '{nazwa}' może mieć tylko klucze {list(KLUCZE_STREFY)}.")
+        for klucz, cena in ceny.items():
+            _liczba(cena, f"'{klucz}' strefy '{nazwa}'")
+    if strefy and taryfa.get('strefa_domyslna') is None:
+        if len(strefy) > 1:
+            raise ValueError("❌ Taryfa z wieloma strefami wymaga 'strefa_domyslna'.")
+        taryfa['strefa_domyslna'] = next(iter(strefy))
+    if taryfa.get('strefa_domyslna') is not None and taryfa['strefa_domyslna'] not in strefy:
+        raise ValueError(f"❌ Taryfa: nieznana strefa domyślna '{taryfa['strefa_domyslna']}'.")
+
+    for klucz in ('harmonogram', 'oplaty_zmienne'):
+        taryfa[klucz] = taryfa.get(klucz) or []
+        if not isinstance(taryfa[klucz], list):
+            raise ValueError(f"❌ Taryfa: '{klucz}' musi być listą reguł.")
+    for i, regula in enumerate(taryfa['harmonogram']):
+        _sprawdz_warunek(regula, f"reguła harmonogramu nr {i + 1}")
+        if regula.get('strefa') not in strefy:
+            raise ValueError(f"❌ Taryfa: reguła harmonogramu nr {i + 1} wskazuje nieznaną strefę {regula.get('strefa')!r}.")
+        if set(regula) - {'strefa', *KLUCZE_WARUNKU}:
+            raise ValueError(f"❌ Taryfa: reguła harmonogramu nr {i + 1} ma nieznane klucze.")
+    for i, oplata in enumerate(taryfa['oplaty_zmienne']):
+        _sprawdz_warunek(oplata, f"opłata zmienna nr {i + 1}")
+        if set(oplata) - {'nazwa', 'stawka', *KLUCZE_WARUNKU}:
+            raise ValueError(f"❌ Taryfa: opłata zmienna nr {i + 1} ma nieznane klucze.")
+        _liczba(oplata.get('stawka'), f"stawka opłaty zmiennej nr {i + 1}")
+    oplaty_stale = taryfa['oplaty_stale_miesieczne'] = taryfa.get('oplaty_stale_miesieczne') or {}
+    if not isinstance(oplaty_stale, dict):
+        raise ValueError("❌ Taryfa: 'oplaty_stale_miesieczne' musi być obiektem {nazwa: zł/miesiąc}.")
+    for nazwa, kwota in oplaty_stale.items():
+        _liczba(kwota, f"opłata stała '{nazwa}'")
+
+    net_billing = taryfa.get('net_billing') or {}
+    nieznane = sorted(set(net_billing) - set(NET_BILLING_DOMYSLNY))
+    if nieznane:
+        raise ValueError(f"❌ Nieznane zasady net-billingu: {nieznane}. Dozwolone: {list(NET_BILLING_DOMYSLNY)}")
+    net_billing = {**NET_BILLING_DOMYSLNY, **net_billing}
+    _liczba(net_billing['wspolczynnik_ceny_eksportu'], "współczynnik ceny eksportu", 0.0)
+    _liczba(net_billing['zwrot_nadwyzki_procent'], "zwrot nadwyżki portfela [%]", 0.0, 100.0)
+    wygasanie = net_billing['wygasanie_portfela_miesiace'] or 0
+    if isinstance(wygasanie, bool) or not isinstance(wygasanie, int) or wygasanie < 0:
+        raise ValueError(f"❌ Taryfa: wygasanie portfela musi być liczbą miesięcy ≥ 0 (albo null), otrzymano {wygasanie!r}.")
+    net_billing['wygasanie_portfela_miesiace'] = wygasanie
+    net_billing['portfel_kompensuje_dystrybucje'] = bool(net_billing['portfel_kompensuje_dystrybucje'])
+    taryfa['net_billing'] = net_billing
+    taryfa.setdefault('nazwa', 'Taryfa własna')
+    return taryfa
+
+
+def wczytaj_taryfe(zrodlo):
+    # `zrodlo` - nazwa z TARYFY_WBUDOWANE, ścieżka .json / .yaml / .yml albo słownik
+    if isinstance(zrodlo, dict):
+        return sprawdz_taryfe(zrodlo)
+    if zrodlo in TARYFY_WBUDOWANE:
+        return sprawdz_taryfe(TARYFY_WBUDOWANE[zrodlo])
+    if not isinstance(zrodlo, str) or not os.path.exists(zrodlo):
+        raise ValueError(f"❌ Nieznana taryfa '{zrodlo}' (wbudowane: {', '.join(TARYFY_WBUDOWANE)}; albo plik .json/.yaml).")
+    with open(zrodlo, 'rb') as f:
+        return taryfa_z_bajtow(f.read(), os.path.splitext(zrodlo)[1])
+
+
+def taryfa_z_bajtow(zawartosc, rozszerzenie):
+    # Zawartość pliku taryfy (np. z st.file_uploader); YAML wymaga pakietu pyyaml
+    rozszerzenie = rozszerzenie.lower()
+    if rozszerzenie == '.json':
+        try:
+            taryfa = json.loads(zawartosc)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError(f"❌ Nie można odczytać pliku taryfy JSON. {e}") from e
+    elif rozszerzenie in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ValueError(f"❌ Taryfa w formacie YAML wymaga pakietu pyyaml (albo użyj JSON). {e}") from e
+        try:
+            taryfa = yaml.safe_load(zawartosc)
+        except yaml.YAMLError as e:
+            raise ValueError(f"❌ Nie można odczytać pliku taryfy YAML. {e}") from e
+    else:
+        raise ValueError(f"❌ Nieobsługiwany format taryfy '{rozszerzenie}' (dozwolone: .json, .yaml, .yml).")
+    return sprawdz_taryfe(taryfa)
+
+
+def skrot_taryfy(taryfa):
+    return hashlib.sha1(json.dumps(taryfa, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _maska(regula, godzina, dzien_tygodnia, miesiac):
+    maska = np.ones(len(godzina), dtype=bool)
+    if 'godziny' in regula:
+        maska &= _zbior(regula['godziny'], 24, 'godzin', 0)[godzina]
+    if regula.get('dni') is not None:
+        dni = regula['dni']
+        zbior = np.isin(np.arange(7), list(DNI[dni])) if isinstance(dni, str) and dni in DNI else _zbior(dni, 7, 'dni', 0)
+        maska &= zbior[dzien_tygodnia]
+    if 'miesiace' in regula:
+        maska &= _zbior(regula['miesiace'], 12, 'miesięcy', 1)[miesiac]
+    return maska
+
+
+def skompiluj_taryfe(taryfa, dane):
+    # Taryfa (patrz wczytaj_taryfe) -> tablice cen na interwał dla kalendarza `dane` (DaneWejsciowe)
+    taryfa = wczytaj_taryfe(taryfa)
+    godzina = np.asarray(dane.godzina, dtype=np.intp)
+    miesiac = np.asarray(dane.miesiac, dtype=np.intp)
+    # 1970-01-01 to czwartek: (dni od epoki + 3) % 7 daje 0 = poniedziałek
+    dzien_tygodnia = (np.asarray(dane.data, dtype='datetime64[D]').astype(np.int64) + 3) % 7
+
+    nazwy_stref = tuple(taryfa['strefy'])
+    strefa = np.full(len(dane), -1, dtype=np.int8)
+    if nazwy_stref:
+        strefa[:] = nazwy_stref.index(taryfa['strefa_domyslna'])
+        # Od ostatniej reguły do pierwszej - pierwsza pasująca nadpisuje pozostałe
+        for regula in reversed(taryfa['harmonogram']):
+            strefa[_maska(regula, godzina, dzien_tygodnia, miesiac)] = nazwy_stref.index(regula['strefa'])
+
+    cena_energii = np.array(dane.cena_energii, dtype=np.float64)
+    koszt_dystrybucji = np.array(dane.koszt_dystrybucji, dtype=np.float64)
+    for i, nazwa in enumerate(nazwy_stref):
+        ceny = taryfa['strefy'][nazwa]
+        w_strefie = strefa == i
+        if 'cena_energii' in ceny:
+            cena_energii[w_strefie] = ceny['cena_energii']
+        if 'dystrybucja' in ceny:
+            koszt_dystrybucji[w_strefie] = ceny['dystrybucja']
+    for oplata in taryfa['oplaty_zmienne']:
+        koszt_dystrybucji[_maska(oplata, godzina, dzien_tygodnia, miesiac)] += oplata['stawka']
+
+    net_billing = taryfa['net_billing']
+    cena_eksportu = np.asarray(dane.cena_eksportu, dtype=np.float64)
+    if net_billing['wspolczynnik_ceny_eksportu'] != 1.0:
+        cena_eksportu = cena_eksportu * net_billing['wspolczynnik_ceny_eksportu']
+    if net_billing['portfel_kompensuje_dystrybucje']:
+        # Depozyt pokrywa całą cenę zakupu - dystrybucja przechodzi do części kompensowanej
+        cena_energii += koszt_dystrybucji
+        koszt_dystrybucji = np.zeros_like(koszt_dystrybucji)
+
+    liczba_miesiecy = len(np.unique(dane.kod_miesiaca))
+    return TaryfaSkompilowana(
+        nazwa=taryfa['nazwa'],
+        skrot=skrot_taryfy(taryfa),
+        strefa=strefa,
+        nazwy_stref=nazwy_stref,
+        cena_eksportu=cena_eksportu,
+        cena_energii=cena_energii,
+        koszt_dystrybucji=koszt_dystrybucji,
+        wygasanie_portfela_miesiace=net_billing['wygasanie_portfela_miesiace'],
+        udzial_zwrotu_portfela=net_billing['zwrot_nadwyzki_procent'] / 100.0,
+        oplaty_stale_rok=float(sum(taryfa['oplaty_stale_miesieczne'].values())) * liczba_miesiecy,
+    )
+
+
+def zastosuj_taryfe(dane, skompilowana):
+    # DaneWejsciowe z cenami taryfy; skrót rozszerzony o taryfę (osobne wpisy w pamięci etapów)
+    return replace(
+        dane,
+        cena_eksportu=skompilowana.cena_eksportu,
+        cena_energii=skompilowana.cena_energii,
+        koszt_dystrybucji=skompilowana.koszt_dystrybucji,
+        koszt_bez_pv=float((dane.konsumpcja * (skompilowana.cena_energii + skompilowana.koszt_dystrybucji)).sum()),
+        skrot=f"{dane.skrot}|taryfa:{skompilowana.skrot}" if dane.skrot else '',
+    )
@@ -0,0 +1,206 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from dane import wczytaj_konsumpcje, z_wlasna_konsumpcja, jako_dane_wejsciowe
+from kalkulator import DOMYSLNE_PARAMETRY, wczytaj_dane, symuluj_warianty
+from cli import FORMATY_WYJSCIA, wczytaj_scenariusze, zapisz_wyniki
+
+# =========================================================================
+# --- WYCENY PORTFELOWE (WIELU KLIENTÓW NA PULI PROCESÓW) ---
+# =========================================================================
+# python wyceny.py klienci/ --scenariusze scenariusze.json --dane-wspolne dane_zuzycia.csv -o raport.csv
+#
+# Jedno zadanie = jeden plik klienta; wszystkie scenariusze klienta liczone są jednym
+# przebiegiem wsadowym silnika. Z --dane-wspolne kalendarz, ceny i uzysk PV wczytywane
+# są raz w procesie głównym i udostępniane procesom roboczym przez pamięć współdzieloną
+# (bez serializowania DataFrame'ów), a z plików klientów brany jest tylko profil zużycia.
+# Bez --dane-wspolne każdy plik klienta jest pełnym zestawem danych (własne ceny i PV).
+
+_POLA_WSPOLNE = ('data', 'miesiac', 'godzina', 'kod_miesiaca', 'produkcja_pv_1kwp', 'cena_eksportu',
+                 'cena_energii', 'koszt_dystrybucji')
+
+# Stan procesu roboczego (ustawiany w _inicjuj_proces)
+_wspolne = None
+_pamiec_wspolna = None
+_scenariusze = None
+_opcje = {}
+
+
+def _udostepnij(dane):
+    # Kopiuje tablice wspólne do jednego bloku pamięci współdzielonej; zwraca (blok, opis układu)
+    opis = []
+    przesuniecie = 0
+    for pole in _POLA_WSPOLNE:
+        tablica = getattr(dane, pole)
+        opis.append((pole, tablica.dtype.str, len(tablica), przesuniecie))
+        przesuniecie += -(-tablica.nbytes // 8) * 8
+    pamiec = shared_memory.SharedMemory(create=True, size=max(przesuniecie, 8))
+    for pole, typ, dlugosc, przesuniecie in opis:
+        np.ndarray(dlugosc, typ, buffer=pamiec.buf, offset=przesuniecie)[:] = getattr(dane, pole)
+    return pamiec, opis
+
+
+def _widoki(pamiec, opis):
+    widoki = {}
+    for pole, typ, dlugosc, przesuniecie in opis:
+        widoki[pole] = np.ndarray(dlugosc, typ, buffer=pamiec.buf, offset=przesuniecie)
+        widoki[pole].flags.writeable = False
+    return widoki
+
+
+def _inicjuj_proces(nazwa_pamieci, opis, scenariusze, opcje):
+    global _wspolne, _pamiec_wspolna, _scenariusze, _opcje
+    if nazwa_pamieci is not None:
+        _pamiec_wspolna = shared_memory.SharedMemory(name=nazwa_pamieci)
+        _wspolne = _widoki(_pamiec_wspolna, opis)
+    _scenariusze = scenariusze
+    _opcje = opcje
+
+
+def _zwolnij_proces():
+    global _wspolne, _pamiec_wspolna, _scenariusze, _opcje
+    _wspolne = None
+    if _pamiec_wspolna is not None:
+        _pamiec_wspolna.close()
+    _pamiec_wspolna, _scenariusze, _opcje = None, None, {}
+
+
+def dopasuj_konsumpcje(data_wspolna, data, konsumpcja):
+    # Profil zużycia klienta na kalendarzu danych wspólnych: dopasowanie po znaczniku czasu
+    # (powtórzone godziny, np. przy zmianie czasu, dopasowywane kolejno); brakujące interwały = 0.
+    # Zwraca (konsumpcja, odsetek interwałów kalendarza pokrytych danymi klienta).
+    if len(data) == len(data_wspolna) and np.array_equal(data, data_wspolna):
+        return konsumpcja, 1.0
+    klucze = pd.MultiIndex.from_arrays([data, pd.Series(data).groupby(data).cumcount().to_numpy()])
+    klucze_wspolne = pd.MultiIndex.from_arrays([data_wspolna,
+                                                pd.Series(data_wspolna).groupby(data_wspolna).cumcount().to_numpy()])
+    indeksy = klucze.get_indexer(klucze_wspolne)
+    trafione = indeksy >= 0
+    return np.where(trafione, konsumpcja[indeksy], 0.0), float(trafione.mean()) if len(trafione) else 0.0
+
+
+def _wycen_klienta(zadanie):
+    # Zadanie jednego klienta; błąd nie przerywa portfela - wraca jako wiersz z kolumną 'Błąd'
+    numer, sciezka = zadanie
+    klient = os.path.splitext(os.path.basename(sciezka))[0]
+    try:
+        if _wspolne is not None:
+            data, konsumpcja = wczytaj_konsumpcje(sciezka)
+            konsumpcja, pokrycie = dopasuj_konsumpcje(_wspolne['data'], data, konsumpcja)
+            dane = z_wlasna_konsumpcja(_wspolne, konsumpcja)
+        else:
+            dane = wczytaj_dane(sciezka, uzyj_sidecar=_opcje.get('uzyj_sidecar', True))
+            pokrycie = 1.0
+        tabela = symuluj_warianty(dane, _scenariusze, uzyj_jit=_opcje.get('uzyj_jit', True))
+        tabela.insert(0, 'Pokrycie danych [%]', pokrycie * 100)
+        blad = None
+    except Exception as e:
+        tabela = pd.DataFrame({'Pokrycie danych [%]': [np.nan]})
+        blad = f"{type(e).__name__}: {e}"
+    tabela.insert(0, 'Błąd', blad)
+    tabela.insert(0, 'plik', sciezka)
+    tabela.insert(0, 'klient', klient)
+    return numer, tabela
+
+
+def pliki_klientow(sciezki):
+    # Pliki .csv z podanych ścieżek (katalogi rozwijane, kolejność alfabetyczna w katalogu)
+    pliki = []
+    for sciezka in sciezki:
+        if os.path.isdir(sciezka):
+            pliki.extend(sorted(glob.glob(os.path.join(sciezka, '*.csv'))))
+        else:
+            pliki.append(sciezka)
+    return pliki
+
+
+def wycen_portfel(pliki, scenariusze=None, dane_wspolne=None, procesy=None, postep=None, uzyj_jit=True,
+                  uzyj_sidecar=True):
+    # `pliki` - pliki klientów, `scenariusze` - DataFrame/lista słowników z PARAMETRY_SYMULACJI
+    # (domyślnie jeden scenariusz DOMYSLNE_PARAMETRY), `dane_wspolne` - ścieżka lub DaneWejsciowe
+    # z cenami i uzyskiem PV. `postep(zrobione, wszystkie, tabela_klienta)` wołane po każdym kliencie.
+    # Wynik: jeden raport (wiersz = klient × scenariusz) w kolejności plików.
+    scenariusze = pd.DataFrame(scenariusze if scenariusze is not None else [DOMYSLNE_PARAMETRY])
+    procesy = min(procesy or os.cpu_count() or 1, max(len(pliki), 1))
+    opcje = {'uzyj_jit': uzyj_jit, 'uzyj_sidecar': uzyj_sidecar}
+
+    pamiec, opis = None, None
+    if dane_wspolne is not None:
+        wspolne = wczytaj_dane(dane_wspolne) if isinstance(dane_wspolne, str) else jako_dane_wejsciowe(dane_wspolne)
+        pamiec, opis = _udostepnij(wspolne)
+
+    wyniki = [None] * len(pliki)
+    try:
+        argumenty = (pamiec.name if pamiec is not None else None, opis, scenariusze, opcje)
+        zadania = list(enumerate(pliki))
+        if procesy == 1:
+            _inicjuj_proces(*argumenty)
+            strumien = map(_wycen_klienta, zadania)
+            pula = None
+        else:
+            pula = multiprocessing.Pool(procesy, initializer=_inicjuj_proces, initargs=argumenty)
+            strumien = pula.imap_unordered(_wycen_klienta, zadania)
+        try:
+            for zrobione, (numer, tabela) in enumerate(strumien, 1):
+                wyniki[numer] = tabela
+                if postep is not None:
+                    postep(zrobione, len(pliki), tabela)
+        finally:
+            if pula is not None:
+                pula.terminate()
+                pula.join()
+    finally:
+        if procesy == 1:
+            _zwolnij_proces()
+        if pamiec is not None:
+            pamiec.close()
+            pamiec.unlink()
+
+    if not wyniki:
+        return pd.DataFrame(columns=['klient', 'plik', 'Błąd'])
+    return pd.concat(wyniki, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wyceny portfelowe: wielu klientów × wiele scenariuszy na puli procesów.")
+    parser.add_argument('klienci', nargs='+', help="pliki .csv klientów lub katalogi z plikami .csv")
+    parser.add_argument('--scenariusze', help="plik scenariuszy .json lub .csv (domyślnie ustawienia domyślne)")
+    parser.add_argument('--dane-wspolne', help="plik z cenami i uzyskiem PV wspólnymi dla wszystkich klientów")
+    parser.add_argument('-o', '--wyjscie', default='-', help="plik raportu; '-' = standardowe wyjście (domyślnie)")
+    parser.add_argument('--format', choices=FORMATY_WYJSCIA, help="format raportu (domyślnie z rozszerzenia pliku, inaczej csv)")
+    parser.add_argument('-j', '--procesy', type=int, help="liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument('--bez-jit', action='store_true', help="nie kompiluj pętli bilansu numbą")
+    parser.add_argument('--bez-cache', action='store_true', help="nie używaj plików <dane>.cache.npz")
+    args = parser.parse_args(argv)
+
+    def pokaz_postep(zrobione, wszystkie, tabela):
+        status = 'BŁĄD' if tabela['Błąd'].notna().any() else 'ok'
+        print(f"\r[{zrobione}/{wszystkie}] {tabela['klient'].iloc[0]}: {status}".ljust(60), end='', file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        scenariusze = wczytaj_scenariusze(args.scenariusze) if args.scenariusze else None
+        pliki = pliki_klientow(args.klienci)
+        raport = wycen_portfel(pliki, scenariusze, args.dane_wspolne, args.procesy, pokaz_postep,
+                               uzyj_jit=not args.bez_jit, uzyj_sidecar=not args.bez_cache)
+        zapisz_wyniki(raport, args.wyjscie, args.format)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    bledy = raport.drop_duplicates('plik')['Błąd'].notna().sum()
+    print(f"\nWycenionych klientów: {len(pliki) - bledy}/{len(pliki)}, wierszy raportu: {len(raport)}, "
+          f"czas: {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    return 0 if bledy == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
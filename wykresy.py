@@ -0,0 +1,197 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# =========================================================================
+# --- WYKRESY (BEZ STREAMLIT) ---
+# =========================================================================
+# Funkcje zwracają gotowe figury matplotlib lub wykresy Altair (Vega-Lite, rysowane wektorowo
+# w przeglądarce); wyświetlanie zostaje w app.py. matplotlib i altair importowane są dopiero
+# przy rysowaniu, więc import modułu jest tani.
+
+NAZWY_MIESIECY = {1: 'Sty', 2: 'Lut', 3: 'Mar', 4: 'Kwi', 5: 'Maj', 6: 'Cze',
+                  7: 'Lip', 8: 'Sie', 9: 'Wrz', 10: 'Paź', 11: 'Lis', 12: 'Gru'}
+
+# Serie bilansu: (kolumna raportu, etykieta, kolor); zakup rysowany pod osią 0
+SERIE_BILANSU = (
+    ('AC_PV_KWh', 'Autokonsumpcja z PV', '#FFEB3B'),
+    ('AC_Wiatr_KWh', 'Autokonsumpcja z Wiatru', '#03A9F4'),
+    ('AC_ESS_KWh', 'Autokonsumpcja z Magazynu', '#4CAF50'),
+    ('Sprzedaz_Siec_KWh', 'Eksport/Sprzedaż do Sieci', '#FF9800'),
+    ('Zakup_Siec_KWh', 'Pobór/Zakup z Sieci', '#F44336'),
+)
+
+# Gotowe wykresy Altair wg skrótu danych i tytułu (ponowne wyświetlenie bez budowania od nowa)
+_wykresy_w_pamieci = OrderedDict()
+MAX_WYKRESOW_W_PAMIECI = 32
+
+
+def tabela_miesieczna(raport_miesieczny_dane):
+    # Raport miesięczny z nazwami miesięcy, w kolejności od października (jak wykres bilansu)
+    df_raport = pd.DataFrame(raport_miesieczny_dane)
+    numer = pd.PeriodIndex(df_raport['Miesiąc'], freq='M').month.to_numpy()
+    df_raport['Miesiąc_Num'] = numer
+    df_raport['Miesiąc_Sort'] = np.where(numer >= 10, numer, numer + 12)
+    df_raport['Miesiąc_Nazwa'] = df_raport['Miesiąc_Num'].map(NAZWY_MIESIECY)
+    df_raport['Okres'] = df_raport['Miesiąc'].astype(str)
+    return df_raport.sort_values(by='Miesiąc_Sort', kind='stable')
+
+
+def _w_pamieci(klucz, zbuduj):
+    wykres = _wykresy_w_pamieci.get(klucz)
+    if wykres is None:
+        wykres = zbuduj()
+        _wykresy_w_pamieci[klucz] = wykres
+        while len(_wykresy_w_pamieci) > MAX_WYKRESOW_W_PAMIECI:
+            _wykresy_w_pamieci.popitem(last=False)
+    else:
+        _wykresy_w_pamieci.move_to_end(klucz)
+    return wykres
+
+
+def _skrot_tabeli(df, kolumny, *etykiety):
+    skrot = hashlib.sha1(np.ascontiguousarray(df[list(kolumny)].to_numpy(dtype=np.float64)).tobytes())
+    for etykieta in etykiety:
+        skrot.update(str(etykieta).encode())
+    return skrot.hexdigest()
+
+
+def _serie_w_wierszach(df, kolumna_x):
+    # Szeroka tabela (kolumna na serię) -> wiersze (x, Seria, kWh) dla skumulowanych słupków Vega-Lite
+    czesci = []
+    for kolumna, etykieta, _ in SERIE_BILANSU:
+        wartosci = df[kolumna].to_numpy(dtype=np.float64)
+        czesci.append(pd.DataFrame({kolumna_x: df[kolumna_x].to_numpy(), 'Seria': etykieta,
+                                    'kWh': -wartosci if kolumna == 'Zakup_Siec_KWh' else wartosci}))
+    return pd.concat(czesci, ignore_index=True)
+
+
+def _slupki_bilansu(alt, dane, x, tytul):
+    kolory = alt.Scale(domain=[e for _, e, _ in SERIE_BILANSU], range=[k for _, _, k in SERIE_BILANSU])
+    return alt.Chart(dane, title=tytul).mark_bar().encode(
+        x=x,
+        y=alt.Y('kWh:Q', title='Energia [kWh]', stack='zero'),
+        color=alt.Color('Seria:N', scale=kolory, sort=[e for _, e, _ in SERIE_BILANSU],
+                        legend=alt.Legend(orient='top', columns=3, title=None)),
+        order=alt.Order('kolejnosc:Q'),
+        tooltip=[alt.Tooltip('Seria:N'), alt.Tooltip('kWh:Q', format=',.1f')],
+    )
+
+
+# --- INTERAKTYWNY WYKRES BILANSU (ALTAIR) Z WYBOREM MIESIĄCA ---
+# Kliknięcie słupka ustawia wybór 'miesiac' (pole 'Okres', np. '2024-07'), z którego app.py
+# rysuje wykres_bilansu_dziennego dla tego miesiąca - bez ponownej symulacji.
+def wykres_bilansu_interaktywny(raport_miesieczny_dane, tytul=''):
+    df_raport = tabela_miesieczna(raport_miesieczny_dane)
+    klucz = ('miesiace', _skrot_tabeli(df_raport, [k for k, _, _ in SERIE_BILANSU] + ['Miesiąc_Sort'],
+                                       tytul, *df_raport['Okres']))
+
+    def zbuduj():
+        import altair as alt
+
+        dane = _serie_w_wierszach(df_raport, 'Okres')
+        dane['Miesiąc'] = dane['Okres'].map(dict(zip(df_raport['Okres'], df_raport['Miesiąc_Nazwa'])))
+        dane['kolejnosc'] = dane['Seria'].map({e: i for i, (_, e, _) in enumerate(SERIE_BILANSU)})
+        wybor = alt.selection_point(name='miesiac', fields=['Okres'])
+        return _slupki_bilansu(alt, dane, alt.X('Okres:O', sort=list(df_raport['Okres']), title='Miesiąc',
+                                                axis=alt.Axis(labelExpr=_etykiety_miesiecy(df_raport))), tytul).encode(
+            opacity=alt.condition(wybor, alt.value(1.0), alt.value(0.45)),
+            tooltip=[alt.Tooltip('Miesiąc:N'), alt.Tooltip('Seria:N'), alt.Tooltip('kWh:Q', format=',.1f')],
+        ).add_params(wybor).properties(height=400)
+
+    return _w_pamieci(klucz, zbuduj)
+
+
+def _etykiety_miesiecy(df_raport):
+    # Wyrażenie Vega: '2024-07' -> 'Lip'
+    mapa = ', '.join(f"'{o}': '{n}'" for o, n in zip(df_raport['Okres'], df_raport['Miesiąc_Nazwa']))
+    return f"{{{mapa}}}[datum.value] || datum.value"
+
+
+def wykres_bilansu_dziennego(raport_dzienny_dane, okres, tytul=''):
+    # Dni jednego miesiąca (okres 'RRRR-MM') z raportu dziennego kalkulatora
+    dni = raport_dzienny_dane[pd.to_datetime(raport_dzienny_dane['Dzień']).dt.strftime('%Y-%m') == okres].copy()
+    dni['Dzień'] = pd.to_datetime(dni['Dzień']).dt.strftime('%d')
+    klucz = ('dni', _skrot_tabeli(dni, [k for k, _, _ in SERIE_BILANSU], tytul, okres))
+
+    def zbuduj():
+        import altair as alt
+
+        dane = _serie_w_wierszach(dni, 'Dzień')
+        dane['kolejnosc'] = dane['Seria'].map({e: i for i, (_, e, _) in enumerate(SERIE_BILANSU)})
+        wybor = alt.selection_point(name='dzien', fields=['Dzień'])
+        return _slupki_bilansu(alt, dane, alt.X('Dzień:O', title=f'Dzień ({okres})'), tytul).encode(
+            opacity=alt.condition(wybor, alt.value(1.0), alt.value(0.45)),
+        ).add_params(wybor).properties(height=300)
+
+    return _w_pamieci(klucz, zbuduj)
+
+
+# --- BILANS INTERWAŁ PO INTERWALE WYBRANEGO DNIA (Z TABLIC interwaly.WynikiInterwalowe) ---
+def wykres_bilansu_interwalowego(df_interwaly, dzien, tytul=''):
+    # `df_interwaly` - interwaly.jako_dataframe(...), `dzien` - 'RRRR-MM-DD'
+    data = df_interwaly['Data'].to_numpy(dtype='datetime64[ns]')
+    interwaly = df_interwaly[data.astype('datetime64[D]') == np.datetime64(dzien, 'D')].copy()
+    interwaly['Godzina'] = pd.to_datetime(interwaly['Data']).dt.strftime('%H:%M')
+    klucz = ('interwaly', _skrot_tabeli(interwaly, [k for k, _, _ in SERIE_BILANSU], tytul, dzien))
+
+    def zbuduj():
+        import altair as alt
+
+        dane = _serie_w_wierszach(interwaly, 'Godzina')
+        dane['kolejnosc'] = dane['Seria'].map({e: i for i, (_, e, _) in enumerate(SERIE_BILANSU)})
+        return _slupki_bilansu(alt, dane, alt.X('Godzina:O', title=f'Godzina ({dzien})'), tytul).properties(height=300)
+
+    return _w_pamieci(klucz, zbuduj)
+
+
+# --- ROZKŁAD WYNIKU W SCENARIUSZACH MONTE CARLO (HISTOGRAM Z PERCENTYLAMI) ---
+def wykres_rozkladu_scenariuszy(scenariusze, kolumna, percentyle, tytul=''):
+    # `scenariusze`/`percentyle` - z niepewnosc.analiza_monte_carlo; linie pionowe w P10/P50/P90
+    wartosci = scenariusze[kolumna].to_numpy(dtype=np.float64)
+    wartosci = wartosci[np.isfinite(wartosci)]
+    znaczniki = pd.DataFrame({'Percentyl': list(percentyle.index), 'Wartość': percentyle[kolumna].to_numpy()})
+    znaczniki = znaczniki[np.isfinite(znaczniki['Wartość'])]
+    klucz = ('rozklad', hashlib.sha1(wartosci.tobytes()).hexdigest(), kolumna, tytul,
+             tuple(znaczniki.itertuples(index=False)))
+
+    def zbuduj():
+        import altair as alt
+
+        slupki = alt.Chart(pd.DataFrame({kolumna: wartosci}), title=tytul).mark_bar(color='#4CAF50', opacity=0.8).encode(
+            x=alt.X(f'{kolumna}:Q', bin=alt.Bin(maxbins=40), title=kolumna),
+            y=alt.Y('count():Q', title='Liczba scenariuszy'),
+        )
+        linie = alt.Chart(znaczniki).mark_rule(color='#F44336', strokeDash=[4, 3]).encode(
+            x='Wartość:Q', tooltip=[alt.Tooltip('Percentyl:N'), alt.Tooltip('Wartość:Q', format=',.2f')],
+        )
+        etykiety = linie.mark_text(align='left', dx=3, dy=-5, color='#F44336').encode(
+            text='Percentyl:N', y=alt.value(0))
+        return (slupki + linie + etykiety).properties(height=260)
+
+    return _w_pamieci(klucz, zbuduj)
+
+
+# --- MAPA CIEPŁA OKRESU ZWROTU DLA SIATKI WARIANTÓW PV × ESS ---
+def mapa_wariantow(tabela_wariantow):
+    import matplotlib.pyplot as plt
+
+    mapa = tabela_wariantow.pivot_table(index='ess_pojemnosc_kwh', columns='moc_pv_kwp', values='Okres zwrotu (lat)')
+    wartosci = mapa.to_numpy().copy()
+    wartosci[~np.isfinite(wartosci)] = np.nan
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    obraz = ax.imshow(wartosci, origin='lower', aspect='auto', cmap='RdYlGn_r')
+    ax.set_xticks(range(len(mapa.columns)))
+    ax.set_xticklabels([f"{v:g}" for v in mapa.columns])
+    ax.set_yticks(range(len(mapa.index)))
+    ax.set_yticklabels([f"{v:g}" for v in mapa.index])
+    ax.set_xlabel('Moc PV [kWp]')
+    ax.set_ylabel('Pojemność ESS [kWh]')
+    ax.set_title('Okres zwrotu [lata] dla wariantów PV × ESS')
+    fig.colorbar(obraz, ax=ax, label='Okres zwrotu [lata]')
+    fig.tight_layout()
+
+    return fig